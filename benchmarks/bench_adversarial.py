@@ -0,0 +1,139 @@
+"""Extraction time on malformed and adversarial HTML, against input size
+
+Usage: python benchmarks/bench_adversarial.py [--kb 64] [--steps 4] [--fuzz 20] [--seed 1]
+       [--repeat 3] [--tolerance 2.0]
+
+Every case is generated at ``--kb`` KB and then doubled ``--steps - 1``
+times. Each size is scanned, its blocks minified and its references parsed
+the way the analyzer does (best of ``--repeat``), and the time per KB at
+the largest size is compared with the time per KB at the smallest. Linear
+work keeps that growth near 1; quadratic work doubles it with every size
+step. Cases:
+
+* ``unclosed_script`` / ``unclosed_style``: opening tags whose closing
+  tag never comes
+* ``unterminated_quote``: tags with a ``style`` attribute whose quote and
+  ``>`` never come
+* ``stray_style_text``: ``style=`` in text, far from any ``<``
+* ``unclosed_url``: ``url(`` without ``)`` in a stylesheet
+* ``unclosed_links``: ``<link href="`` tags that never end
+* ``fuzz``: a well-formed page with ``--fuzz`` random markup fragments
+  (tag openers, quotes, comment and block delimiters) spliced in per KB
+
+A case whose growth is above ``--tolerance`` is flagged and the exit
+status is 1.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extractor.analyzer import parse_references  # noqa: E402
+from html_extractor.minify import minify_css, minify_js  # noqa: E402
+from html_extractor.scanner import scan_html  # noqa: E402
+
+_FRAGMENTS = ('<script>', '<script src="', '</script', '<style>', '</style>', '<style', '"', "'", '<!--',
+              '-->', ' style="', ' style=', '>', '<', '<link rel="stylesheet" href="', '<head ', '</body',
+              'url(', '/*', '`')
+
+_VALID_UNIT = ('<div class="row" style="color: red; margin: 0 auto"><a href="/item" title="Item">Item</a>'
+               '<script>var total = 1; // count\nfunction add(a, b) { return a + b; }</script>'
+               '<style>.row { background: url(row.png); color: red; }</style></div>\n')
+
+
+def _repeat(unit, size, head='<html><head></head><body>\n'):
+    return head + unit * max(1, (size - len(head)) // len(unit))
+
+
+def _fuzz(size, per_kb, seed):
+    rng = random.Random(seed)
+    base = _repeat(_VALID_UNIT, size)
+    cuts = sorted(rng.randrange(len(base)) for _ in range(per_kb * size // 1024))
+    pieces = []
+    last = 0
+    for cut in cuts:
+        pieces.append(base[last:cut])
+        pieces.append(rng.choice(_FRAGMENTS))
+        last = cut
+    pieces.append(base[last:])
+    return ''.join(pieces)
+
+
+def build_case(case, size, per_kb, seed):
+    """Return the page of a case, about ``size`` characters long"""
+    if case == 'unclosed_script':
+        return _repeat('<script>var a = 1;\n', size)
+    if case == 'unclosed_style':
+        return _repeat('<style>a { color: red }\n', size)
+    if case == 'unterminated_quote':
+        return _repeat('<p style="color: red; x', size)
+    if case == 'stray_style_text':
+        return _repeat('the style= attribute ', size)
+    if case == 'unclosed_url':
+        return '<style>' + _repeat('a { background: url(x.png }\n', size, head='') + '</style>'
+    if case == 'unclosed_links':
+        return _repeat('<link rel="stylesheet" href="x.css\n', size)
+    return _fuzz(size, per_kb, seed)
+
+
+CASES = ('unclosed_script', 'unclosed_style', 'unterminated_quote', 'stray_style_text', 'unclosed_url',
+         'unclosed_links', 'fuzz')
+
+
+def extract(html):
+    """The CPU work of one extraction: scan, minify every block, parse the references"""
+    scan = scan_html(html)
+    for code in scan.scripts:
+        minify_js(code)
+    for code in scan.styles:
+        minify_css(code)
+    parse_references(html.encode('utf-8'))
+
+
+def measure(html, repeat):
+    """Return the best wall time of ``repeat`` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kb', type=int, default=64, help='smallest page size (default: 64)')
+    parser.add_argument('--steps', type=int, default=4, help='sizes, each double the previous (default: 4)')
+    parser.add_argument('--fuzz', type=int, default=20, help='random fragments per KB in the fuzz case')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=2.0,
+                        help='growth of the time per KB flagged as superlinear (default: 2.0)')
+    args = parser.parse_args(argv)
+
+    sizes = [args.kb * 1024 << step for step in range(max(args.steps, 2))]
+    print(f"{'case':<20}" + ''.join(f"{f'{size // 1024} KB':>12}" for size in sizes) + f"{'growth':>10}")
+    flagged = []
+    for case in CASES:
+        per_kb = []
+        for size in sizes:
+            html = build_case(case, size, args.fuzz, args.seed)
+            per_kb.append(measure(html, args.repeat) / (len(html) / 1024))
+        growth = per_kb[-1] / per_kb[0]
+        cells = ''.join(f"{seconds * 1e6:9.1f} µs" for seconds in per_kb)
+        mark = '  SUPERLINEAR' if growth > args.tolerance else ''
+        print(f"{case:<20}{cells}{growth:9.2f}x{mark}")
+        if mark:
+            flagged.append(case)
+
+    print("(time per KB of input at each size)")
+    if flagged:
+        print(f"Superlinear: {', '.join(flagged)}")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
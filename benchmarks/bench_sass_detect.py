@@ -0,0 +1,102 @@
+"""Speed of the single-alternation Sass detector against the old pattern loop
+
+Usage: python benchmarks/bench_sass_detect.py [--rules 5000] [--repeat 5]
+
+The "before" numbers come from a copy of ``_detect_sass`` as it was before
+``html_extractor.sass_detect`` existed: eleven ``re.search`` calls per
+block. Samples cover many small page-sized blocks (the common case, where
+per-call overhead dominates), one large plain stylesheet (no Sass, so the
+whole block is scanned), a large stylesheet whose only Sass comes at the
+end, and template output padded with blank lines, on which the old
+nested-rule pattern rescans every run of blank lines from each line start.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extractor.sass_detect import detect_sass  # noqa: E402
+
+LEGACY_PATTERNS = [
+    r'\$[\w-]+\s*:',
+    r'@mixin\s+[\w-]+',
+    r'@include\s+[\w-]+',
+    r'@extend\s+',
+    r'@import\s+["\']',
+    r'&\s*[:\w\[\]]',
+    r'^\s*[\w-]+\s*{[^}]*[\w-]+\s*{',
+    r'@if\s+',
+    r'@for\s+',
+    r'@each\s+',
+    r'@function\s+',
+]
+
+
+def legacy_detect(css_code):
+    """The pre-compiled-detector loop over eleven patterns"""
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, css_code, re.MULTILINE):
+            return True
+    return False
+
+
+def plain_css(rules):
+    """A framework-style stylesheet with no Sass in it"""
+    chunks = []
+    for i in range(rules):
+        chunks.append(f".card-{i} > .card-header, .btn-{i}:hover {{\n"
+                      f"  color: #{i % 4096:03x};\n  margin: 0 auto;\n  font: 14px/1.5 'Helvetica Neue', Arial;\n"
+                      f"  background: url(\"/img/bg-{i}.png\") no-repeat;\n}}\n")
+        if i % 20 == 0:
+            chunks.append(f"@media (max-width: {600 + i % 400}px) {{\n  .col-{i} {{ width: 100%; }}\n}}\n")
+    return ''.join(chunks)
+
+
+def scss(rules):
+    """Plain CSS followed by a partial that nests rules under a parent selector"""
+    return plain_css(rules) + ''.join(
+        f".nav-{i} {{\n  &:hover {{ color: red; }}\n  ul {{ margin: 0; }}\n}}\n"
+        for i in range(rules))
+
+
+def padded(rules):
+    """Template-generated CSS with long runs of blank, indented lines"""
+    gap = '\n    ' * 200
+    return ''.join(f".item-{i} {{ color: red; margin: 0; }}{gap}\n" for i in range(rules))
+
+
+def measure(func, blocks, repeat):
+    """Return the best wall time of ``repeat`` runs over all blocks"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            func(block)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    samples = [
+        ('small blocks', [plain_css(3) for _ in range(1000)] + [scss(3)[-200:] for _ in range(1000)]),
+        ('plain CSS', [plain_css(args.rules)]),
+        ('late SCSS', [scss(args.rules)]),
+        ('padded CSS', [padded(min(args.rules, 500))]),
+    ]
+    for label, blocks in samples:
+        kilobytes = sum(len(block) for block in blocks) / 1024
+        before = measure(legacy_detect, blocks, args.repeat)
+        after = measure(detect_sass, blocks, args.repeat)
+        print(f"  {label:<13} {len(blocks):5d} x {kilobytes / len(blocks):7.1f} KB   "
+              f"before {before * 1000:9.2f} ms   after {after * 1000:7.2f} ms   ({before / after:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Throughput of the single-pass scanner against the old chain of regex passes
+
+Usage: python benchmarks/bench_scanner.py [--size-mb 8] [--inline-styles 200]
+
+The "before" numbers come from a copy of the regex chain that
+``extract_html`` used before the scanner existed (inline styles, scripts,
+styles, then two slice-and-concatenate reference inserts).
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extractor.scanner import scan_html  # noqa: E402
+
+
+def legacy_extract(html, extract_inline_styles=True):
+    """The pre-scanner sequence of whole-document passes"""
+    if extract_inline_styles:
+        inline_styles = re.findall(r'style\s*=\s*["\']([^"\']*)["\']', html, re.IGNORECASE)
+        for style in inline_styles:
+            if style.strip():
+                html = re.sub(r'\s*style\s*=\s*["\'][^"\']*["\']', '', html, flags=re.IGNORECASE)
+
+    scripts = []
+
+    def script_repl(match):
+        if re.search(r'src\s*=', match.group(1), re.IGNORECASE) or not match.group(2).strip():
+            return match.group(0)
+        scripts.append(match.group(2))
+        return ''
+
+    html = re.sub(r'<script([^>]*?)>(.*?)</script>', script_repl, html, flags=re.IGNORECASE | re.DOTALL)
+
+    styles = []
+
+    def style_repl(match):
+        if not match.group(1).strip():
+            return match.group(0)
+        styles.append(match.group(1))
+        return ''
+
+    html = re.sub(r'<style[^>]*?>(.*?)</style>', style_repl, html, flags=re.IGNORECASE | re.DOTALL)
+
+    head_match = re.search(r'<head[^>]*>', html, re.IGNORECASE)
+    if head_match:
+        html = html[:head_match.end()] + '\n    <link rel="stylesheet" href="style.css">' + html[head_match.end():]
+    body_match = re.search(r'</body>', html, re.IGNORECASE)
+    if body_match:
+        html = html[:body_match.start()] + '\n    <script src="script.js"></script>\n' + html[body_match.start():]
+    return html
+
+
+def scanner_extract(html, extract_inline_styles=True):
+    """The single-pass scanner followed by one render"""
+    scan = scan_html(html, extract_inline_styles=extract_inline_styles)
+    return scan.render('\n    <link rel="stylesheet" href="style.css">',
+                       '\n    <script src="script.js"></script>\n')
+
+
+def build_page(size_mb, inline_styles):
+    """Generate a large page mixing markup, scripts and styles"""
+    chunks = ['<!DOCTYPE html>\n<html>\n<head>\n<title>Bench</title>\n',
+              '<style>\nbody { margin: 0; font-family: sans-serif; }\n</style>\n</head>\n<body>\n']
+    row = ('<div class="row"><a href="/item/{0}" title="Item {0}">Item {0}</a>'
+           '<span class="price">{0}.99</span></div>\n')
+    target = size_mb * 1024 * 1024
+    size = sum(len(c) for c in chunks)
+    i = 0
+    styled_every = max(1, int(target / 80 / max(inline_styles, 1)))
+    styled = 0
+    while size < target:
+        if inline_styles and styled < inline_styles and i % styled_every == 0:
+            chunk = f'<p style="color: #{i % 999:03d}; margin: 0 auto">Styled {i}</p>\n'
+            styled += 1
+        elif i % 500 == 0:
+            chunk = f'<script>\nwindow.counter{i} = {i};\n</script>\n<style>.c{i} {{ color: red; }}</style>\n'
+        else:
+            chunk = row.format(i)
+        chunks.append(chunk)
+        size += len(chunk)
+        i += 1
+    chunks.append('<script src="app.js"></script>\n</body>\n</html>\n')
+    return ''.join(chunks)
+
+
+def measure(func, html, repeat):
+    """Return the best wall time of ``repeat`` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=8)
+    parser.add_argument('--inline-styles', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    html = build_page(args.size_mb, args.inline_styles)
+    megabytes = len(html) / (1024 * 1024)
+    print(f"Page: {megabytes:.1f} MB, {args.inline_styles} styled elements")
+
+    for extract_inline in (False, True):
+        before = measure(lambda h: legacy_extract(h, extract_inline), html, args.repeat)
+        after = measure(lambda h: scanner_extract(h, extract_inline), html, args.repeat)
+        label = "with inline styles" if extract_inline else "without inline styles"
+        print(f"  {label:<24} before {megabytes / before:8.1f} MB/s   "
+              f"after {megabytes / after:8.1f} MB/s   ({before / after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Per-page latency of the extraction server against one CLI call per page
+
+Usage: python benchmarks/bench_server.py [--pages 20] [--page-kb 8] [--requests 200]
+       [--cli-runs 10] [--jobs 1] [--clients 1]
+
+Generates small pages from benchmarks/corpus.py, then times:
+
+* ``cli``: ``python -m html_extractor PAGE -o OUT``, one process per page,
+  as a build system calling the extractor would
+* ``server``: ``POST /extract`` to a server started in this process on a
+  free port, each client keeping its connection open
+
+Prints the median, p90 and p99 latency of both and the server's own
+metrics. With ``--clients`` above 1 the pages are sent concurrently and
+the throughput is printed as well.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import generate_corpus  # noqa: E402
+from html_extractor import ExtractionOptions  # noqa: E402
+from html_extractor.server import ExtractionService, make_server  # noqa: E402
+
+
+def _summary(seconds):
+    values = sorted(seconds)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000  # noqa: E731
+    return f"median {statistics.median(values) * 1000:8.2f} ms   p90 {pick(0.9):8.2f} ms   p99 {pick(0.99):8.2f} ms"
+
+
+def time_cli(pages, out_dir, runs):
+    """Return the wall time of ``runs`` CLI calls, one page each"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'html_extractor', pages[i % len(pages)], '-o', out_dir, '-q'],
+                       check=True, env=env, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def time_server(port, token, pages, out_dir, requests, clients):
+    """Return the latency of every request and the total wall time"""
+    def client(indexes):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        times = []
+        for i in indexes:
+            body = json.dumps({'input': pages[i % len(pages)], 'output': out_dir})
+            start = time.perf_counter()
+            conn.request('POST', '/extract', body, {'Content-Type': 'application/json',
+                                                   'Authorization': f'Bearer {token}'})
+            response = conn.getresponse()
+            response.read()
+            times.append(time.perf_counter() - start)
+            if response.status != 200:
+                raise RuntimeError(f"POST /extract answered {response.status}")
+        conn.close()
+        return times
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(client, [range(c, requests, clients) for c in range(clients)]))
+    return [t for times in results for t in times], time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--page-kb', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='jobs sent to the server (default: 200)')
+    parser.add_argument('--cli-runs', type=int, default=10, help='CLI calls timed (default: 10)')
+    parser.add_argument('--jobs', type=int, default=1, help='server worker processes (default: 1, a thread)')
+    parser.add_argument('--clients', type=int, default=1, help='concurrent connections (default: 1)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='bench_server_') as tmp:
+        corpus = generate_corpus(os.path.join(tmp, 'corpus'), pages=args.pages, huge_mb=0, page_kb=args.page_kb)
+        pages = [path for profile, paths in corpus.items() if profile != 'sass' for path in paths]
+        out_dir = os.path.join(tmp, 'out')
+
+        cli = time_cli(pages, out_dir, args.cli_runs) if args.cli_runs > 0 else []
+
+        service = ExtractionService(ExtractionOptions(), jobs=args.jobs, queue_size=max(args.clients, 1) * 2)
+        token = secrets.token_urlsafe(32)
+        server = make_server(service, port=0, token=token)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            latencies, wall = time_server(server.server_address[1], token, pages, out_dir, args.requests, args.clients)
+            metrics = service.metrics()
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+    if cli:
+        print(f"{'cli':<8}{_summary(cli)}   ({len(cli)} calls)")
+    print(f"{'server':<8}{_summary(latencies)}   ({len(latencies)} jobs, {args.clients} client(s), "
+          f"workers: {metrics['workers']} {metrics['worker_kind']})")
+    if cli:
+        print(f"Median speedup: {statistics.median(cli) / statistics.median(latencies):.0f}x")
+    if args.clients > 1:
+        print(f"Throughput: {len(latencies) / wall:.0f} pages/s ({wall / len(latencies) * 1000:.2f} ms/page)")
+    print(f"Server-side: latency {metrics['latency_ms']}, queue wait {metrics['queue_wait_ms']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
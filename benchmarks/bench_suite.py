@@ -0,0 +1,220 @@
+"""Per-stage benchmark of the extraction pipeline over a synthetic corpus
+
+Usage: python benchmarks/bench_suite.py [--corpus DIR] [--pages 20] [--huge-mb 16]
+       [--repeat 3] [--output results.json] [--baseline FILE] [--save-baseline]
+
+Generates the corpus from benchmarks/corpus.py (or reuses ``--corpus``),
+then times every stage separately for each profile, best of ``--repeat``:
+
+* ``read``: reading the bytes and detecting/decoding the encoding
+* ``scan``: the single pass that finds script and style blocks (the two
+  cannot be timed apart since they share one scan)
+* ``inline_styles``: what turning ``style`` attributes into classes adds
+  to that pass
+* ``sass_detect`` and ``sass``: Sass detection, and compilation without
+  the cache (only with libsass installed)
+* ``minify``: JavaScript and CSS minification
+* ``render``: assembling index.html with the new references
+* ``write``: writing index.html and the assets
+* ``analyze``: ProjectAnalyzer's structure and reference checks
+* ``end_to_end``: ``extract_html`` as a whole, which gives files/s
+
+Results are printed as MB/s and saved as JSON. With a baseline, every
+stage more than ``--tolerance`` slower than in the baseline is flagged and
+the exit status is 1.
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import generate_corpus  # noqa: E402
+from html_extractor import ExtractionEngine, ExtractionOptions, ProjectAnalyzer  # noqa: E402
+from html_extractor.minify import minify_css, minify_js  # noqa: E402
+from html_extractor.output import write_text  # noqa: E402
+from html_extractor.sass_cache import SASS_AVAILABLE, SassCompiler  # noqa: E402
+from html_extractor.sass_detect import detect_sass  # noqa: E402
+from html_extractor.scanner import scan_html  # noqa: E402
+
+RESULTS_VERSION = 1
+
+STAGES = ('read', 'scan', 'inline_styles', 'sass_detect', 'sass', 'minify', 'render', 'write',
+          'analyze', 'end_to_end')
+
+_HEAD_REFS = '\n    <link rel="stylesheet" href="style.css">'
+_BODY_REFS = '\n    <script src="script.js"></script>\n'
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return time.perf_counter() - start, value
+
+
+def time_file(engine, html_file, work_dir):
+    """Return ``{stage: seconds}`` for one page"""
+    times = dict.fromkeys(STAGES, 0.0)
+
+    times['read'], (_, html, encoding) = _timed(engine._read_html_file, html_file)
+    times['scan'], _ = _timed(scan_html, html, False)
+    with_inline, scan = _timed(scan_html, html, True)
+    times['inline_styles'] = max(with_inline - times['scan'], 0.0)
+
+    times['sass_detect'], features = _timed(lambda: [detect_sass(css) for css in scan.styles])
+    sass_blocks = [css for css, feature in zip(scan.styles, features) if feature]
+    if SASS_AVAILABLE and sass_blocks:
+        compiler = SassCompiler(None, 0)
+        try:
+            times['sass'], _ = _timed(compiler.compile, '\n\n'.join(sass_blocks))
+        except Exception:
+            pass  # Synthetic Sass may use functions a given libsass lacks; not a speed question
+
+    def minify():
+        scripts = [minify_js(code) for code in scan.scripts]
+        styles = [minify_css(css, sass=bool(feature)) for css, feature in zip(scan.styles, features)]
+        return scripts, styles
+
+    times['minify'], (scripts, styles) = _timed(minify)
+    times['render'], rendered = _timed(scan.render, _HEAD_REFS, _BODY_REFS)
+
+    project = os.path.join(work_dir, 'project')
+    os.makedirs(project, exist_ok=True)
+
+    def write():
+        write_text(os.path.join(project, 'index.html'), rendered, 'utf-8', 'xmlcharrefreplace')
+        write_text(os.path.join(project, 'script.js'), '\n\n'.join(scripts))
+        write_text(os.path.join(project, 'style.css'), '\n\n'.join(styles + scan.inline_styles.rules()))
+
+    times['write'], _ = _timed(write)
+    shutil.rmtree(project)
+
+    times['end_to_end'], result = _timed(engine.extract_html, html_file, os.path.join(work_dir, 'e2e'))
+    times['analyze'], _ = _timed(ProjectAnalyzer.analyze_project, result.out_dir)
+    shutil.rmtree(os.path.join(work_dir, 'e2e'))
+    return times
+
+
+def run(corpus, repeat, work_dir):
+    """Return the per-profile results for ``{profile: [paths]}``"""
+    engine = ExtractionEngine(ExtractionOptions(minify_output=True, preserve_comments=False,
+                                                deterministic_output=True, sass_cache_mb=0))
+    results = {}
+    for profile, paths in corpus.items():
+        best = dict.fromkeys(STAGES, float('inf'))
+        for _ in range(repeat):
+            totals = dict.fromkeys(STAGES, 0.0)
+            for path in paths:
+                for stage, seconds in time_file(engine, path, work_dir).items():
+                    totals[stage] += seconds
+            best = {stage: min(best[stage], totals[stage]) for stage in STAGES}
+
+        size = sum(os.path.getsize(p) for p in paths)
+        megabytes = size / (1024 * 1024)
+        results[profile] = {
+            'files': len(paths),
+            'bytes': size,
+            'seconds': {stage: round(best[stage], 6) for stage in STAGES},
+            'mb_per_s': {stage: round(megabytes / best[stage], 2) for stage in STAGES if best[stage] > 0},
+            'files_per_s': round(len(paths) / best['end_to_end'], 2) if best['end_to_end'] > 0 else None,
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return ``(profile, stage, ratio)`` for every stage slower than the baseline allows"""
+    regressions = []
+    for profile, current in results.items():
+        previous = baseline.get('results', {}).get(profile)
+        if not previous or previous.get('bytes') != current['bytes']:
+            continue  # A different corpus is not comparable
+        for stage, seconds in current['seconds'].items():
+            before = previous['seconds'].get(stage)
+            # Stages under a millisecond are all noise
+            if before and max(before, seconds) > 0.001 and seconds > before * (1 + tolerance):
+                regressions.append((profile, stage, seconds / before))
+    return regressions
+
+
+def print_results(results):
+    columns = [stage for stage in STAGES if any(r['seconds'][stage] for r in results.values())]
+    print(f"{'MB/s':<14}" + ''.join(f"{stage:>14}" for stage in columns) + f"{'files/s':>10}")
+    for profile, result in results.items():
+        cells = ''.join(f"{result['mb_per_s'].get(stage, 0):14.1f}" for stage in columns)
+        print(f"{profile:<14}{cells}{result['files_per_s'] or 0:10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help='existing corpus folder (default: generate one in a temporary folder)')
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--page-kb', type=int, default=64)
+    parser.add_argument('--huge-mb', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json', help='where to save the results')
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='slowdown flagged as a regression (default: 0.15 = 15%%)')
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='html_extractor_bench_')
+    try:
+        if args.corpus:
+            corpus = {}
+            for profile in sorted(os.listdir(args.corpus)):
+                folder = os.path.join(args.corpus, profile)
+                if os.path.isdir(folder):
+                    corpus[profile] = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+        else:
+            corpus = generate_corpus(os.path.join(work_dir, 'corpus'), args.seed, args.pages,
+                                     args.huge_mb, args.page_kb)
+        results = run(corpus, args.repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    report = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sass_available': SASS_AVAILABLE,
+        'corpus': {'path': args.corpus, 'seed': args.seed, 'pages': args.pages,
+                   'page_kb': args.page_kb, 'huge_mb': args.huge_mb},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with (run with --save-baseline to create one)")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for profile, stage, ratio in regressions:
+        print(f"  REGRESSION {profile}/{stage}: {ratio:.2f}x the baseline time")
+    if not regressions:
+        print(f"No stage more than {args.tolerance:.0%} slower than the baseline from {baseline.get('created')}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
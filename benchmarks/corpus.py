@@ -0,0 +1,136 @@
+"""Reproducible synthetic HTML corpus for the benchmark suite
+
+Usage: python benchmarks/corpus.py OUT_DIR [--pages 20] [--huge-mb 16] [--seed 1]
+
+Every page is generated from a seeded random.Random, so the same seed and
+sizes always give byte-identical files. One folder per profile:
+
+* ``inline_styles``: markup where most elements carry a ``style`` attribute
+* ``scripts``: many small inline ``<script>`` blocks, with comments
+* ``sass``: ``<style>`` blocks full of variables, nesting and mixins
+* ``huge``: one large page mixing all of the above
+* ``encodings``: the same kind of page in Windows-1252 (declared by
+  ``<meta charset>``) and in UTF-16 with a BOM
+"""
+import argparse
+import os
+import random
+
+PROFILES = ('inline_styles', 'scripts', 'sass', 'huge', 'encodings')
+
+_WORDS = ('alpha', 'beta', 'gamma', 'delta', 'card', 'item', 'price', 'title', 'menu', 'panel',
+          'header', 'footer', 'content', 'sidebar', 'button', 'label', 'café', 'naïve')
+_PROPERTIES = ('color', 'margin', 'padding', 'font-size', 'border', 'background', 'line-height')
+
+
+def _word(rng):
+    return rng.choice(_WORDS)
+
+
+def _declarations(rng, count):
+    return '; '.join(f"{rng.choice(_PROPERTIES)}: {rng.randint(0, 40)}px" for _ in range(count))
+
+
+def _row(rng, i, styled):
+    style = f' style="{_declarations(rng, rng.randint(1, 4))}"' if styled else ''
+    return (f'<div class="{_word(rng)} {_word(rng)}-{i % 17}"{style}>'
+            f'<a href="/{_word(rng)}/{i}" title="{_word(rng)} {i}">{_word(rng)} {i}</a>'
+            f'<span>{rng.randint(1, 999)}.99</span></div>\n')
+
+
+def _script(rng, i):
+    return (f'<script>\n// {_word(rng)} widget {i}\nvar state{i} = {{ name: "{_word(rng)}", '
+            f'count: {rng.randint(0, 99)} }};\n/* update the {_word(rng)} */\n'
+            f'function update{i}(value) {{\n    if (value > {i}) {{ return value / 2; }}\n'
+            f'    return "{_word(rng)}/{i}".split("/");\n}}\n</script>\n')
+
+
+def _css(rng, i):
+    return (f'<style>\n/* {_word(rng)} */\n.{_word(rng)}-{i} {{ {_declarations(rng, 3)}; }}\n'
+            f'#{_word(rng)}{i} > a:hover {{ {_declarations(rng, 2)}; }}\n</style>\n')
+
+
+def _sass(rng, i):
+    return (f'<style>\n$base-{i}: {rng.randint(8, 24)}px;\n'
+            f'@mixin pad-{i}($n) {{ padding: $n * 2; }}\n'
+            f'.{_word(rng)}-{i} {{\n    font-size: $base-{i};\n'
+            f'    .{_word(rng)} {{ {_declarations(rng, 2)}; @include pad-{i}(3px); }}\n'
+            f'    &:hover {{ color: darken(#{rng.randint(0, 0xffffff):06x}, 10%); }}\n}}\n</style>\n')
+
+
+def build_page(rng, target_bytes, styled_ratio=0.1, script_every=50, css_every=60, sass_every=0,
+               charset='utf-8'):
+    """Return the text of one page of roughly ``target_bytes`` characters"""
+    chunks = [f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="{charset}">\n<title>{_word(rng)}</title>\n',
+              _css(rng, 0), '</head>\n<body>\n']
+    size = sum(len(c) for c in chunks)
+    i = 1
+    while size < target_bytes:
+        if script_every and i % script_every == 0:
+            chunk = _script(rng, i)
+        elif css_every and i % css_every == 0:
+            chunk = _css(rng, i)
+        elif sass_every and i % sass_every == 0:
+            chunk = _sass(rng, i)
+        else:
+            chunk = _row(rng, i, rng.random() < styled_ratio)
+        chunks.append(chunk)
+        size += len(chunk)
+        i += 1
+    chunks.append('<script src="app.js"></script>\n</body>\n</html>\n')
+    return ''.join(chunks)
+
+
+def generate_pages(seed=1, pages=20, huge_mb=16, page_kb=64):
+    """Yield ``(profile, file_name, data)`` for the whole corpus, as encoded bytes"""
+    rng = random.Random(seed)
+    target = page_kb * 1024
+    for n in range(pages):
+        yield 'inline_styles', f'styled_{n:03d}.html', build_page(
+            rng, target, styled_ratio=0.9, script_every=0, css_every=0).encode('utf-8')
+    for n in range(pages):
+        yield 'scripts', f'scripts_{n:03d}.html', build_page(
+            rng, target, styled_ratio=0, script_every=3, css_every=0).encode('utf-8')
+    for n in range(pages):
+        yield 'sass', f'sass_{n:03d}.html', build_page(
+            rng, target, styled_ratio=0, script_every=0, css_every=0, sass_every=3).encode('utf-8')
+    if huge_mb > 0:
+        yield 'huge', 'huge.html', build_page(
+            rng, huge_mb * 1024 * 1024, styled_ratio=0.2, sass_every=97).encode('utf-8')
+    for n in range(max(pages // 2, 1)):
+        yield 'encodings', f'cp1252_{n:03d}.html', build_page(
+            rng, target, styled_ratio=0.3, charset='windows-1252').encode('cp1252')
+        yield 'encodings', f'utf16_{n:03d}.html', build_page(
+            rng, target, styled_ratio=0.3).encode('utf-16')
+
+
+def generate_corpus(out_dir, seed=1, pages=20, huge_mb=16, page_kb=64):
+    """Write the corpus under ``out_dir`` and return ``{profile: [paths]}``"""
+    corpus = {profile: [] for profile in PROFILES}
+    for profile, name, data in generate_pages(seed, pages, huge_mb, page_kb):
+        folder = os.path.join(out_dir, profile)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        corpus[profile].append(path)
+    return {profile: paths for profile, paths in corpus.items() if paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--pages', type=int, default=20, help='pages per profile')
+    parser.add_argument('--page-kb', type=int, default=64, help='size of each regular page')
+    parser.add_argument('--huge-mb', type=int, default=16, help='size of the huge page, 0 to skip it')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.out_dir, args.seed, args.pages, args.huge_mb, args.page_kb)
+    for profile, paths in corpus.items():
+        size = sum(os.path.getsize(p) for p in paths)
+        print(f"  {profile:<14} {len(paths):4d} files  {size / (1024 * 1024):8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,27 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 import os
-import re
-from pathlib import Path
+import queue
 import sys
 import threading
 from datetime import datetime
 import json
-import shutil
 
-try:
-    import sass
-    SASS_AVAILABLE = True
-except ImportError:
-    SASS_AVAILABLE = False
+from html_extractor import SASS_AVAILABLE, ExtractionEngine, ExtractionOptions
+from html_extractor.archive import ARCHIVE_FORMATS, DEFAULT_ARCHIVE_LEVEL
+from html_extractor.cancel import ExtractionCancelled
+from html_extractor.output import BACKUP_MODES
+from html_extractor import ProjectAnalyzer  # noqa: F401  (kept importable from this module)
 
 class HTMLExtractorGUI(tk.Tk):
+    # How often the Tk main loop applies events posted by the extraction thread,
+    # and how many it applies per tick so the window stays responsive
+    UI_POLL_MS = 50
+    UI_EVENTS_PER_TICK = 5000
+    # Lines kept on screen; the full history goes to the JSONL run log
+    LOG_MAX_LINES = 5000
+    RUN_LOGS_KEPT = 20
+
     def __init__(self):
         super().__init__()
         self.title("HTML JS/CSS/Sass Extractor v2.1 - Enhanced")
@@ -42,13 +48,31 @@ class HTMLExtractorGUI(tk.Tk):
         self.batch_mode = tk.BooleanVar(value=False)
         self.create_project_folder = tk.BooleanVar(value=True)
         self.combine_files = tk.BooleanVar(value=True)
+        self.workers = tk.IntVar(value=1)
+        self.file_timeout = tk.IntVar(value=0)
+        self.recursive = tk.BooleanVar(value=True)
+        self.incremental = tk.BooleanVar(value=False)
+        self.share_common_blocks = tk.BooleanVar(value=False)
+        self.analyze_output = tk.BooleanVar(value=False)
+        self.deterministic_output = tk.BooleanVar(value=False)
+        self.backup_mode = tk.StringVar(value="copy")
+        self.output_mode = tk.StringVar(value="folders")
+        self.archive_level = tk.IntVar(value=DEFAULT_ARCHIVE_LEVEL)
+        self.watch_mode = tk.BooleanVar(value=False)
+        self.include_patterns = tk.StringVar(value="*.html, *.htm")
+        self.exclude_patterns = tk.StringVar(value="")
         
         # Progress tracking
         self.progress_var = tk.DoubleVar()
         self.is_extracting = False
         
+        # Log, status and progress updates from any thread go through this queue
+        self.ui_events = queue.Queue()
+        self.last_run_log = None
+        
         # Build the GUI
         self._build_widgets()
+        self.after(self.UI_POLL_MS, self._drain_ui_events)
         
         # Load previous settings
         self._load_settings()
@@ -141,6 +165,9 @@ class HTMLExtractorGUI(tk.Tk):
         ttk.Checkbutton(options_grid, text="Preserve comments", 
                        variable=self.preserve_comments).grid(row=1, column=1, sticky=tk.W, padx=(0, 20))
         
+        ttk.Checkbutton(options_grid, text="Watch for changes afterwards (Stop to end)", 
+                       variable=self.watch_mode).grid(row=2, column=0, columnspan=2, sticky=tk.W, padx=(0, 20))
+        
         if not SASS_AVAILABLE:
             sass_warning = ttk.Label(quick_options_frame, 
                                    text="⚠ libsass not installed - install with: pip install libsass", 
@@ -221,6 +248,28 @@ class HTMLExtractorGUI(tk.Tk):
         ttk.Checkbutton(org_frame, text="Combine multiple scripts/styles into single files", 
                        variable=self.combine_files).pack(anchor=tk.W, pady=5)
         
+        ttk.Checkbutton(org_frame, text="Include subfolders in batch mode (output mirrors the folder tree)", 
+                       variable=self.recursive).pack(anchor=tk.W, pady=5)
+        
+        ttk.Checkbutton(org_frame, text="Skip files unchanged since the last batch run (incremental)", 
+                       variable=self.incremental).pack(anchor=tk.W, pady=5)
+        
+        ttk.Checkbutton(org_frame, text="Move scripts/styles repeated across pages to shared common.js/common.css", 
+                       variable=self.share_common_blocks).pack(anchor=tk.W, pady=5)
+        
+        ttk.Checkbutton(org_frame, text="Check every extracted project and its references after a batch", 
+                       variable=self.analyze_output).pack(anchor=tk.W, pady=5)
+        
+        patterns_grid = ttk.Frame(org_frame)
+        patterns_grid.pack(fill=tk.X, pady=5)
+        patterns_grid.columnconfigure(1, weight=1)
+        ttk.Label(patterns_grid, text="Include patterns:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(patterns_grid, textvariable=self.include_patterns).grid(row=0, column=1, sticky=tk.EW, padx=(10, 0), pady=2)
+        ttk.Label(patterns_grid, text="Exclude patterns:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(patterns_grid, textvariable=self.exclude_patterns).grid(row=1, column=1, sticky=tk.EW, padx=(10, 0), pady=2)
+        ttk.Label(patterns_grid, text="Comma-separated globs matched against file/folder names or relative paths, e.g. drafts, */old/*.html", 
+                  foreground="gray").grid(row=2, column=1, sticky=tk.W, padx=(10, 0))
+        
         # File naming explanation
         naming_info = ttk.Label(org_frame, text="Standard filenames: index.html, style.css, script.js", 
                                foreground="gray")
@@ -242,6 +291,45 @@ class HTMLExtractorGUI(tk.Tk):
         ttk.Checkbutton(advanced_frame, text="Create backup of original HTML file", 
                        variable=self.create_backup).pack(anchor=tk.W, pady=5)
         
+        backup_row = ttk.Frame(advanced_frame)
+        backup_row.pack(anchor=tk.W, pady=5)
+        ttk.Label(backup_row, text="Backup method:").pack(side=tk.LEFT)
+        ttk.Combobox(backup_row, values=BACKUP_MODES, state="readonly", width=10,
+                     textvariable=self.backup_mode).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(backup_row, text="(hardlink/reflink fall back to copy where unsupported)",
+                  foreground="gray").pack(side=tk.LEFT, padx=(10, 0))
+        
+        ttk.Checkbutton(advanced_frame, text="Deterministic output (no timestamps, unchanged files are not rewritten)", 
+                       variable=self.deterministic_output).pack(anchor=tk.W, pady=5)
+        
+        # One archive instead of a folder per page
+        archive_row = ttk.Frame(advanced_frame)
+        archive_row.pack(anchor=tk.W, pady=5)
+        ttk.Label(archive_row, text="Write output as:").pack(side=tk.LEFT)
+        ttk.Combobox(archive_row, values=("folders",) + ARCHIVE_FORMATS, state="readonly", width=10,
+                     textvariable=self.output_mode).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(archive_row, text="Zip compression level:").pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Spinbox(archive_row, from_=0, to=9, width=3,
+                    textvariable=self.archive_level).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(archive_row, text="(zip/tar: one extracted.zip/.tar in the output folder)",
+                  foreground="gray").pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Parallel batch processing
+        workers_row = ttk.Frame(advanced_frame)
+        workers_row.pack(anchor=tk.W, pady=5)
+        ttk.Label(workers_row, text="Worker processes for batch mode:").pack(side=tk.LEFT)
+        ttk.Spinbox(workers_row, from_=0, to=max(os.cpu_count() or 1, 1) * 4, width=5,
+                    textvariable=self.workers).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(workers_row, text="(0 = one per CPU core)", foreground="gray").pack(side=tk.LEFT, padx=(10, 0))
+        
+        timeout_row = ttk.Frame(advanced_frame)
+        timeout_row.pack(anchor=tk.W, pady=5)
+        ttk.Label(timeout_row, text="Time limit per file (seconds):").pack(side=tk.LEFT)
+        ttk.Spinbox(timeout_row, from_=0, to=3600, width=5,
+                    textvariable=self.file_timeout).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(timeout_row, text="(0 = no limit; slower files are skipped and reported)",
+                  foreground="gray").pack(side=tk.LEFT, padx=(10, 0))
+        
         # Reset settings button
         ttk.Button(settings_container, text="Reset to Defaults", 
                   command=self.reset_settings).pack(pady=20)
@@ -255,9 +343,9 @@ class HTMLExtractorGUI(tk.Tk):
             )
             if dir_path:
                 self.html_path.set(dir_path)
-                html_files = list(Path(dir_path).glob("*.html")) + list(Path(dir_path).glob("*.htm"))
                 self.log(f"Selected folder: {dir_path}", "info")
-                self.log(f"Found {len(html_files)} HTML files", "info")
+                scope = "and its subfolders " if self.recursive.get() else ""
+                self.log(f"HTML files in this folder {scope}will be extracted as they are found", "info")
         else:
             file_types = [
                 ("HTML files", "*.html *.htm"),
@@ -284,7 +372,7 @@ class HTMLExtractorGUI(tk.Tk):
 
     def clear_log(self):
         """Clear the log area"""
-        self.log_area.delete(1.0, tk.END)
+        self.ui_events.put(('clear',))
         self.update_status("Log cleared")
 
     def save_log(self):
@@ -299,6 +387,8 @@ class HTMLExtractorGUI(tk.Tk):
                 content = self.log_area.get(1.0, tk.END)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(f"HTML Extractor Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                    if self.last_run_log:
+                        f.write(f"Last {self.LOG_MAX_LINES} lines; full per-file run log: {self.last_run_log}\n")
                     f.write("=" * 60 + "\n\n")
                     f.write(content)
                 messagebox.showinfo("Success", f"Log saved to {file_path}")
@@ -306,25 +396,86 @@ class HTMLExtractorGUI(tk.Tk):
             messagebox.showerror("Error", f"Failed to save log: {e}")
 
     def log(self, msg, tag="normal"):
-        """Add message to log area with optional color tag"""
+        """Queue a message for the log area with optional color tag (any thread)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_msg = f"[{timestamp}] {msg}\n"
-        
-        self.log_area.insert(tk.END, formatted_msg, tag)
-        self.log_area.see(tk.END)
-        self.update_idletasks()
+        self.ui_events.put(('log', f"[{timestamp}] {msg}\n", tag))
 
     def update_status(self, status):
-        """Update status bar"""
-        self.status_bar.config(text=status)
-        self.update_idletasks()
+        """Queue a status bar update (any thread)"""
+        self.ui_events.put(('status', status))
 
     def update_progress(self, value, text=""):
-        """Update progress bar and label"""
-        self.progress_var.set(value)
-        if text:
-            self.progress_label.config(text=text)
-        self.update_idletasks()
+        """Queue a progress bar and label update (value None = total not known yet)"""
+        self.ui_events.put(('progress', value, text))
+
+    def _call_in_ui(self, func):
+        """Run ``func`` on the Tk main loop, after the events queued before it"""
+        self.ui_events.put(('call', func))
+
+    def _drain_ui_events(self):
+        """Apply queued events to the widgets in one batch, then reschedule"""
+        log_chunks = []
+        status = progress_value = progress_text = None
+        steps = 0
+        try:
+            for _ in range(self.UI_EVENTS_PER_TICK):
+                event = self.ui_events.get_nowait()
+                kind = event[0]
+                if kind == 'log':
+                    log_chunks.extend(event[1:])
+                elif kind == 'status':
+                    status = event[1]
+                elif kind == 'progress':
+                    if event[1] is None:
+                        steps += 1
+                    else:
+                        progress_value, steps = event[1], 0
+                    progress_text = event[2] or progress_text
+                else:
+                    # Clears and calls keep their place relative to log lines
+                    self._flush_log(log_chunks)
+                    log_chunks = []
+                    if kind == 'clear':
+                        self.log_area.delete(1.0, tk.END)
+                    else:
+                        event[1]()
+        except queue.Empty:
+            pass
+        finally:
+            self._flush_log(log_chunks)
+            if status is not None:
+                self.status_bar.config(text=status)
+            if progress_value is not None:
+                self.progress_var.set(progress_value)
+            if steps:
+                self.progress_bar.step(steps)
+            if progress_text:
+                self.progress_label.config(text=progress_text)
+            self.after(self.UI_POLL_MS, self._drain_ui_events)
+
+    def _flush_log(self, log_chunks):
+        """Insert alternating text/tag pairs into the log area, keeping only recent lines"""
+        if not log_chunks:
+            return
+        if len(log_chunks) > 2 * self.LOG_MAX_LINES:
+            log_chunks = log_chunks[-2 * self.LOG_MAX_LINES:]
+        self.log_area.insert(tk.END, *log_chunks)
+        lines = int(self.log_area.index('end-1c').split('.')[0])
+        if lines > self.LOG_MAX_LINES:
+            self.log_area.delete('1.0', f'{lines - self.LOG_MAX_LINES + 1}.0')
+        self.log_area.see(tk.END)
+
+    def _new_run_log_path(self):
+        """Return a fresh run log path, removing the oldest logs beyond RUN_LOGS_KEPT"""
+        log_dir = os.path.join(os.path.expanduser("~"), ".html_extractor_logs")
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            old_logs = sorted(name for name in os.listdir(log_dir) if name.endswith('.jsonl'))
+            for name in old_logs[:max(0, len(old_logs) - self.RUN_LOGS_KEPT + 1)]:
+                os.remove(os.path.join(log_dir, name))
+        except OSError:
+            pass
+        return os.path.join(log_dir, f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl")
 
     def run_extraction_threaded(self):
         """Run extraction in a separate thread"""
@@ -343,16 +494,23 @@ class HTMLExtractorGUI(tk.Tk):
             messagebox.showwarning("No Output Directory", "Please select an output directory.")
             return
         
+        # Read widget state here: Tk variables belong to the main thread
+        options = self._collect_options()
+        batch = self.batch_mode.get()
+        watch = self.watch_mode.get()
+        self._save_settings()
+        options.run_log = self.last_run_log = self._new_run_log_path()
+        
         # Start extraction in thread
         self.is_extracting = True
         self.extract_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         
         self.extraction_thread = threading.Thread(target=self._run_extraction_worker, 
-                                                 args=(html_path, out_dir), daemon=True)
+                                                 args=(html_path, out_dir, options, batch, watch), daemon=True)
         self.extraction_thread.start()
 
-    def _run_extraction_worker(self, html_path, out_dir):
+    def _run_extraction_worker(self, html_path, out_dir, options, batch, watch=False):
         """Worker method for extraction"""
         try:
             start_time = datetime.now()
@@ -360,13 +518,14 @@ class HTMLExtractorGUI(tk.Tk):
             self.update_status("Extracting...")
             self.update_progress(0, "Initializing...")
             
-            # Save current settings
-            self._save_settings()
+            engine = ExtractionEngine(options, log=self.log,
+                                      progress=self.update_progress,
+                                      should_stop=lambda: not self.is_extracting)
             
-            if self.batch_mode.get() and os.path.isdir(html_path):
-                self._extract_batch(html_path, out_dir)
+            if batch and os.path.isdir(html_path):
+                engine.extract_batch(html_path, out_dir)
             else:
-                self._extract_single_file(html_path, out_dir)
+                engine.extract_single_file(html_path, out_dir)
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
@@ -375,54 +534,28 @@ class HTMLExtractorGUI(tk.Tk):
             self.update_status("Extraction completed successfully")
             self.update_progress(100, "Complete")
             
+            if watch and self.is_extracting:
+                # Re-extract saved files until Stop is pressed; no dialog afterwards
+                self.update_status("Watching for changes • press Stop to end")
+                engine.watch(html_path, out_dir)
+                self.update_status("Stopped watching")
+                return
+            
             # Show completion dialog in main thread
-            self.after(0, lambda: messagebox.showinfo("Success", 
-                                                     f"Extraction completed successfully!\nTime taken: {duration:.2f} seconds"))
+            self._call_in_ui(lambda: messagebox.showinfo("Success", 
+                                                        f"Extraction completed successfully!\nTime taken: {duration:.2f} seconds"))
             
+        except ExtractionCancelled:
+            self.update_progress(0, "Stopped")
         except Exception as e:
             error_msg = f"Error during extraction: {str(e)}"
             self.log(error_msg, "error")
             self.update_status("Extraction failed")
             self.update_progress(0, "Failed")
-            self.after(0, lambda: messagebox.showerror("Extraction Error", error_msg))
+            self._call_in_ui(lambda: messagebox.showerror("Extraction Error", error_msg))
         finally:
             self.is_extracting = False
-            self.after(0, self._reset_ui_state)
-
-    def _extract_batch(self, folder_path, out_dir):
-        """Extract multiple HTML files"""
-        html_files = list(Path(folder_path).glob("*.html")) + list(Path(folder_path).glob("*.htm"))
-        
-        if not html_files:
-            raise ValueError("No HTML files found in the selected folder")
-        
-        self.log(f"🔄 Starting batch extraction of {len(html_files)} files", "header")
-        
-        for i, html_file in enumerate(html_files):
-            if not self.is_extracting:  # Check if stopped
-                break
-                
-            progress = (i / len(html_files)) * 100
-            self.update_progress(progress, f"Processing {html_file.name}")
-            
-            self.log(f"\n📄 Processing: {html_file.name}", "info")
-            
-            try:
-                self.extract_html(str(html_file), out_dir)
-            except Exception as e:
-                self.log(f"❌ Failed to process {html_file.name}: {e}", "error")
-                continue
-
-    def _extract_single_file(self, html_file, out_dir):
-        """Extract single HTML file"""
-        if not os.path.isfile(html_file):
-            raise ValueError(f"The file '{html_file}' does not exist.")
-            
-        if not os.path.isdir(out_dir):
-            os.makedirs(out_dir, exist_ok=True)
-            self.log(f"📁 Created output directory: {out_dir}", "info")
-        
-        self.extract_html(html_file, out_dir)
+            self._call_in_ui(self._reset_ui_state)
 
     def stop_extraction(self):
         """Stop the extraction process"""
@@ -435,347 +568,61 @@ class HTMLExtractorGUI(tk.Tk):
         self.extract_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
 
-    def extract_html(self, html_file, base_out_dir):
-        """Enhanced HTML extraction with standardized file structure"""
-        self.log(f"🚀 Starting extraction from: {os.path.basename(html_file)}", "header")
-        
-        # Read HTML file with better encoding handling
-        html_content = self._read_html_file(html_file)
-        base_name = Path(html_file).stem
-        
-        # Create project folder if requested
-        if self.create_project_folder.get():
-            project_dir = os.path.join(base_out_dir, f"{base_name}_extracted")
-            os.makedirs(project_dir, exist_ok=True)
-            out_dir = project_dir
-            self.log(f"📁 Created project folder: {os.path.basename(project_dir)}", "folder")
-        else:
-            out_dir = base_out_dir
-        
-        self.log(f"📂 Output directory: {out_dir}", "info")
-        self.log("-" * 60)
-        
-        # Create backup if requested
-        if self.create_backup.get():
-            backup_path = os.path.join(out_dir, f"{base_name}_original.html")
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            self.log(f"💾 Created backup: {os.path.basename(backup_path)}", "info")
-        
-        # Initialize containers for extracted content
-        all_js_content = []
-        all_css_content = []
-        inline_styles_content = []
-        new_scripts = []
-        new_links = []
-        
-        # Extract inline styles if requested
-        if self.extract_inline_styles.get():
-            html_content, inline_styles = self._extract_inline_styles_content(html_content)
-            if inline_styles:
-                inline_styles_content.extend(inline_styles)
-                self.log(f"✅ Extracted {len(inline_styles)} inline styles", "success")
-        
-        # Extract script blocks
-        html_content, extracted_js = self._extract_scripts_content(html_content)
-        if extracted_js:
-            all_js_content.extend(extracted_js)
-            self.log(f"✅ Extracted {len(extracted_js)} script blocks", "success")
-        
-        # Extract style blocks
-        html_content, extracted_css, extracted_sass = self._extract_styles_content(html_content)
-        if extracted_css:
-            all_css_content.extend(extracted_css)
-            self.log(f"✅ Extracted {len(extracted_css)} CSS blocks", "success")
-        if extracted_sass:
-            self.log(f"✅ Extracted {len(extracted_sass)} Sass blocks", "success")
-        
-        # Save extracted files with standard names
-        files_created = self._save_extracted_files(out_dir, all_js_content, all_css_content, 
-                                                  inline_styles_content, extracted_sass)
-        
-        # Update HTML with new references
-        html_content = self._update_html_with_standard_refs(html_content, files_created)
-        
-        # Save updated HTML as index.html
-        self._save_index_html(html_content, out_dir)
-        
-        # Generate summary
-        self._log_extraction_summary_enhanced(files_created, out_dir, base_name)
-
-    def _read_html_file(self, html_file):
-        """Read HTML file with encoding detection"""
-        encodings = ['utf-8', 'iso-8859-1', 'cp1252', 'ascii']
-        
-        for encoding in encodings:
-            try:
-                with open(html_file, 'r', encoding=encoding) as f:
-                    content = f.read()
-                if encoding != 'utf-8':
-                    self.log(f"⚠ File read with {encoding} encoding", "warning")
-                return content
-            except UnicodeDecodeError:
-                continue
-        
-        raise Exception("Cannot decode HTML file with any supported encoding")
-
-    def _extract_inline_styles_content(self, html_content):
-        """Extract inline styles and return cleaned HTML and styles list"""
-        inline_styles = re.findall(r'style\s*=\s*["\']([^"\']*)["\']', html_content, re.IGNORECASE)
-        
-        if not inline_styles:
-            return html_content, []
-        
-        # Clean styles and remove from HTML
-        cleaned_styles = []
-        for style in inline_styles:
-            if style.strip():
-                cleaned_styles.append(style.strip())
-                # Remove inline style attributes
-                html_content = re.sub(r'\s*style\s*=\s*["\'][^"\']*["\']', '', html_content, flags=re.IGNORECASE)
-        
-        return html_content, cleaned_styles
-
-    def _extract_scripts_content(self, html_content):
-        """Extract JavaScript content and return cleaned HTML and scripts list"""
-        scripts = []
-        
-        def script_repl(match):
-            full_tag = match.group(0)
-            attributes = match.group(1)
-            js_code = match.group(2)
-            
-            # Skip external scripts
-            if re.search(r'src\s*=', attributes, re.IGNORECASE):
-                return full_tag
-            
-            # Skip empty scripts
-            if not js_code.strip():
-                return full_tag
-            
-            scripts.append(self._process_javascript(js_code))
-            return ''  # Remove the script tag
-        
-        cleaned_html = re.sub(r'<script([^>]*?)>(.*?)</script>', script_repl, html_content, 
-                             flags=re.IGNORECASE | re.DOTALL)
-        
-        return cleaned_html, scripts
+    def _collect_options(self):
+        """Build engine options from the current widget state"""
+        return ExtractionOptions(
+            convert_sass=self.convert_sass.get(),
+            minify_output=self.minify_output.get(),
+            preserve_comments=self.preserve_comments.get(),
+            create_backup=self.create_backup.get(),
+            extract_inline_styles=self.extract_inline_styles.get(),
+            create_project_folder=self.create_project_folder.get(),
+            combine_files=self.combine_files.get(),
+            workers=self._get_workers(),
+            file_timeout=self._get_file_timeout(),
+            recursive=self.recursive.get(),
+            incremental=self.incremental.get(),
+            share_common_blocks=self.share_common_blocks.get(),
+            analyze_output=self.analyze_output.get(),
+            deterministic_output=self.deterministic_output.get(),
+            backup_mode=self.backup_mode.get(),
+            archive=self.output_mode.get() if self.output_mode.get() in ARCHIVE_FORMATS else '',
+            archive_level=self._get_archive_level(),
+            include_patterns=self._split_patterns(self.include_patterns.get()) or ["*.html", "*.htm"],
+            exclude_patterns=self._split_patterns(self.exclude_patterns.get()),
+        )
 
-    def _extract_styles_content(self, html_content):
-        """Extract CSS/Sass content and return cleaned HTML and styles lists"""
-        css_styles = []
-        sass_styles = []
-        
-        def style_repl(match):
-            css_code = match.group(1)
-            
-            if not css_code.strip():
-                return match.group(0)
-            
-            if self._detect_sass(css_code):
-                sass_styles.append(self._process_stylesheet(css_code))
-            else:
-                css_styles.append(self._process_stylesheet(css_code))
-            
-            return ''  # Remove the style tag
-        
-        cleaned_html = re.sub(r'<style[^>]*?>(.*?)</style>', style_repl, html_content, 
-                             flags=re.IGNORECASE | re.DOTALL)
-        
-        return cleaned_html, css_styles, sass_styles
-
-    def _save_extracted_files(self, out_dir, js_content, css_content, inline_styles, sass_content):
-        """Save extracted content to standardized files"""
-        files_created = {
-            'js': False,
-            'css': False,
-            'sass': False
-        }
-        
-        # Combine and save JavaScript
-        if js_content:
-            combined_js = '\n\n'.join(js_content)
-            js_path = os.path.join(out_dir, 'script.js')
-            with open(js_path, 'w', encoding='utf-8') as f:
-                f.write(f"// Combined JavaScript - Generated by HTML Extractor\n// {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                f.write(combined_js)
-            files_created['js'] = True
-            self.log(f"📄 Created: script.js", "success")
-        
-        # Combine and save CSS (including inline styles)
-        all_css = css_content + inline_styles
-        if all_css:
-            combined_css = '\n\n'.join(all_css)
-            css_path = os.path.join(out_dir, 'style.css')
-            with open(css_path, 'w', encoding='utf-8') as f:
-                f.write(f"/* Combined CSS - Generated by HTML Extractor */\n/* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} */\n\n")
-                f.write(combined_css)
-            files_created['css'] = True
-            self.log(f"📄 Created: style.css", "success")
-        
-        # Save Sass if present
-        if sass_content:
-            combined_sass = '\n\n'.join(sass_content)
-            sass_path = os.path.join(out_dir, 'style.scss')
-            with open(sass_path, 'w', encoding='utf-8') as f:
-                f.write(f"// Combined Sass - Generated by HTML Extractor\n// {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                f.write(combined_sass)
-            files_created['sass'] = True
-            self.log(f"📄 Created: style.scss", "success")
-            
-            # Convert to CSS if enabled
-            if self.convert_sass.get() and SASS_AVAILABLE:
-                try:
-                    compiled = sass.compile(filename=sass_path, 
-                                          output_style='compressed' if self.minify_output.get() else 'expanded')
-                    css_path = os.path.join(out_dir, 'style.css')
-                    with open(css_path, 'w', encoding='utf-8') as f:
-                        f.write(f"/* Compiled from Sass - Generated by HTML Extractor */\n/* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} */\n\n")
-                        f.write(compiled)
-                    files_created['css'] = True
-                    self.log(f"✅ Compiled Sass → style.css", "success")
-                except Exception as e:
-                    self.log(f"❌ Failed to compile Sass: {e}", "error")
-        
-        return files_created
-
-    def _update_html_with_standard_refs(self, html_content, files_created):
-        """Update HTML with references to standard files"""
-        # Add CSS link if CSS was created
-        if files_created['css']:
-            head_match = re.search(r'<head[^>]*>', html_content, re.IGNORECASE)
-            if head_match:
-                insert_pos = head_match.end()
-                css_link = '\n    <link rel="stylesheet" href="style.css">'
-                html_content = html_content[:insert_pos] + css_link + html_content[insert_pos:]
-                self.log(f"✅ Added CSS link to <head>", "success")
-        
-        # Add script tag if JS was created
-        if files_created['js']:
-            body_match = re.search(r'</body>', html_content, re.IGNORECASE)
-            if body_match:
-                insert_pos = body_match.start()
-                script_tag = '\n    <script src="script.js"></script>\n'
-                html_content = html_content[:insert_pos] + script_tag + html_content[insert_pos:]
-                self.log(f"✅ Added script tag before </body>", "success")
-            else:
-                # Append at end if no </body>
-                script_tag = '\n<script src="script.js"></script>'
-                html_content += script_tag
-                self.log(f"✅ Added script tag at end of file", "success")
-        
-        return html_content
+    @staticmethod
+    def _split_patterns(text):
+        """Split a comma-separated pattern list"""
+        return [p.strip() for p in text.split(",") if p.strip()]
 
-    def _save_index_html(self, html_content, out_dir):
-        """Save the updated HTML as index.html"""
-        index_path = os.path.join(out_dir, 'index.html')
-        
+    def _get_workers(self):
+        """Return the worker count, falling back to 1 for invalid input"""
         try:
-            with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            self.log(f"📄 Created: index.html", "success")
-        except Exception as e:
-            raise Exception(f"Failed to save index.html: {e}")
-
-    def _detect_sass(self, css_code):
-        """Enhanced Sass detection"""
-        sass_patterns = [
-            r'\$[\w-]+\s*:',           # Variables
-            r'@mixin\s+[\w-]+',        # Mixins
-            r'@include\s+[\w-]+',      # Include
-            r'@extend\s+',             # Extend
-            r'@import\s+["\']',        # Import
-            r'&\s*[:\w\[\]]',          # Parent selector
-            r'^\s*[\w-]+\s*{[^}]*[\w-]+\s*{',  # Nested rules
-            r'@if\s+',                 # Conditionals
-            r'@for\s+',                # Loops
-            r'@each\s+',               # Each loops
-            r'@function\s+',           # Functions
-        ]
-        
-        for pattern in sass_patterns:
-            if re.search(pattern, css_code, re.MULTILINE):
-                return True
-        return False
-
-    def _process_javascript(self, js_code):
-        """Process JavaScript code (minify if requested, preserve comments)"""
-        code = js_code.strip()
-        
-        if not self.preserve_comments.get():
-            # Remove single-line comments
-            code = re.sub(r'//.*%, ''', code, flags=re.MULTILINE)
-            # Remove multi-line comments
-            code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
-        
-        if self.minify_output.get():
-            # Basic minification (remove extra whitespace)
-            code = re.sub(r'\s+', ' ', code)
-            code = re.sub(r';\s*}', '}', code)
-            code = re.sub(r'{\s*', '{', code)
-            code = code.strip()
-        
-        return code
-
-    def _process_stylesheet(self, css_code):
-        """Process CSS/Sass code (minify if requested, preserve comments)"""
-        code = css_code.strip()
-        
-        if not self.preserve_comments.get():
-            # Remove CSS comments
-            code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
-        
-        if self.minify_output.get():
-            # Basic CSS minification
-            code = re.sub(r'\s+', ' ', code)
-            code = re.sub(r';\s*}', '}', code)
-            code = re.sub(r'{\s*', '{', code)
-            code = re.sub(r':\s*', ':', code)
-            code = re.sub(r';\s*', ';', code)
-            code = code.strip()
-        
-        return code
-
-    def _log_extraction_summary_enhanced(self, files_created, out_dir, base_name):
-        """Log enhanced extraction summary"""
-        self.log("-" * 60)
-        self.log("📊 EXTRACTION SUMMARY:", "header")
-        
-        created_files = []
-        if files_created['js']:
-            created_files.append("script.js")
-        if files_created['css']:
-            created_files.append("style.css")
-        if files_created['sass']:
-            created_files.append("style.scss")
-        created_files.append("index.html")
-        
-        self.log(f"   📁 Project folder: {os.path.basename(out_dir)}", "folder")
-        self.log(f"   📄 Files created: {', '.join(created_files)}")
-        self.log(f"   🏗️ Structure: Standard web project layout")
-        
-        if self.create_backup.get():
-            self.log(f"   💾 Backup: {base_name}_original.html")
-        
-        total_files = len(created_files)
-        if self.create_backup.get():
-            total_files += 1
-        
-        self.log(f"   📊 Total files: {total_files}")
-        self.log("   ✨ Ready for development!")
+            return max(self.workers.get(), 0)
+        except tk.TclError:
+            return 1
+
+    def _get_file_timeout(self):
+        """Return the per-file time limit, falling back to none for invalid input"""
+        try:
+            return max(self.file_timeout.get(), 0)
+        except tk.TclError:
+            return 0
+
+    def _get_archive_level(self):
+        """Return the zip compression level, falling back to the default for invalid input"""
+        try:
+            return min(max(self.archive_level.get(), 0), 9)
+        except tk.TclError:
+            return DEFAULT_ARCHIVE_LEVEL
 
     def _save_settings(self):
         """Save current settings to file"""
-        settings = {
-            'convert_sass': self.convert_sass.get(),
-            'minify_output': self.minify_output.get(),
-            'preserve_comments': self.preserve_comments.get(),
-            'create_backup': self.create_backup.get(),
-            'extract_inline_styles': self.extract_inline_styles.get(),
-            'create_project_folder': self.create_project_folder.get(),
-            'combine_files': self.combine_files.get(),
-            'last_output_dir': self.output_dir.get()
-        }
+        settings = self._collect_options().to_dict()
+        settings['last_output_dir'] = self.output_dir.get()
+        settings['watch_mode'] = self.watch_mode.get()
         
         try:
             settings_path = os.path.join(os.path.expanduser("~"), ".html_extractor_settings.json")
@@ -799,6 +646,19 @@ class HTMLExtractorGUI(tk.Tk):
                 self.extract_inline_styles.set(settings.get('extract_inline_styles', True))
                 self.create_project_folder.set(settings.get('create_project_folder', True))
                 self.combine_files.set(settings.get('combine_files', True))
+                self.workers.set(settings.get('workers', 1))
+                self.file_timeout.set(int(settings.get('file_timeout', 0)))
+                self.recursive.set(settings.get('recursive', True))
+                self.incremental.set(settings.get('incremental', False))
+                self.share_common_blocks.set(settings.get('share_common_blocks', False))
+                self.analyze_output.set(settings.get('analyze_output', False))
+                self.deterministic_output.set(settings.get('deterministic_output', False))
+                self.backup_mode.set(settings.get('backup_mode', 'copy'))
+                self.output_mode.set(settings.get('archive') or 'folders')
+                self.archive_level.set(int(settings.get('archive_level', DEFAULT_ARCHIVE_LEVEL)))
+                self.watch_mode.set(settings.get('watch_mode', False))
+                self.include_patterns.set(", ".join(settings.get('include_patterns', ["*.html", "*.htm"])))
+                self.exclude_patterns.set(", ".join(settings.get('exclude_patterns', [])))
                 
                 last_dir = settings.get('last_output_dir', '')
                 if last_dir and os.path.exists(last_dir):
@@ -816,6 +676,19 @@ class HTMLExtractorGUI(tk.Tk):
         self.batch_mode.set(False)
         self.create_project_folder.set(True)
         self.combine_files.set(True)
+        self.workers.set(1)
+        self.file_timeout.set(0)
+        self.recursive.set(True)
+        self.incremental.set(False)
+        self.share_common_blocks.set(False)
+        self.analyze_output.set(False)
+        self.deterministic_output.set(False)
+        self.backup_mode.set("copy")
+        self.output_mode.set("folders")
+        self.archive_level.set(DEFAULT_ARCHIVE_LEVEL)
+        self.watch_mode.set(False)
+        self.include_patterns.set("*.html, *.htm")
+        self.exclude_patterns.set("")
         
         messagebox.showinfo("Settings Reset", "All settings have been reset to defaults.")
         self.log("⚙ Settings reset to defaults", "info")
@@ -831,55 +704,6 @@ class HTMLExtractorGUI(tk.Tk):
             self.destroy()
 
 
-class ProjectAnalyzer:
-    """Analyze and validate extracted projects"""
-    
-    @staticmethod
-    def analyze_project_structure(project_dir):
-        """Analyze the structure of an extracted project"""
-        analysis = {
-            'has_index': os.path.exists(os.path.join(project_dir, 'index.html')),
-            'has_css': os.path.exists(os.path.join(project_dir, 'style.css')),
-            'has_js': os.path.exists(os.path.join(project_dir, 'script.js')),
-            'has_sass': os.path.exists(os.path.join(project_dir, 'style.scss')),
-            'has_backup': any(f.endswith('_original.html') for f in os.listdir(project_dir)),
-            'file_count': len([f for f in os.listdir(project_dir) if os.path.isfile(os.path.join(project_dir, f))]),
-            'total_size': sum(os.path.getsize(os.path.join(project_dir, f)) 
-                            for f in os.listdir(project_dir) 
-                            if os.path.isfile(os.path.join(project_dir, f)))
-        }
-        return analysis
-    
-    @staticmethod
-    def validate_html_references(project_dir):
-        """Validate that HTML file correctly references CSS and JS"""
-        issues = []
-        index_path = os.path.join(project_dir, 'index.html')
-        
-        if not os.path.exists(index_path):
-            issues.append("index.html not found")
-            return issues
-        
-        try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            # Check CSS reference
-            if os.path.exists(os.path.join(project_dir, 'style.css')):
-                if 'style.css' not in html_content:
-                    issues.append("style.css file exists but not referenced in HTML")
-            
-            # Check JS reference
-            if os.path.exists(os.path.join(project_dir, 'script.js')):
-                if 'script.js' not in html_content:
-                    issues.append("script.js file exists but not referenced in HTML")
-                    
-        except Exception as e:
-            issues.append(f"Error reading index.html: {e}")
-        
-        return issues
-
-
 def main():
     """Main application entry point"""
     # Ensure proper GUI scaling on Windows
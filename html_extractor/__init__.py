@@ -0,0 +1,16 @@
+"""HTML JS/CSS/Sass extraction engine (no GUI dependencies)"""
+from .analyzer import ProjectAnalyzer
+from .engine import (
+    SASS_AVAILABLE,
+    ExtractionEngine,
+    ExtractionOptions,
+    ExtractionResult,
+)
+
+__all__ = [
+    'SASS_AVAILABLE',
+    'ExtractionEngine',
+    'ExtractionOptions',
+    'ExtractionResult',
+    'ProjectAnalyzer',
+]
@@ -0,0 +1,7 @@
+"""Allow ``python -m html_extractor``"""
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
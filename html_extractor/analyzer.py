@@ -0,0 +1,293 @@
+"""Analysis and validation of extracted projects
+
+Each project folder is listed once with ``os.scandir``, and its file
+sizes come from that listing. References are checked by parsing the
+``<link rel="stylesheet" href>`` and ``<script src>`` tags of index.html,
+outside comments. The page is parsed as bytes, without decoding it, when
+its encoding is ASCII-compatible (every encoding the extractor writes
+except UTF-16/32); only the URLs are decoded. ``analyze_tree`` does this
+for every project under an output folder on a thread pool and adds the
+results up into a single report.
+"""
+from collections import Counter, deque
+import os
+import re
+import time
+from urllib.parse import unquote
+
+from .discovery import OUTPUT_DIR_PATTERN
+from .encoding import FALLBACK_ENCODINGS, decode_html, sniff_encoding
+from .scanner import _ATTR_RE, _BYTES_SYNTAX, TagEnds
+
+_PROJECT_SUFFIX = OUTPUT_DIR_PATTERN.lstrip('*')
+
+# Searched in the lowercased page; bytes.lower() keeps every offset.
+_KEY_RE = re.compile(rb'<(!--|link(?=[\s/>])|script(?=[\s/>]))')
+_BYTES_ATTR_RE = re.compile(_ATTR_RE.pattern.encode('ascii'))
+_SCHEME_RE = re.compile(r'^[A-Za-z][A-Za-z0-9+.\-]*:')
+
+# Issue kinds counted in the aggregate report, by the start of their message.
+_ISSUE_KINDS = (
+    ('index.html not found', 'missing_index'),
+    ('style.css file exists', 'unreferenced_css'),
+    ('script.js file exists', 'unreferenced_js'),
+    ('References missing file', 'missing_reference'),
+    ('Error reading', 'unreadable'),
+)
+
+
+def _file_sizes(entries):
+    """Return ``{name: size}`` for the files among scandir entries"""
+    files = {}
+    for entry in entries:
+        try:
+            if entry.is_file():
+                files[entry.name] = entry.stat().st_size
+        except OSError:
+            continue
+    return files
+
+
+def _list_files(project_dir):
+    """Return ``{name: size}`` for the files of a folder, from one scandir"""
+    with os.scandir(project_dir) as it:
+        return _file_sizes(it)
+
+
+def _decode_url(value, encoding):
+    for candidate in ((encoding,) if encoding else FALLBACK_ENCODINGS):
+        try:
+            return value.decode(candidate)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return value.decode('utf-8', 'replace')
+
+
+def parse_references(data):
+    """Return the URLs of the stylesheets and scripts an HTML page (bytes) loads"""
+    encoding, _ = sniff_encoding(data)
+    if encoding and encoding.startswith(('utf-16', 'utf-32')):
+        data = decode_html(data)[0].encode('utf-8', 'surrogatepass')
+        encoding = 'utf-8'
+    elif encoding == 'utf-8-sig':
+        encoding = 'utf-8'
+
+    lowered = data.lower()
+    tag_ends = TagEnds(data, _BYTES_SYNTAX)
+    urls = []
+    pos = 0
+    while True:
+        match = _KEY_RE.search(lowered, pos)
+        if match is None:
+            break
+        if match.group(1) == b'!--':
+            end = lowered.find(b'-->', match.end())
+            pos = len(lowered) if end < 0 else end + 3
+            continue
+        pos = tag_ends(match.end())
+        if pos == -1:
+            break
+        attrs = {m.group(1).lower(): m.group(2) or m.group(3) or m.group(4) or b''
+                 for m in _BYTES_ATTR_RE.finditer(data, match.end(), pos - 1)}
+        if match.group(1) == b'script':
+            url = attrs.get(b'src')
+        elif b'stylesheet' in attrs.get(b'rel', b'').lower().split():
+            url = attrs.get(b'href')
+        else:
+            continue
+        if url and url.strip():
+            urls.append(_decode_url(url.strip(), encoding))
+    return urls
+
+
+def _local_path(project_dir, url):
+    """Return the file a relative URL points to, or None for other URLs"""
+    if url.startswith(('/', '#')) or _SCHEME_RE.match(url):
+        return None   # Absolute, protocol-relative or data: URLs are not project files
+    path = unquote(url.split('#', 1)[0].split('?', 1)[0])
+    if not path:
+        return None
+    return os.path.normpath(os.path.join(project_dir, path))
+
+
+class ProjectAnalyzer:
+    """Analyze and validate extracted projects"""
+
+    @staticmethod
+    def analyze_project_structure(project_dir, files=None):
+        """Analyze the structure of an extracted project
+
+        ``files`` is the folder's ``{name: size}`` listing, when known.
+        """
+        if files is None:
+            files = _list_files(project_dir)
+        analysis = {
+            'has_index': 'index.html' in files,
+            'has_css': 'style.css' in files,
+            'has_js': 'script.js' in files,
+            'has_sass': 'style.scss' in files,
+            'has_backup': any(name.endswith('_original.html') for name in files),
+            'file_count': len(files),
+            'total_size': sum(files.values()),
+        }
+        return analysis
+
+    @staticmethod
+    def validate_html_references(project_dir, files=None, exists=None):
+        """Validate that HTML file correctly references CSS and JS
+
+        Reports style.css / script.js files that index.html does not load
+        and relative references to files that do not exist. ``files`` is
+        the folder's ``{name: size}`` listing, when known; ``exists`` is a
+        dict caching the existence of files outside the folder, such as a
+        batch's shared common.js.
+        """
+        if files is None:
+            files = _list_files(project_dir)
+        issues = []
+        if 'index.html' not in files:
+            issues.append("index.html not found")
+            return issues
+
+        try:
+            with open(os.path.join(project_dir, 'index.html'), 'rb') as f:
+                urls = parse_references(f.read())
+        except Exception as e:
+            issues.append(f"Error reading index.html: {e}")
+            return issues
+
+        referenced = set()
+        for url in urls:
+            path = _local_path(project_dir, url)
+            if path is None:
+                continue
+            folder, name = os.path.split(path)
+            if folder == os.path.normpath(project_dir):
+                referenced.add(name)
+                found = name in files
+            elif exists is not None:
+                if path not in exists:
+                    exists[path] = os.path.isfile(path)
+                found = exists[path]
+            else:
+                found = os.path.isfile(path)
+            if not found:
+                issues.append(f"References missing file: {url}")
+
+        # Check CSS reference
+        if 'style.css' in files and 'style.css' not in referenced:
+            issues.append("style.css file exists but not referenced in HTML")
+
+        # Check JS reference
+        if 'script.js' in files and 'script.js' not in referenced:
+            issues.append("script.js file exists but not referenced in HTML")
+
+        return issues
+
+    @staticmethod
+    def analyze_project(project_dir, exists=None, files=None):
+        """Return ``(structure, issues)`` for a project from a single listing of its folder"""
+        if files is None:
+            try:
+                files = _list_files(project_dir)
+            except OSError as e:
+                return ProjectAnalyzer.analyze_project_structure(project_dir, {}), [f"Error reading folder: {e}"]
+        return (ProjectAnalyzer.analyze_project_structure(project_dir, files),
+                ProjectAnalyzer.validate_html_references(project_dir, files, exists))
+
+    @staticmethod
+    def find_projects(root):
+        """Yield ``(project_dir, files)`` for every extracted project under ``root``
+
+        Projects are the ``*_extracted`` folders, which are not listed here
+        (``files`` is None), and the other folders holding an index.html
+        (output written without project folders), whose ``{name: size}``
+        listing comes from the walk itself.
+        """
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            if any(entry.name == 'index.html' for entry in entries):
+                yield folder, _file_sizes(entries)
+            subdirs = []
+            for entry in entries:
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                except OSError:
+                    continue
+                if entry.name.endswith(_PROJECT_SUFFIX):
+                    yield entry.path, None
+                elif not entry.name.startswith('.'):
+                    subdirs.append(entry.path)
+            stack.extend(reversed(subdirs))
+
+    @staticmethod
+    def analyze_tree(root, workers=None, should_stop=None, max_listed=100):
+        """Analyze and validate every extracted project under ``root``
+
+        Projects are analyzed on ``workers`` threads (default: as many as
+        CPU cores + 4, at most 32) while the tree is still being walked.
+        Returns an aggregate report: totals, per-kind issue counts and,
+        for up to ``max_listed`` projects with issues, the issues
+        themselves.
+        """
+        report = {
+            'root': root,
+            'projects': 0,
+            'files': 0,
+            'total_size': 0,
+            'with_js': 0,
+            'with_css': 0,
+            'with_sass': 0,
+            'with_backup': 0,
+            'projects_with_issues': 0,
+            'issues': Counter(),
+            'problems': [],
+            'duration': 0.0,
+        }
+        start = time.perf_counter()
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        exists = {}
+        pending = deque()
+
+        def record(project_dir, structure, issues):
+            report['projects'] += 1
+            report['files'] += structure['file_count']
+            report['total_size'] += structure['total_size']
+            report['with_js'] += structure['has_js']
+            report['with_css'] += structure['has_css']
+            report['with_sass'] += structure['has_sass']
+            report['with_backup'] += structure['has_backup']
+            if issues:
+                report['projects_with_issues'] += 1
+                for issue in issues:
+                    report['issues'][next((kind for prefix, kind in _ISSUE_KINDS if issue.startswith(prefix)),
+                                          'other')] += 1
+                if len(report['problems']) < max_listed:
+                    report['problems'].append({'project': project_dir, 'issues': issues})
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            limit = workers * 4
+            for project_dir, files in ProjectAnalyzer.find_projects(root):
+                if should_stop and should_stop():
+                    break
+                future = pool.submit(ProjectAnalyzer.analyze_project, project_dir, exists, files)
+                pending.append((project_dir, future))
+                while len(pending) >= limit:
+                    project_dir, future = pending.popleft()
+                    record(project_dir, *future.result())
+            while pending:
+                project_dir, future = pending.popleft()
+                record(project_dir, *future.result())
+
+        report['issues'] = dict(report['issues'])
+        report['duration'] = time.perf_counter() - start
+        return report
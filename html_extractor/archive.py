@@ -0,0 +1,261 @@
+"""Archive output: every extracted file goes into one zip or tar file
+
+With ``ExtractionOptions.archive`` set, nothing is written under the
+output folder but ``extracted.zip`` (or ``extracted.tar``): each output
+file, backups included, becomes a member named after its path relative
+to the output folder (``page_extracted/script.js``). A 50k-page batch then
+creates one file instead of hundreds of thousands of small ones. Zip
+members are deflated at ``archive_level`` (0 stores them); tar members are
+not compressed, since a compressed tar file cannot be appended to.
+
+A full batch writes a new archive under a temporary name and renames it
+into place when the run completes, so the previous archive stays whole
+until then, and is kept if the run is stopped or fails. Incremental batches, single files and watch mode append to the
+archive instead. A page extracted again is appended again: the archive
+then holds several members of that name, and the last one is current, as
+``unzip -o`` and ``tar -x`` (which extract in order), ``zipfile`` and
+``tarfile`` all have it. A process killed while appending can leave a zip
+without its central directory (``zip -FF`` recovers the members); a tar
+only loses the member being written.
+
+Worker processes cannot share the archive: they collect their members in
+a MemberBuffer, which the parent adds to the archive in input order.
+
+zipfile and tarfile are only imported by ArchiveWriter, so runs without
+an archive do not load them.
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+
+ARCHIVE_FORMATS = ('zip', 'tar')
+
+ARCHIVE_NAME = 'extracted'
+
+DEFAULT_ARCHIVE_LEVEL = 6
+
+# Member timestamp with ``deterministic_output`` (the earliest a zip can hold)
+_FIXED_DATE = (1980, 1, 1, 0, 0, 0)
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Members of the same name are how pages extracted again are stored
+warnings.filterwarnings('ignore', r'Duplicate name', UserWarning, 'zipfile')
+
+
+def archive_path(out_dir, fmt):
+    """Return the path of the archive written for an output folder"""
+    return os.path.join(out_dir, f"{ARCHIVE_NAME}.{fmt}")
+
+
+class _MemberFile:
+    """A member written in pieces, like AtomicFile: spooled to a temporary file
+    in the archive's folder, then added to the archive once complete
+    """
+
+    def __init__(self, sink, path):
+        self.path = path
+        self.changed = None
+        self.size = 0
+        self._sink = sink
+        fd, self._tmp_path = tempfile.mkstemp(dir=sink.root, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self._file.write(data)
+        self.size += len(data)
+
+    def close(self):
+        """Finish the member; return True (an appended member always changes the archive)"""
+        if self._file.closed:
+            return self.changed
+        self._file.close()
+        self._sink.add_file(self.path, self._tmp_path, remove=True)
+        self.changed = True
+        return self.changed
+
+    def discard(self):
+        """Drop what was written"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ArchiveWriter:
+    """One zip or tar archive receiving the output files of a run
+
+    ``path`` names the archive; its folder is the root member names are
+    relative to. With ``append`` an existing archive is added to, otherwise
+    a new one replaces it on ``close()``. Safe to use from several threads.
+    """
+
+    def __init__(self, path, fmt, level=DEFAULT_ARCHIVE_LEVEL, append=False, deterministic=False):
+        import tarfile
+        import zipfile
+
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{fmt}' (expected {' or '.join(ARCHIVE_FORMATS)})")
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.format = fmt
+        self.level = min(max(level, 0), 9)
+        self.appending = append and os.path.exists(path)
+        self.added = 0
+        self._deterministic = deterministic
+        self._lock = threading.Lock()
+
+        os.makedirs(self.root, exist_ok=True)
+        target = path if self.appending else f"{path}.tmp"
+        self._target = target
+        try:
+            if fmt == 'zip':
+                self._zip = zipfile.ZipFile(target, 'a' if self.appending else 'w',
+                                            compression=zipfile.ZIP_DEFLATED if self.level else zipfile.ZIP_STORED,
+                                            compresslevel=self.level or None)
+                self._names = set(self._zip.namelist())
+            else:
+                self._tar = tarfile.open(target, 'a' if self.appending else 'w', format=tarfile.PAX_FORMAT)
+                self._names = set(self._tar.getnames())
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            raise ValueError(f"Cannot append to '{path}': {e}")
+
+    def member_name(self, path):
+        """Return the member name of an output path under the archive's folder"""
+        name = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+        if name.startswith('../'):
+            raise ValueError(f"'{path}' is outside the archive's folder {self.root}")
+        return name
+
+    def has(self, path):
+        """Return True when the archive holds a member for ``path``"""
+        return self.member_name(path) in self._names
+
+    def _zip_info(self, name, size):
+        import zipfile
+
+        info = zipfile.ZipInfo(name, _FIXED_DATE if self._deterministic else time.localtime()[:6])
+        info.compress_type = self._zip.compression
+        info._compresslevel = self._zip.compresslevel   # As ZipFile.open() sets it for named members
+        info.external_attr = 0o644 << 16
+        info.file_size = size
+        return info
+
+    def _tar_info(self, name, size):
+        import tarfile
+
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mode = 0o644
+        info.mtime = 0 if self._deterministic else int(time.time())
+        return info
+
+    def _add_stream(self, name, source, size):
+        with self._lock:
+            if self.format == 'zip':
+                info = self._zip_info(name, size)
+                with self._zip.open(info, 'w') as out:
+                    shutil.copyfileobj(source, out, _CHUNK_SIZE)
+            else:
+                self._tar.addfile(self._tar_info(name, size), source)
+            self._names.add(name)
+            self.added += 1
+
+    def add_bytes(self, path, data):
+        """Append ``data`` as the member for ``path``"""
+        name = self.member_name(path)
+        if self.format == 'zip':
+            with self._lock:
+                self._zip.writestr(self._zip_info(name, len(data)), data)
+                self._names.add(name)
+                self.added += 1
+        else:
+            self._add_stream(name, io.BytesIO(data), len(data))
+
+    def add_file(self, path, src, remove=False):
+        """Append the content of the file ``src`` as the member for ``path``; ``remove`` deletes ``src`` after"""
+        name = self.member_name(path)
+        with open(src, 'rb') as source:
+            self._add_stream(name, source, os.fstat(source.fileno()).st_size)
+        if remove:
+            os.remove(src)
+
+    def open(self, path):
+        """Return a file object to write the member for ``path`` in pieces"""
+        return _MemberFile(self, path)
+
+    def add_members(self, members):
+        """Append the members collected by a MemberBuffer"""
+        for path, data, src, remove in members:
+            if src is None:
+                self.add_bytes(path, data)
+            else:
+                self.add_file(path, src, remove)
+
+    def close(self, complete=True):
+        """Finish the archive; a new archive replaces the previous one here
+
+        Without ``complete`` (a stopped or failed run) a new archive is
+        deleted instead and the previous one is left as it was; members
+        appended to an existing archive are kept.
+        """
+        with self._lock:
+            if self.format == 'zip':
+                self._zip.close()
+            else:
+                self._tar.close()
+            if self._target != self.path:
+                if complete:
+                    os.replace(self._target, self.path)
+                else:
+                    os.remove(self._target)
+                self._target = self.path
+
+
+class MemberBuffer:
+    """Archive members collected in a worker process for the parent's ArchiveWriter
+
+    Has the writing side of ArchiveWriter, for the archive at ``path``.
+    Members written in pieces are spooled to temporary files in its
+    folder, which the parent removes once it has added them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.members = []
+
+    def add_bytes(self, path, data):
+        self.members.append((path, data, None, False))
+
+    def add_file(self, path, src, remove=False):
+        self.members.append((path, None, src, remove))
+
+    def open(self, path):
+        """Return a file object to write the member for ``path`` in pieces"""
+        return _MemberFile(self, path)
+
+
+def discard_members(members):
+    """Remove the temporary files of members that will not be added"""
+    for _, _, src, remove in members:
+        if remove:
+            try:
+                os.remove(src)
+            except OSError:
+                pass
@@ -0,0 +1,49 @@
+"""Cancellation points inside the extraction of a page
+
+``extract_html`` gives every page a CancelToken and checks it between
+stages; the scanner and the minifier also check it every ``CHECK_EVERY``
+steps of their loops, so a huge or pathological page is given up within a
+fraction of a second of a stop request, or of running past the per-file
+time budget (``ExtractionOptions.file_timeout``). Checks stop once the
+page's output starts being written, so a project folder never mixes new
+and old files. Work inside a single regular expression search or a Sass
+compile cannot be interrupted.
+"""
+import time
+
+# Loop steps between two checks in the scanner and the minifier
+CHECK_EVERY = 256
+
+
+class ExtractionCancelled(Exception):
+    """The caller asked to stop while a page was being extracted"""
+
+
+class ExtractionTimeout(Exception):
+    """A page took longer than its time budget and was abandoned"""
+
+
+class CancelToken:
+    """Decide, when checked, whether the current page should be abandoned
+
+    ``should_stop`` is the engine's stop callback (for worker processes,
+    the ``is_set`` of an event shared with the parent); ``budget`` is the
+    page's time limit in seconds, 0 for none.
+    """
+
+    def __init__(self, should_stop=None, budget=0):
+        self._should_stop = should_stop
+        self.budget = budget
+        self.deadline = time.monotonic() + budget if budget and budget > 0 else None
+
+    @property
+    def active(self):
+        """True when checking can ever raise"""
+        return self._should_stop is not None or self.deadline is not None
+
+    def check(self):
+        """Raise ExtractionCancelled or ExtractionTimeout when the page should be abandoned"""
+        if self._should_stop is not None and self._should_stop():
+            raise ExtractionCancelled("stopped by user")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ExtractionTimeout(f"gave up after {self.budget:g} s (per-file time limit)")
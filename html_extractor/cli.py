@@ -0,0 +1,195 @@
+"""Command-line entry point that runs extraction without loading tkinter"""
+import argparse
+import os
+import sys
+import time
+
+from .archive import ARCHIVE_FORMATS, ARCHIVE_NAME, DEFAULT_ARCHIVE_LEVEL
+from .discovery import DEFAULT_INCLUDE
+from .engine import ExtractionEngine, ExtractionOptions
+from .output import BACKUP_MODES
+from .sass_cache import DEFAULT_CACHE_MB
+from .streaming import DEFAULT_STREAM_THRESHOLD_MB
+from .timing import PROFILE_DIR, PROFILE_MODES
+from .watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+
+
+def build_parser():
+    """Create the argument parser for the command-line interface"""
+    parser = argparse.ArgumentParser(
+        prog="html_extractor",
+        description="Extract JavaScript, CSS and Sass from HTML files into a standard project layout.",
+    )
+    parser.add_argument("input", nargs="?", help="HTML file, or folder of HTML files with --batch")
+    parser.add_argument("-o", "--output", help="output directory")
+    parser.add_argument("--batch", action="store_true", help="treat INPUT as a folder of HTML files")
+    parser.add_argument("--minify", action="store_true", help="minify extracted files")
+    parser.add_argument("--strip-comments", action="store_true", help="remove comments from extracted files")
+    parser.add_argument("--no-sass", action="store_true", help="do not compile Sass to CSS")
+    parser.add_argument("--no-backup", action="store_true", help="do not keep a copy of the original HTML")
+    parser.add_argument("--backup-mode", choices=BACKUP_MODES, default="copy",
+                        help="how the backup is made: a copy, a hard link (shares the original's data, so in-place "
+                             "edits show in both) or a copy-on-write reflink; links fall back to a copy "
+                             "(default: copy)")
+    parser.add_argument("--no-inline-styles", action="store_true", help="leave style=\"...\" attributes alone")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="leave timestamps out of generated files, so unchanged input gives identical output")
+    parser.add_argument("--no-project-folder", action="store_true",
+                        help="write straight into the output directory instead of NAME_extracted/")
+    parser.add_argument("--archive", choices=ARCHIVE_FORMATS,
+                        help=f"write every output file into OUTPUT/{ARCHIVE_NAME}.zip or .tar instead of folders; "
+                             "incremental runs, single files and --watch append to it")
+    parser.add_argument("--archive-level", type=int, default=DEFAULT_ARCHIVE_LEVEL, metavar="N",
+                        help="deflate level of zip archive members, 0 (stored) to 9 "
+                             f"(default: {DEFAULT_ARCHIVE_LEVEL})")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="batch files to extract (repeatable, default: *.html and *.htm)")
+    parser.add_argument("--exclude", action="append", metavar="GLOB", default=[],
+                        help="files or folders to skip in batch mode (repeatable)")
+    parser.add_argument("--no-recursive", action="store_true", help="do not descend into subfolders in batch mode")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip batch files that are unchanged since the last run (uses a manifest in the output directory)")
+    parser.add_argument("--share-common", action="store_true",
+                        help="write script/style blocks found on several pages once, to common.js/common.css")
+    parser.add_argument("--sass-cache-dir", default="", metavar="DIR",
+                        help="where compiled Sass is cached (default: the user cache folder)")
+    parser.add_argument("--sass-cache-mb", type=int, default=DEFAULT_CACHE_MB, metavar="MB",
+                        help=f"size limit of the Sass cache, 0 to disable it (default: {DEFAULT_CACHE_MB})")
+    parser.add_argument("--run-log", default="", metavar="FILE",
+                        help="append a JSON Lines record per file (counts, timings, errors) to FILE")
+    parser.add_argument("--stream-threshold-mb", type=int, default=DEFAULT_STREAM_THRESHOLD_MB, metavar="MB",
+                        help="stream pages of this size or larger from a memory map instead of reading them "
+                             f"into memory, 0 to never stream (default: {DEFAULT_STREAM_THRESHOLD_MB})")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="profile every file with cProfile or tracemalloc and keep the captures of the "
+                             f"slowest ones in OUTPUT/{PROFILE_DIR}")
+    parser.add_argument("--profile-top", type=int, default=5, metavar="N",
+                        help="number of profile captures to keep (default: 5)")
+    parser.add_argument("--file-timeout", type=float, default=0, metavar="SECONDS",
+                        help="give up on a file that takes longer than this to extract and go on with the next "
+                             "one, 0 for no limit (default: 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for batch mode (0 = one per CPU core)")
+    parser.add_argument("--no-pipeline", action="store_true",
+                        help="in batch mode with one worker, read, extract and write one file at a time instead "
+                             "of overlapping the three")
+    parser.add_argument("--analyze", action="store_true",
+                        help="after a batch, check every extracted project under OUTPUT: its files and the "
+                             "stylesheets and scripts index.html references")
+    parser.add_argument("--analysis-report", default="", metavar="FILE",
+                        help="with --analyze, also save the full report as JSON to FILE")
+    parser.add_argument("--watch", action="store_true",
+                        help="after extracting, keep running and re-extract files as they are saved (Ctrl+C to stop)")
+    parser.add_argument("--debounce-ms", type=int, default=int(DEFAULT_DEBOUNCE * 1000), metavar="MS",
+                        help="with --watch, wait this long after the last save of a burst "
+                             f"(default: {int(DEFAULT_DEBOUNCE * 1000)})")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, poll for changes even where inotify is available "
+                             f"(needed on network filesystems; every {DEFAULT_POLL_INTERVAL:g} s)")
+    parser.add_argument("--serve", action="store_true",
+                        help="instead of extracting INPUT, keep warm workers running and take extraction jobs "
+                             "over HTTP (POST /extract, GET /metrics); the other options are the jobs' defaults")
+    # The server's defaults are spelled out: importing it loads http.server, for --serve only
+    parser.add_argument("--port", type=int, default=None,
+                        help="with --serve, port to listen on at 127.0.0.1, 0 for any free one (default: 8765)")
+    parser.add_argument("--socket", default="", metavar="PATH",
+                        help="with --serve, listen on this Unix socket instead of a port")
+    parser.add_argument("--token-file", default="", metavar="FILE",
+                        help="with --serve on a port, write the token clients must send "
+                             "(Authorization: Bearer TOKEN) to FILE, readable only by you, instead of printing it")
+    parser.add_argument("--queue-size", type=int, default=None, metavar="N",
+                        help="with --serve, jobs that may wait for a worker before new ones are refused "
+                             "(default: 256)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    return parser
+
+
+def options_from_args(args):
+    """Translate parsed arguments into ExtractionOptions"""
+    return ExtractionOptions(
+        convert_sass=not args.no_sass,
+        minify_output=args.minify,
+        preserve_comments=not args.strip_comments,
+        create_backup=not args.no_backup,
+        backup_mode=args.backup_mode,
+        extract_inline_styles=not args.no_inline_styles,
+        create_project_folder=not args.no_project_folder,
+        workers=args.jobs,
+        recursive=not args.no_recursive,
+        include_patterns=args.include or list(DEFAULT_INCLUDE),
+        exclude_patterns=args.exclude,
+        incremental=args.incremental,
+        share_common_blocks=args.share_common,
+        sass_cache_dir=args.sass_cache_dir,
+        sass_cache_mb=args.sass_cache_mb,
+        run_log=args.run_log,
+        stream_threshold_mb=args.stream_threshold_mb,
+        deterministic_output=args.deterministic,
+        profile=args.profile or '',
+        profile_top=args.profile_top,
+        pipeline=not args.no_pipeline,
+        analyze_output=args.analyze or bool(args.analysis_report),
+        analysis_report=args.analysis_report,
+        file_timeout=args.file_timeout,
+        archive=args.archive or '',
+        archive_level=args.archive_level,
+    )
+
+
+def main(argv=None):
+    """Run an extraction from the command line and return the exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.serve and (args.input is None or args.output is None):
+        parser.error("INPUT and -o/--output are required unless --serve is given")
+
+    def log(msg, tag="normal"):
+        if tag == "error":
+            print(msg, file=sys.stderr)
+        elif not args.quiet:
+            print(msg, flush=args.serve)
+
+    if args.serve:
+        from .server import DEFAULT_PORT, DEFAULT_QUEUE_SIZE, serve
+
+        try:
+            serve(options_from_args(args), jobs=args.jobs,
+                  port=DEFAULT_PORT if args.port is None else args.port, socket_path=args.socket,
+                  queue_size=DEFAULT_QUEUE_SIZE if args.queue_size is None else args.queue_size,
+                  log=log, token_file=args.token_file)
+        except Exception as e:
+            log(f"Error while serving: {e}", "error")
+            return 1
+        return 0
+
+    engine = ExtractionEngine(options_from_args(args), log=log)
+    start_time = time.perf_counter()
+
+    try:
+        if args.batch or os.path.isdir(args.input):
+            results = engine.extract_batch(args.input, args.output)
+        else:
+            results = [engine.extract_single_file(args.input, args.output)]
+    except KeyboardInterrupt:
+        log("⏹ Stopped", "warning")
+        return 130
+    except Exception as e:
+        log(f"Error during extraction: {e}", "error")
+        return 1
+
+    duration = time.perf_counter() - start_time
+    log(f"✅ Extracted {len(results)} file(s) in {duration:.2f} seconds", "success")
+
+    if args.watch:
+        try:
+            engine.watch(args.input, args.output, debounce=args.debounce_ms / 1000, polling=args.poll)
+        except KeyboardInterrupt:
+            log("⏹ Stopped watching", "info")
+        except Exception as e:
+            log(f"Error while watching: {e}", "error")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
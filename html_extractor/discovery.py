@@ -0,0 +1,106 @@
+"""Streaming discovery of HTML files in a directory tree"""
+from fnmatch import translate
+import os
+import re
+
+DEFAULT_INCLUDE = ('*.html', '*.htm')
+
+# Project folders written by the extractor itself are never treated as input.
+OUTPUT_DIR_PATTERN = '*_extracted'
+
+
+def compile_patterns(patterns):
+    """Combine glob patterns into one case-insensitive regex, or None"""
+    patterns = [p.strip() for p in patterns if p and p.strip()]
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{translate(p)})' for p in patterns), re.IGNORECASE)
+
+
+def _matches(regex, name, rel_path):
+    """Match a pattern regex against an entry's name or relative path"""
+    return regex is not None and (regex.match(name) is not None or regex.match(rel_path) is not None)
+
+
+class HtmlFileFilter:
+    """Decide which files and folders under ``root`` are batch inputs
+
+    ``include`` and ``exclude`` are glob patterns matched
+    case-insensitively against an entry's name or its ``/``-separated path
+    relative to ``root``. Excluded folders, folders in ``skip_dirs`` and,
+    unless ``recursive``, all subfolders are left out with their content.
+    """
+
+    def __init__(self, root, include=DEFAULT_INCLUDE, exclude=(), recursive=True, skip_dirs=()):
+        self.root = root
+        self.recursive = recursive
+        self._include_re = compile_patterns(include)
+        self._exclude_re = compile_patterns(list(exclude) + [OUTPUT_DIR_PATTERN])
+        self._skip = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs}
+
+    def wants_dir(self, name, rel_path, path):
+        """Return True when the folder at ``path`` is to be searched"""
+        return (self.recursive and not _matches(self._exclude_re, name, rel_path)
+                and os.path.normcase(os.path.abspath(path)) not in self._skip)
+
+    def wants_file(self, name, rel_path):
+        """Return True when the file is an input"""
+        return _matches(self._include_re, name, rel_path) and not _matches(self._exclude_re, name, rel_path)
+
+    def rel_dir(self, path):
+        """Return the ``rel_dir`` iter_html_files yields ``path`` with, or None if it is not an input
+
+        Checks a single file, e.g. one reported by a file watcher, without
+        walking the tree.
+        """
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        parts = rel.split(os.sep)
+        if parts[0] == os.pardir or os.path.isabs(rel):
+            return None
+        folder = self.root
+        for i, name in enumerate(parts[:-1]):
+            folder = os.path.join(folder, name)
+            if not self.wants_dir(name, '/'.join(parts[:i + 1]), folder):
+                return None
+        if not self.wants_file(parts[-1], '/'.join(parts)):
+            return None
+        return '/'.join(parts[:-1])
+
+
+def iter_html_files(root, include=DEFAULT_INCLUDE, exclude=(), recursive=True, skip_dirs=()):
+    """Yield ``(path, rel_dir)`` for every matching file under ``root``
+
+    Directories are walked depth-first with ``os.scandir``, entries in
+    name order, and files are yielded as soon as they are seen so
+    extraction can start before the walk is finished. Which entries count
+    is decided by HtmlFileFilter; an excluded directory is not descended
+    into. ``rel_dir`` is the file's directory relative to ``root`` (``''``
+    at the top level).
+    """
+    wanted = HtmlFileFilter(root, include, exclude, recursive, skip_dirs)
+
+    stack = [('', root)]
+    while stack:
+        rel_dir, dir_path = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if is_dir:
+                if wanted.wants_dir(entry.name, rel_path, entry.path):
+                    subdirs.append((rel_path, entry.path))
+            elif wanted.wants_file(entry.name, rel_path):
+                yield entry.path, rel_dir
+
+        # Reversed so the stack pops subdirectories in name order
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,111 @@
+"""Encoding detection for HTML read once as bytes
+
+The file is read into memory a single time. Its encoding is taken from a
+byte order mark if there is one, then from a ``<meta charset>`` or
+``http-equiv`` declaration near the top, and only then guessed by trying
+UTF-8, Windows-1252 and ISO-8859-1 against the buffer already in memory
+(ISO-8859-1 never fails, so it comes last). Files too large to decode at
+once are checked the same way with an incremental decoder instead.
+"""
+import codecs
+import re
+
+# How far into the file a <meta> declaration is looked for.
+SNIFF_BYTES = 4096
+
+# UTF-32 first: its little-endian BOM starts with the UTF-16 one.
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Matches both <meta charset="x"> and <meta http-equiv=... content="...; charset=x">.
+_META_CHARSET_RE = re.compile(rb'<meta\b[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_.:\-]+)', re.IGNORECASE)
+
+FALLBACK_ENCODINGS = ('utf-8', 'cp1252', 'iso-8859-1')
+
+# Browsers decode these labels as Windows-1252, which is a superset of them.
+_WINDOWS_1252_LABELS = {'iso8859-1', 'ascii', 'latin-1', 'cp1252'}
+
+
+def _normalize(label):
+    """Return Python's codec name for an encoding label, or None if unknown"""
+    try:
+        name = codecs.lookup(label.decode('ascii', 'replace').strip()).name
+    except LookupError:
+        return None
+    if name in _WINDOWS_1252_LABELS:
+        return 'cp1252'
+    if name.startswith('utf-16') or name.startswith('utf-32'):
+        return 'utf-8'  # A declaration without a BOM cannot be UTF-16; browsers use UTF-8
+    return name
+
+
+def sniff_encoding(data):
+    """Return ``(encoding, source)`` declared by a BOM or <meta>, or ``(None, None)``"""
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding, 'BOM'
+    match = _META_CHARSET_RE.search(data, 0, SNIFF_BYTES)
+    if match:
+        encoding = _normalize(match.group(1))
+        if encoding:
+            return encoding, 'meta charset'
+    return None, None
+
+
+def decode_html(data):
+    """Decode HTML bytes and return ``(text, encoding, source)``
+
+    ``source`` says how the encoding was found: ``'BOM'``, ``'meta
+    charset'`` or ``'fallback'``. A declared encoding the bytes do not
+    match falls through to the fallbacks.
+    """
+    encoding, source = sniff_encoding(data)
+    if encoding:
+        try:
+            return data.decode(encoding), encoding, source
+        except UnicodeDecodeError:
+            pass
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return data.decode(encoding), encoding, 'fallback'
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Cannot decode HTML file with any supported encoding")
+
+
+def _decodes(data, encoding, chunk_size):
+    """Return True when ``data`` decodes cleanly, read ``chunk_size`` bytes at a time"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        for start in range(0, len(data), chunk_size):
+            decoder.decode(data[start:start + chunk_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_encoding(data, chunk_size=1 << 20):
+    """Return ``(encoding, source)`` for a buffer too large to decode whole
+
+    Same rules as decode_html, but candidates are validated chunk by chunk
+    so ``data`` (typically an mmap) is never decoded into one string.
+    """
+    encoding, source = sniff_encoding(data[:SNIFF_BYTES])
+    candidates = [(encoding, source)] if encoding else []
+    candidates += [(fallback, 'fallback') for fallback in FALLBACK_ENCODINGS]
+    for encoding, source in candidates:
+        if encoding == 'iso-8859-1' or _decodes(data, encoding, chunk_size):
+            return encoding, source
+    raise ValueError("Cannot decode HTML file with any supported encoding")
+
+
+def is_utf8(encoding):
+    """Return True for UTF-8 with or without a BOM"""
+    return encoding in ('utf-8', 'utf-8-sig')
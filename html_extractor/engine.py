@@ -0,0 +1,994 @@
+"""Headless extraction engine shared by the GUI and the command line"""
+from contextlib import nullcontext
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+import time
+
+from .analyzer import ProjectAnalyzer
+from .archive import DEFAULT_ARCHIVE_LEVEL, ArchiveWriter, archive_path
+from .cancel import CancelToken, ExtractionCancelled, ExtractionTimeout
+from .discovery import DEFAULT_INCLUDE, iter_html_files
+from .encoding import decode_html, is_utf8
+from .manifest import BuildManifest
+from .minify import minify_css, minify_js
+from .output import AtomicFile, copy_file, link_file, write_bytes, write_text
+from .parallel import extract_parallel, resolve_worker_count
+from .pipeline import PendingWrite, extract_pipelined
+from .runlog import RunLog
+from .sass_cache import DEFAULT_CACHE_MB, SASS_AVAILABLE, get_compiler
+from .sass_detect import detect_sass
+from .scanner import scan_html
+from .sharing import COMMON_CSS, COMMON_JS, find_shared_blocks
+from .streaming import DEFAULT_STREAM_THRESHOLD_MB, extract_streaming
+from .timing import PROFILE_DIR, Profiler, StageTimer, keep_slowest_profiles, profile_highlights, summary_lines
+from .watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, watch_and_extract
+
+# Bump when the layout or content of extracted projects changes, so
+# incremental runs re-extract everything once.
+OUTPUT_FORMAT_VERSION = 5
+
+# Options that decide which files a batch visits or how it runs, but not
+# what gets written for each file.
+_BATCH_ONLY_OPTIONS = ('workers', 'recursive', 'include_patterns', 'exclude_patterns', 'incremental',
+                       'sass_cache_dir', 'sass_cache_mb', 'run_log', 'stream_threshold_mb',
+                       'backup_mode', 'profile', 'profile_top', 'pipeline', 'analyze_output',
+                       'analysis_report', 'file_timeout', 'archive', 'archive_level')
+
+
+# Comment style and title of each generated file's header.
+_ASSET_TITLES = {
+    'js': ('//', 'Combined JavaScript'),
+    'css': ('/*', 'Combined CSS'),
+    'sass': ('//', 'Combined Sass'),
+    'compiled': ('/*', 'Compiled from Sass'),
+    'common_js': ('//', 'Shared JavaScript'),
+    'common_css': ('/*', 'Shared CSS'),
+}
+
+
+def _utf8_size(blocks):
+    """Return the encoded size of a list of code blocks"""
+    return sum(len(code.encode('utf-8', 'surrogatepass')) for code in blocks)
+
+
+@dataclass
+class ExtractionOptions:
+    """Plain options object controlling an extraction run"""
+    convert_sass: bool = True
+    minify_output: bool = False
+    preserve_comments: bool = True
+    create_backup: bool = True
+    extract_inline_styles: bool = True
+    create_project_folder: bool = True
+    combine_files: bool = True
+    workers: int = 1
+    recursive: bool = True
+    include_patterns: list = field(default_factory=lambda: list(DEFAULT_INCLUDE))
+    exclude_patterns: list = field(default_factory=list)
+    incremental: bool = False
+    share_common_blocks: bool = False
+    sass_cache_dir: str = ''
+    sass_cache_mb: int = DEFAULT_CACHE_MB
+    run_log: str = ''
+    stream_threshold_mb: int = DEFAULT_STREAM_THRESHOLD_MB
+    deterministic_output: bool = False
+    backup_mode: str = 'copy'
+    profile: str = ''
+    profile_top: int = 5
+    pipeline: bool = True
+    analyze_output: bool = False
+    analysis_report: str = ''
+    file_timeout: float = 0
+    archive: str = ''
+    archive_level: int = DEFAULT_ARCHIVE_LEVEL
+
+    def to_dict(self):
+        """Return the options as a JSON-serializable dict"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build options from a dict, ignoring unknown keys"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def fingerprint(self):
+        """Return a short hash of everything that affects the extracted output"""
+        data = {k: v for k, v in self.to_dict().items() if k not in _BATCH_ONLY_OPTIONS}
+        data['sass_available'] = SASS_AVAILABLE
+        data['output_format'] = OUTPUT_FORMAT_VERSION
+        encoded = json.dumps(data, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+@dataclass
+class ExtractionResult:
+    """Outcome of extracting a single HTML file"""
+    source: str
+    out_dir: str
+    files_created: list = field(default_factory=list)
+    scripts: int = 0
+    styles: int = 0
+    sass_blocks: int = 0
+    inline_styles: int = 0
+    shared_blocks: int = 0
+    bytes_saved: int = 0
+    encoding: str = 'utf-8'
+    sha256: str = ''
+    stages: dict = field(default_factory=dict)
+    profile: str = ''
+    duration: float = 0.0
+
+
+class ExtractionEngine:
+    """Extract JavaScript, CSS and Sass from HTML files without any GUI
+
+    ``on_result`` is called with the ExtractionResult of every extracted
+    file, including files extracted by batch worker processes; its
+    ``stages`` say where the time of that file went. ``should_stop`` is
+    also checked while a file is being extracted (see cancel.py).
+    """
+
+    def __init__(self, options=None, log=None, progress=None, should_stop=None, on_result=None):
+        self.options = options or ExtractionOptions()
+        self._log = log
+        self._progress = progress
+        self._should_stop = should_stop
+        self._on_result = on_result
+        self.timer = None
+        self.cancel = None
+        self.timed_out = 0
+        self.profile_dir = None
+        self.deferred_writes = None
+        self._skipped = 0
+        self.shared = None
+        self.run_log = None
+        self.archive = None
+        self._backup_fallback_logged = False
+
+    def log(self, msg, tag="normal"):
+        """Forward a log message to the configured callback"""
+        if self._log:
+            self._log(msg, tag)
+
+    def update_progress(self, value, text=""):
+        """Forward progress to the configured callback
+
+        ``value`` is a percentage, or None while the total is unknown
+        (batch files are extracted as they are discovered).
+        """
+        if self._progress:
+            self._progress(value, text)
+
+    def _stage(self, name, nbytes=0):
+        """Return a context manager timing a step of the current extraction"""
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.stage(name, nbytes)
+
+    def _record_result(self, result):
+        """Pass a finished file's result to the run log and the ``on_result`` hook"""
+        if self.run_log is not None:
+            self.run_log.file_ok(result)
+        if self._on_result:
+            self._on_result(result)
+
+    def stop_requested(self):
+        """Return True when the caller asked to stop"""
+        return bool(self._should_stop and self._should_stop())
+
+    def _checkpoint(self):
+        """Abandon the current file here if stop was requested or its time ran out"""
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def _cancel_check(self):
+        """Return the check for the scanner and minifier loops, or None"""
+        return self.cancel.check if self.cancel is not None else None
+
+    def _file_failed(self, html_file, display_name, error):
+        """Log a file that could not be extracted and record it in the run log"""
+        if isinstance(error, ExtractionTimeout):
+            self.timed_out += 1
+            self.log(f"⏱ Abandoned {display_name}: {error}", "warning")
+        else:
+            self.log(f"❌ Failed to process {display_name}: {error}", "error")
+        if self.run_log is not None:
+            self.run_log.file_failed(html_file, error)
+
+    def discover_html_files(self, folder_path, out_dir=None):
+        """Yield ``(html_file, rel_dir)`` for every batch input under a folder"""
+        skip_dirs = []
+        if out_dir and os.path.abspath(out_dir) != os.path.abspath(folder_path):
+            skip_dirs.append(out_dir)
+        return iter_html_files(folder_path,
+                               include=self.options.include_patterns,
+                               exclude=self.options.exclude_patterns,
+                               recursive=self.options.recursive,
+                               skip_dirs=skip_dirs)
+
+    def extract_batch(self, folder_path, out_dir):
+        """Extract every HTML file under a folder, mirroring its layout in out_dir
+
+        Files are extracted as they are discovered, so work starts before
+        the directory walk is finished.
+        """
+        if not os.path.isdir(folder_path):
+            raise ValueError(f"The folder '{folder_path}' does not exist.")
+
+        scope = "recursively" if self.options.recursive else "top level only"
+        self.log(f"🔄 Starting batch extraction ({scope}, "
+                 f"include: {', '.join(self.options.include_patterns)})", "header")
+        self._open_run_log('batch', folder_path, out_dir)
+
+        manifest = None
+        completed = False
+        self.profile_dir = os.path.join(out_dir, PROFILE_DIR) if self.options.profile else None
+        try:
+            self._open_archive(out_dir, append=self.options.incremental)
+            workers = resolve_worker_count(self.options.workers)
+            discovered = self.discover_html_files(folder_path, out_dir)
+            fingerprint = self.options.fingerprint()
+
+            self.shared = None
+            if self.options.share_common_blocks:
+                # Sharing needs every page up front: a census decides what is common
+                discovered = list(discovered)
+                self.shared = self._prepare_shared_blocks([f for f, _ in discovered], out_dir, workers)
+                fingerprint = f"{fingerprint}-{self.shared.fingerprint()}"
+
+            if self.options.incremental:
+                manifest = BuildManifest.load(out_dir, fingerprint)
+                self.log(f"♻ Incremental mode: {len(manifest.entries)} files in manifest", "info")
+
+            self._skipped = 0
+            self.timed_out = 0
+            jobs = self._batch_jobs(discovered, folder_path, out_dir, manifest)
+
+            if workers > 1:
+                self.log(f"⚙ Using {workers} worker processes", "info")
+                results, seen = self._collect_batch(extract_parallel(self, jobs, workers), folder_path, manifest)
+            elif self.options.pipeline and not self.options.profile:
+                # Profiles only tell one file's work apart when files run one at a time
+                results, seen = self._collect_batch(extract_pipelined(self, jobs), folder_path, manifest)
+            else:
+                results, seen = self._extract_batch_sequential(jobs, folder_path, manifest)
+            completed = not self.stop_requested()
+        finally:
+            self._close_archive(complete=completed)
+            if manifest is not None:
+                manifest.save(prune=not self.stop_requested())
+            self._close_run_log()
+
+        if not seen and not self._skipped and not self.stop_requested():
+            raise ValueError("No HTML files found in the selected folder")
+
+        if self._skipped:
+            self.log(f"\n⏭ Skipped {self._skipped} unchanged files", "info")
+        if self.timed_out:
+            self.log(f"\n⏱ {self.timed_out} files abandoned after {self.options.file_timeout:g} s each", "warning")
+        self.log(f"\n📦 Batch finished: {len(results)} of {seen} files extracted", "header")
+        for line in summary_lines(results):
+            self.log(line, "info")
+        self._report_profiles(results)
+        if self.options.analyze_output and not self.stop_requested():
+            if self.options.archive:
+                self.log("ℹ Extracted projects are analyzed in folders only, not in archives", "info")
+            else:
+                self.analyze_output(out_dir)
+        return results
+
+    def analyze_output(self, out_dir, max_logged=10):
+        """Analyze and validate every extracted project under out_dir and log the totals
+
+        Returns the report of ProjectAnalyzer.analyze_tree, also saved as
+        JSON when the ``analysis_report`` option names a file.
+        """
+        self.log(f"\n🔍 Analyzing extracted projects in {out_dir}...", "header")
+        self.update_progress(None, "Analyzing extracted projects")
+        report = ProjectAnalyzer.analyze_tree(out_dir, should_stop=self.stop_requested)
+
+        self.log(f"🔍 Analyzed {report['projects']:,} projects ({report['files']:,} files, "
+                 f"{report['total_size'] / (1024 * 1024):,.1f} MB) in {report['duration']:.2f} s", "info")
+        self.log(f"   script.js: {report['with_js']:,}  style.css: {report['with_css']:,}  "
+                 f"style.scss: {report['with_sass']:,}  backups: {report['with_backup']:,}")
+        if report['projects_with_issues']:
+            counts = ', '.join(f"{kind} {count:,}" for kind, count in sorted(report['issues'].items()))
+            self.log(f"⚠ {report['projects_with_issues']:,} projects with issues ({counts})", "warning")
+            for problem in report['problems'][:max_logged]:
+                self.log(f"   {os.path.relpath(problem['project'], out_dir)}: {'; '.join(problem['issues'])}",
+                         "warning")
+        elif report['projects']:
+            self.log("✅ Every project loads the files it references", "success")
+
+        if self.options.analysis_report:
+            write_text(self.options.analysis_report, json.dumps(report, indent=2, ensure_ascii=False))
+            self.log(f"🧾 Analysis report: {self.options.analysis_report}", "info")
+        return report
+
+    def _report_profiles(self, results):
+        """Keep the profiles of the slowest files and log what stands out in the slowest one"""
+        if not self.options.profile:
+            return
+        kept = keep_slowest_profiles(results, max(self.options.profile_top, 1))
+        if not kept:
+            return
+        self.log(f"🔬 {self.options.profile} captures of the {len(kept)} slowest files in {self.profile_dir}:", "info")
+        for result in kept:
+            self.log(f"   {result.duration:8.3f} s  {os.path.basename(result.profile)}", "info")
+        try:
+            self.log(f"🔬 Top of {os.path.basename(kept[0].profile)}:", "info")
+            for line in profile_highlights(kept[0].profile):
+                self.log(f"   {line}", "info")
+        except Exception as e:
+            self.log(f"⚠ Could not read {kept[0].profile}: {e}", "warning")
+
+    def _batch_jobs(self, discovered, folder_path, out_dir, manifest):
+        """Yield ``(html_file, file_out_dir)`` for the files that need extracting"""
+        exists = self.archive.has if self.archive is not None else os.path.exists
+        for html_file, rel_dir in discovered:
+            file_out_dir = os.path.join(out_dir, rel_dir) if rel_dir else out_dir
+            if manifest is not None:
+                key = self._manifest_key(html_file, folder_path)
+                index_path = os.path.join(self._project_dir(html_file, file_out_dir), 'index.html')
+                if manifest.is_up_to_date(key, html_file, index_path, exists):
+                    self._skipped += 1
+                    if self.run_log is not None:
+                        self.run_log.file_skipped(html_file)
+                    continue
+            yield html_file, file_out_dir
+
+    def _open_run_log(self, mode, source, out_dir):
+        """Start the JSONL run log when one is configured"""
+        self.run_log = None
+        if self.options.run_log:
+            self.run_log = RunLog(self.options.run_log, mode, source, out_dir, self.options.to_dict())
+            self.log(f"🧾 Run log: {self.options.run_log}", "info")
+
+    def _close_run_log(self):
+        """Write the run totals and close the run log"""
+        if self.run_log is not None:
+            self.run_log.close(stopped=self.stop_requested())
+            self.run_log = None
+
+    def _open_archive(self, out_dir, append=True):
+        """Start writing into the output folder's archive when the ``archive`` option asks for one"""
+        self.archive = None
+        if self.options.archive:
+            path = archive_path(out_dir, self.options.archive)
+            self.archive = ArchiveWriter(path, self.options.archive, self.options.archive_level, append,
+                                         self.options.deterministic_output)
+            how = 'appending to' if self.archive.appending else 'writing'
+            level = f", deflate level {self.archive.level}" if self.options.archive == 'zip' else ''
+            self.log(f"📦 Output archive: {how} {path}{level}", "info")
+
+    def _close_archive(self, complete=True):
+        """Finish the archive, if one is being written; see ArchiveWriter.close()"""
+        if self.archive is not None:
+            archive, self.archive = self.archive, None
+            archive.close(complete)
+            if complete or archive.appending:
+                self.log(f"📦 Archive {os.path.basename(archive.path)}: {archive.added:,} files added", "info")
+            else:
+                self.log(f"⏹ Archive {os.path.basename(archive.path)} left unchanged: the batch did not finish",
+                         "warning")
+
+    def _prepare_shared_blocks(self, html_files, out_dir, workers):
+        """Find blocks shared by several pages and write the common files"""
+        self.log(f"🔎 Looking for blocks shared between {len(html_files)} pages...", "info")
+        self.update_progress(None, "Looking for shared blocks")
+
+        shared, contents = find_shared_blocks(self, html_files, out_dir, workers=min(workers, len(html_files) or 1))
+        os.makedirs(out_dir, exist_ok=True)
+        # Pages in any encoding may link the common files, so they always carry
+        # the BOM that _asset_encoding() gives the assets of non-UTF-8 pages
+        encoding = 'utf-8-sig'
+        if contents['js']:
+            self._save_file(os.path.join(out_dir, COMMON_JS),
+                            self._asset_header('common_js') + '\n\n'.join(contents['js']), encoding,
+                            detail=f" ({len(contents['js'])} shared script blocks)")
+        if contents['css']:
+            self._save_file(os.path.join(out_dir, COMMON_CSS),
+                            self._asset_header('common_css') + '\n\n'.join(contents['css']), encoding,
+                            detail=f" ({len(contents['css'])} shared CSS blocks)")
+        if not shared:
+            self.log("ℹ No blocks are shared between pages", "info")
+        return shared
+
+    def page_blocks(self, html_file):
+        """Return the processed ``('js'|'css', code)`` blocks of a page
+
+        Sass blocks and inline-style rules are page-specific and left out.
+        """
+        _, html_content, _ = self._read_html_file(html_file)
+        scan = scan_html(html_content, extract_inline_styles=self.options.extract_inline_styles)
+        js_blocks, css_blocks, _, _ = self._transform_blocks(scan)
+        return [('js', code) for code in js_blocks] + [('css', code) for code in css_blocks]
+
+    @staticmethod
+    def _manifest_key(html_file, folder_path):
+        """Return the manifest key for a batch input (its relative path)"""
+        return os.path.relpath(html_file, folder_path).replace(os.sep, '/')
+
+    def _project_dir(self, html_file, base_out_dir):
+        """Return the folder a file's extracted project is written to"""
+        if self.options.create_project_folder:
+            return os.path.join(base_out_dir, f"{Path(html_file).stem}_extracted")
+        return base_out_dir
+
+    def _extract_batch_sequential(self, jobs, folder_path, manifest=None):
+        """Extract batch jobs one after another in this process"""
+        results = []
+        seen = 0
+        for html_file, file_out_dir in jobs:
+            if self.stop_requested():
+                break
+
+            seen += 1
+            display_name = os.path.relpath(html_file, folder_path)
+            self.update_progress(None, f"Processing {display_name} ({seen - 1} done)")
+
+            self.log(f"\n📄 Processing: {display_name}", "info")
+
+            try:
+                result = self.extract_html(html_file, file_out_dir)
+            except ExtractionCancelled:
+                self.log(f"⏹ Stopped while processing {display_name}", "warning")
+                break
+            except Exception as e:
+                self._file_failed(html_file, display_name, e)
+                continue
+
+            results.append(result)
+            self._record_result(result)
+
+            if manifest is not None:
+                manifest.record(self._manifest_key(html_file, folder_path), html_file, result.sha256)
+
+        return results, seen
+
+    def _collect_batch(self, outcomes, folder_path, manifest=None):
+        """Log and record batch files extracted by worker processes or the pipeline
+
+        ``outcomes`` yields ``(html_file, result, events, error)`` in input
+        order, with the file's log messages buffered in ``events``.
+        """
+        results = []
+        seen = 0
+        for html_file, result, events, error in outcomes:
+            seen += 1
+            display_name = os.path.relpath(html_file, folder_path)
+            self.update_progress(None, f"Processed {display_name} ({seen} done)")
+
+            self.log(f"\n📄 Processing: {display_name}", "info")
+            for msg, tag in events:
+                self.log(msg, tag)
+
+            if isinstance(error, ExtractionCancelled):
+                self.log(f"⏹ Stopped while processing {display_name}", "warning")
+                break
+            if error is not None:
+                self._file_failed(html_file, display_name, error)
+                continue
+
+            results.append(result)
+            self._record_result(result)
+            if manifest is not None:
+                manifest.record(self._manifest_key(html_file, folder_path), html_file, result.sha256)
+
+        return results, seen
+
+    def extract_single_file(self, html_file, out_dir):
+        """Extract single HTML file"""
+        if not os.path.isfile(html_file):
+            raise ValueError(f"The file '{html_file}' does not exist.")
+
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+            self.log(f"📁 Created output directory: {out_dir}", "info")
+
+        self._open_run_log('single', html_file, out_dir)
+        self.profile_dir = os.path.join(out_dir, PROFILE_DIR) if self.options.profile else None
+        try:
+            self._open_archive(out_dir)
+            result = self.extract_html(html_file, out_dir)
+        except Exception as e:
+            if self.run_log is not None:
+                self.run_log.file_failed(html_file, e)
+            raise
+        else:
+            self._record_result(result)
+            for line in summary_lines([result]):
+                self.log(line, "info")
+            self._report_profiles([result])
+            return result
+        finally:
+            self._close_archive()
+            self._close_run_log()
+
+    def watch(self, path, out_dir, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL, polling=False):
+        """Re-extract the HTML files under ``path`` as they change, until stop is requested
+
+        ``path`` is a batch folder or a single file; see watch.py. Returns
+        the results of every re-extraction.
+        """
+        self._open_run_log('watch', path, out_dir)
+        self.profile_dir = os.path.join(out_dir, PROFILE_DIR) if self.options.profile else None
+        try:
+            self._open_archive(out_dir)
+            return watch_and_extract(self, path, out_dir, debounce, poll_interval, polling)
+        finally:
+            self._close_archive()
+            self._close_run_log()
+
+    def extract_html(self, html_file, base_out_dir, raw=None):
+        """Enhanced HTML extraction with standardized file structure
+
+        ``raw`` is the page's content when the caller already read it.
+        Raises ExtractionCancelled when stop is requested meanwhile and
+        ExtractionTimeout past the ``file_timeout`` option, in both cases
+        before any output but the backup is written.
+        Every step is timed into ``result.stages``. With the ``profile``
+        option the extraction also runs under cProfile or tracemalloc,
+        saved to ``result.profile``.
+        """
+        profiler = None
+        if self.options.profile:
+            profiler = Profiler(self.options.profile, self.profile_dir or os.path.join(base_out_dir, PROFILE_DIR),
+                                html_file)
+        self.timer = timer = StageTimer()
+        token = CancelToken(self._should_stop, self.options.file_timeout)
+        self.cancel = token if token.active else None
+        if profiler:
+            profiler.start()
+        try:
+            result = self._extract_html(html_file, base_out_dir, raw)
+        except BaseException:
+            if profiler:
+                profiler.stop(keep=False)
+            raise
+        finally:
+            self.timer = None
+            self.cancel = None
+
+        result.stages = timer.as_dict()
+        if profiler:
+            profiler.stop()
+            result.profile = profiler.path
+            if profiler.peak_bytes is not None:
+                self.log(f"🔬 Peak traced memory: {profiler.peak_bytes / (1024 * 1024):.1f} MB", "info")
+        return result
+
+    def _extract_html(self, html_file, base_out_dir, raw=None):
+        """Extract one page; see extract_html
+
+        The output files are written as they are ready, or queued on
+        ``deferred_writes`` when that is a list (see pipeline.py).
+        """
+        start_time = time.perf_counter()
+        self.log(f"🚀 Starting extraction from: {os.path.basename(html_file)}", "header")
+
+        # Pages too large to hold in memory are streamed from a memory map
+        threshold = self.options.stream_threshold_mb * 1024 * 1024
+        if raw is None and threshold > 0 and os.path.getsize(html_file) >= threshold:
+            result = extract_streaming(self, html_file, base_out_dir, start_time)
+            if result is not None:
+                return result
+
+        # Read the file once; the bytes also serve the backup and the manifest hash
+        read_here = raw is None
+        with self._stage('read'):
+            raw, html_content, encoding = self._read_html_file(html_file, raw)
+            digest = hashlib.sha256(raw)
+        if read_here:
+            self.timer.count('read', len(raw))
+        self._checkpoint()
+        base_name = Path(html_file).stem
+        out_dir = self._prepare_out_dir(html_file, base_out_dir)
+
+        # Create backup if requested
+        if self.options.create_backup:
+            self._create_backup(html_file, out_dir, base_name, digest.digest(), raw)
+            self._checkpoint()
+
+        # Find scripts, styles, style attributes, <head> and </body> in one pass
+        with self._stage('scan', len(raw)):
+            scan = scan_html(html_content, extract_inline_styles=self.options.extract_inline_styles,
+                             check=self._cancel_check())
+        del html_content
+
+        inline_registry = scan.inline_styles
+        inline_styles_content = inline_registry.rules()
+        if inline_registry.count:
+            self.log(f"✅ Extracted {inline_registry.count} inline styles into "
+                     f"{len(inline_registry)} classes", "success")
+
+        all_js_content, all_css_content, extracted_sass, sass_features = self._transform_blocks(scan)
+        if all_js_content:
+            self.log(f"✅ Extracted {len(all_js_content)} script blocks", "success")
+        if all_css_content:
+            self.log(f"✅ Extracted {len(all_css_content)} CSS blocks", "success")
+        if extracted_sass:
+            self.log(f"✅ Extracted {len(extracted_sass)} Sass blocks ({', '.join(sass_features)})", "success")
+
+        bytes_saved = 0
+        if self.options.minify_output or not self.options.preserve_comments:
+            before = _utf8_size(scan.scripts) + _utf8_size(scan.styles)
+            after = _utf8_size(all_js_content) + _utf8_size(all_css_content) + _utf8_size(extracted_sass)
+            bytes_saved = before - after
+            if before:
+                self.log(f"🗜 Minified {before:,} → {after:,} bytes (saved {bytes_saved:,}, "
+                         f"{bytes_saved / before:.0%})", "info")
+
+        # Leave the leading blocks shared with other pages to common.js / common.css
+        common_js = common_css = None
+        shared_count = 0
+        if self.shared:
+            shared_js = self.shared.shared_count('js', all_js_content)
+            shared_css = self.shared.shared_count('css', all_css_content)
+            if shared_js:
+                common_js = self.shared.href(COMMON_JS, out_dir)
+            if shared_css:
+                common_css = self.shared.href(COMMON_CSS, out_dir)
+            shared_count = shared_js + shared_css
+            if shared_count:
+                self.log(f"♻ {shared_count} blocks are shared with other pages", "info")
+            all_js_content, all_css_content = all_js_content[shared_js:], all_css_content[shared_css:]
+
+        # Last chance to give up: from here on the project folder is being updated
+        self._checkpoint()
+
+        # Save extracted files with standard names
+        files_created = self._save_extracted_files(out_dir, all_js_content, all_css_content,
+                                                   inline_styles_content, extracted_sass,
+                                                   self._asset_encoding(encoding))
+
+        # Build the updated HTML once, with the new references in place
+        with self._stage('refs'):
+            html_content = self._update_html_with_standard_refs(scan, files_created, common_css, common_js)
+
+        # Save updated HTML as index.html
+        self._save_index_html(html_content, out_dir, encoding)
+
+        # Generate summary
+        self._log_extraction_summary_enhanced(files_created, out_dir, base_name)
+
+        return ExtractionResult(
+            source=html_file,
+            out_dir=out_dir,
+            files_created=self._created_file_names(files_created),
+            scripts=len(all_js_content),
+            styles=len(all_css_content),
+            sass_blocks=len(extracted_sass),
+            inline_styles=inline_registry.count,
+            shared_blocks=shared_count,
+            bytes_saved=bytes_saved,
+            encoding=encoding,
+            sha256=digest.hexdigest(),
+            duration=time.perf_counter() - start_time,
+        )
+
+    def _prepare_out_dir(self, html_file, base_out_dir):
+        """Create and return the folder a page is extracted into
+
+        In archive mode the folder only exists as member names.
+        """
+        out_dir = self._project_dir(html_file, base_out_dir)
+        if self.archive is None:
+            os.makedirs(out_dir, exist_ok=True)
+            action = "Created project folder"
+        else:
+            action = f"Project folder in {os.path.basename(self.archive.path)}"
+        if self.options.create_project_folder:
+            self.log(f"📁 {action}: {os.path.basename(out_dir)}", "folder")
+
+        self.log(f"📂 Output directory: {out_dir}", "info")
+        self.log("-" * 60)
+        return out_dir
+
+    def _create_backup(self, html_file, out_dir, base_name, digest, raw=None):
+        """Save the original page, byte for byte, as ``<name>_original.html``
+
+        ``backup_mode`` picks a plain copy, a hard link or a copy-on-write
+        reflink; links fall back to a copy where the filesystem cannot make
+        them, and in archive mode it is always a member of its own. ``raw``
+        is the page already in memory, written out directly when copying.
+        """
+        backup_path = os.path.join(out_dir, f"{base_name}_original.html")
+        size = len(raw) if raw is not None else os.path.getsize(html_file)
+        self._output('backup', size, lambda: self._write_backup(html_file, backup_path, digest, raw))
+
+    def _write_backup(self, html_file, backup_path, digest, raw):
+        """Link or copy the page to ``backup_path`` and log it"""
+        backup_name = os.path.basename(backup_path)
+        mode = self.options.backup_mode
+        if self.archive is not None:
+            if raw is not None:
+                self.archive.add_bytes(backup_path, raw)
+            else:
+                self.archive.add_file(backup_path, html_file)
+            self.log(f"💾 Created backup: {backup_name}", "info")
+            return
+        if mode in ('hardlink', 'reflink'):
+            try:
+                if link_file(html_file, backup_path, mode, digest):
+                    self.log(f"💾 Created backup ({mode}): {backup_name}", "info")
+                else:
+                    self.log(f"💾 Unchanged backup: {backup_name}", "info")
+                return
+            except OSError as e:
+                if not self._backup_fallback_logged:
+                    self._backup_fallback_logged = True
+                    self.log(f"⚠ Cannot {mode} backups here ({e.strerror or e}); copying instead", "warning")
+
+        if raw is not None:
+            changed = write_bytes(backup_path, raw)
+        else:
+            changed = copy_file(html_file, backup_path, digest)
+        self.log(f"💾 {'Created' if changed else 'Unchanged'} backup: {backup_name}", "info")
+
+    def _read_html_file(self, html_file, raw=None):
+        """Read an HTML file once and return ``(raw_bytes, text, encoding)``
+
+        With ``raw`` given, only decodes it.
+        """
+        if raw is None:
+            with open(html_file, 'rb') as f:
+                raw = f.read()
+        content, encoding, source = decode_html(raw)
+        if not is_utf8(encoding):
+            self.log(f"⚠ File read with {encoding} encoding ({source})", "warning")
+        return raw, content, encoding
+
+    @staticmethod
+    def _asset_encoding(page_encoding):
+        """Return the encoding for a page's extracted JS/CSS files
+
+        Assets are always UTF-8. Next to a page in another encoding they get
+        a BOM, since browsers otherwise decode them with the page's encoding.
+        """
+        return 'utf-8' if is_utf8(page_encoding) else 'utf-8-sig'
+
+    def _transform_blocks(self, scan):
+        """Process scanned blocks into ``(scripts, css, sass, sass_features)``
+
+        ``sass_features`` names, in first-seen order, the Sass features
+        that marked blocks as Sass.
+        """
+        scripts = []
+        with self._stage('scripts', _utf8_size(scan.scripts)):
+            for js_code in scan.scripts:
+                self._checkpoint()
+                scripts.append(self._process_javascript(js_code))
+        css_styles = []
+        sass_styles = []
+        sass_features = []
+
+        with self._stage('styles', _utf8_size(scan.styles)):
+            for css_code in scan.styles:
+                self._checkpoint()
+                feature = self._detect_sass(css_code)
+                if feature:
+                    sass_styles.append(self._process_stylesheet(css_code, sass=True))
+                    if feature not in sass_features:
+                        sass_features.append(feature)
+                else:
+                    css_styles.append(self._process_stylesheet(css_code))
+
+        return scripts, css_styles, sass_styles, sass_features
+
+    def _asset_header(self, kind):
+        """Return the comment heading a generated file of the given kind
+
+        ``kind`` is a key of _ASSET_TITLES. The generation time is left out
+        with ``deterministic_output``, so unchanged input gives identical files.
+        """
+        comment, title = _ASSET_TITLES[kind]
+        lines = [f"{title} - Generated by HTML Extractor"]
+        if not self.options.deterministic_output:
+            lines.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        if comment == '//':
+            return ''.join(f"// {line}\n" for line in lines) + "\n"
+        return ''.join(f"/* {line} */\n" for line in lines) + "\n"
+
+    def _output(self, stage, nbytes, save):
+        """Run ``save``, which writes one output file and logs it, as a timed stage
+
+        When ``deferred_writes`` is a list, ``save`` is queued there instead,
+        for the batch pipeline's writer thread.
+        """
+        if self.deferred_writes is not None:
+            self.deferred_writes.append(PendingWrite(stage, nbytes, save))
+            return
+        with self._stage(stage, nbytes):
+            save()
+
+    def _save_file(self, path, text, encoding='utf-8', errors='strict', detail='', note=None):
+        """Encode and atomically write an output file, then log it
+
+        ``note`` is logged instead of the usual Created/Unchanged line.
+        """
+        data = text.encode(encoding, errors)
+
+        def save():
+            changed = self._write_bytes(path, data)
+            if note:
+                self.log(note, "success")
+            else:
+                self._log_saved(os.path.basename(path), changed, detail)
+
+        self._output('write', len(data), save)
+
+    def _write_bytes(self, path, data):
+        """Write an output file atomically, or add it to the archive; return True if it changed"""
+        if self.archive is not None:
+            self.archive.add_bytes(path, data)
+            return True
+        return write_bytes(path, data)
+
+    def _open_output(self, path):
+        """Return an AtomicFile-like object to write an output file in pieces"""
+        if self.archive is not None:
+            return self.archive.open(path)
+        return AtomicFile(path)
+
+    def _scratch_dir(self, out_dir):
+        """Return the folder for temporary files of a page extracted into ``out_dir``"""
+        return self.archive.root if self.archive is not None else out_dir
+
+    def _log_saved(self, name, changed, detail=''):
+        """Log a written file, or that it already had the same content"""
+        if changed:
+            self.log(f"📄 Created: {name}{detail}", "success")
+        else:
+            self.log(f"📄 Unchanged: {name}{detail}", "info")
+
+    def _save_extracted_files(self, out_dir, js_content, css_content, inline_styles, sass_content,
+                              encoding='utf-8'):
+        """Save extracted content to standardized files"""
+        files_created = {
+            'js': False,
+            'css': False,
+            'sass': False
+        }
+
+        # Combine and save JavaScript
+        if js_content:
+            combined_js = '\n\n'.join(js_content)
+            self._save_file(os.path.join(out_dir, 'script.js'), self._asset_header('js') + combined_js, encoding)
+            files_created['js'] = True
+
+        # Combine CSS (inline style rules, then any compiled Sass, follow the blocks)
+        all_css = css_content + inline_styles
+        compiled = None
+        if sass_content:
+            compiled = self._save_sass(out_dir, sass_content, encoding)
+            files_created['sass'] = True
+        if compiled is not None:
+            css_text = self._asset_header('css' if all_css else 'compiled') + '\n\n'.join(all_css + [compiled])
+        elif all_css:
+            css_text = self._asset_header('css') + '\n\n'.join(all_css)
+        else:
+            css_text = None
+
+        if css_text is not None:
+            self._save_file(os.path.join(out_dir, 'style.css'), css_text, encoding,
+                            note="✅ Compiled Sass → style.css" if compiled is not None else None)
+            files_created['css'] = True
+
+        return files_created
+
+    def _save_sass(self, out_dir, sass_content, encoding='utf-8'):
+        """Save Sass blocks as style.scss and return them compiled to CSS
+
+        Returns None when Sass conversion is off, libsass is missing or the
+        source does not compile; the compiled CSS is meant to be appended to
+        style.css, after the page's plain CSS.
+        """
+        combined_sass = '\n\n'.join(sass_content)
+        self._save_file(os.path.join(out_dir, 'style.scss'), self._asset_header('sass') + combined_sass, encoding)
+        if not (self.options.convert_sass and SASS_AVAILABLE):
+            return None
+        try:
+            compiler = get_compiler(self.options.sass_cache_dir, self.options.sass_cache_mb)
+            output_style = 'compressed' if self.options.minify_output else 'expanded'
+            with self._stage('sass', _utf8_size([combined_sass])):
+                return compiler.compile(combined_sass, output_style=output_style, include_paths=[out_dir])
+        except Exception as e:
+            self.log(f"❌ Failed to compile Sass: {e}", "error")
+            return None
+
+    def _update_html_with_standard_refs(self, scan, files_created, common_css=None, common_js=None):
+        """Render the scanned HTML with references to standard files
+
+        ``common_css`` / ``common_js`` are URLs of the batch-wide shared
+        files, referenced ahead of the page's own files.
+        """
+        inserts = self._reference_inserts(scan.head_index is not None, scan.body_close_index is not None,
+                                          files_created, common_css, common_js)
+        return scan.render(*inserts)
+
+    def _reference_inserts(self, has_head, has_body_close, files_created, common_css=None, common_js=None):
+        """Return the ``(head, body, tail)`` markup referencing the standard files"""
+        head_insert = body_insert = tail_insert = ''
+
+        # Add CSS links if CSS was created
+        css_hrefs = [href for href in (common_css, 'style.css' if files_created['css'] else None) if href]
+        if css_hrefs and has_head:
+            head_insert = ''.join(f'\n    <link rel="stylesheet" href="{href}">' for href in css_hrefs)
+            self.log(f"✅ Added CSS link to <head>", "success")
+
+        # Add script tags if JS was created
+        js_hrefs = [href for href in (common_js, 'script.js' if files_created['js'] else None) if href]
+        if js_hrefs:
+            script_tags = ''.join(f'\n    <script src="{href}"></script>' for href in js_hrefs)
+            if has_body_close:
+                body_insert = script_tags + '\n'
+                self.log(f"✅ Added script tag before </body>", "success")
+            else:
+                # Append at end if no </body>
+                tail_insert = script_tags.replace('\n    ', '\n')
+                self.log(f"✅ Added script tag at end of file", "success")
+
+        return head_insert, body_insert, tail_insert
+
+    def _save_index_html(self, html_content, out_dir, encoding='utf-8'):
+        """Save the updated HTML as index.html, in the encoding the source used"""
+        index_path = os.path.join(out_dir, 'index.html')
+
+        try:
+            self._save_file(index_path, html_content, encoding, errors='xmlcharrefreplace')
+        except Exception as e:
+            raise Exception(f"Failed to save index.html: {e}")
+
+    def _detect_sass(self, css_code):
+        """Return the Sass feature that marks ``css_code`` as Sass, or None"""
+        return detect_sass(css_code)
+
+    def _process_javascript(self, js_code):
+        """Process JavaScript code (minify if requested, preserve comments)"""
+        return minify_js(js_code, strip_comments=not self.options.preserve_comments,
+                         collapse_whitespace=self.options.minify_output, check=self._cancel_check())
+
+    def _process_stylesheet(self, css_code, sass=False):
+        """Process CSS/Sass code (minify if requested, preserve comments)"""
+        return minify_css(css_code, strip_comments=not self.options.preserve_comments,
+                          collapse_whitespace=self.options.minify_output, sass=sass,
+                          check=self._cancel_check())
+
+    def _created_file_names(self, files_created):
+        """Return the names of the files written for a project"""
+        created_files = []
+        if files_created['js']:
+            created_files.append("script.js")
+        if files_created['css']:
+            created_files.append("style.css")
+        if files_created['sass']:
+            created_files.append("style.scss")
+        created_files.append("index.html")
+        return created_files
+
+    def _log_extraction_summary_enhanced(self, files_created, out_dir, base_name):
+        """Log enhanced extraction summary"""
+        self.log("-" * 60)
+        self.log("📊 EXTRACTION SUMMARY:", "header")
+
+        created_files = self._created_file_names(files_created)
+
+        self.log(f"   📁 Project folder: {os.path.basename(out_dir)}", "folder")
+        self.log(f"   📄 Files created: {', '.join(created_files)}")
+        self.log(f"   🏗️ Structure: Standard web project layout")
+
+        if self.options.create_backup:
+            self.log(f"   💾 Backup: {base_name}_original.html")
+
+        total_files = len(created_files)
+        if self.options.create_backup:
+            total_files += 1
+
+        self.log(f"   📊 Total files: {total_files}")
+        self.log("   ✨ Ready for development!")
@@ -0,0 +1,116 @@
+"""Content-hash manifest for incremental batch extraction
+
+The manifest lives in the batch output directory and remembers, for each
+source file, its size, modification time and SHA-256 along with a
+fingerprint of the options that produced the output. A file whose size and
+mtime still match (and whose output still exists) is skipped after a
+single ``stat``; when only the mtime moved, the content hash decides.
+"""
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_NAME = '.html_extractor_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Per-output-directory record of what has already been extracted"""
+
+    def __init__(self, path, fingerprint, entries=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.entries = entries or {}
+        self.seen = set()
+        self.dirty = False
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def load(cls, out_dir, fingerprint):
+        """Load the manifest for ``out_dir``; entries for other options are dropped"""
+        path = os.path.join(out_dir, MANIFEST_NAME)
+        entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                entries = {key: entry for key, entry in data.get('files', {}).items()
+                           if entry.get('options') == fingerprint}
+        except (OSError, ValueError):
+            pass  # Missing or unreadable manifest: everything is extracted again
+        return cls(path, fingerprint, entries)
+
+    def is_up_to_date(self, key, html_file, output_path, exists=os.path.exists):
+        """Return True when ``html_file`` needs no extraction
+
+        ``output_path`` is a file the previous extraction wrote (the
+        project's index.html); if it is gone the file is extracted again.
+        ``exists`` tells whether it is there (for archive output, whether
+        the archive holds it).
+        """
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+
+        try:
+            st = os.stat(html_file)
+        except OSError:
+            return False
+        if st.st_size != entry['size'] or not exists(output_path):
+            return False
+        if st.st_mtime_ns == entry['mtime_ns']:
+            return True
+
+        # Touched but maybe not changed: let the content decide
+        if file_sha256(html_file) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = st.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, key, html_file, sha256=None):
+        """Remember a successful extraction of ``html_file``
+
+        ``sha256`` is the digest of the bytes that were extracted, when the
+        caller already has it; otherwise the file is hashed again.
+        """
+        st = os.stat(html_file)
+        self.entries[key] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': sha256 or file_sha256(html_file),
+            'options': self.fingerprint,
+        }
+        self.seen.add(key)
+        self.dirty = True
+        if time.monotonic() - self._last_save > 30:
+            self.save()
+
+    def save(self, prune=False):
+        """Write the manifest atomically; ``prune`` drops files not seen this run"""
+        if prune:
+            stale = set(self.entries) - self.seen
+            for key in stale:
+                del self.entries[key]
+            self.dirty = self.dirty or bool(stale)
+        if not self.dirty:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self._last_save = time.monotonic()
@@ -0,0 +1,214 @@
+"""Token-aware, single-pass minification of JavaScript and CSS/Sass
+
+Each block is walked once by a single token pattern. Plain code between
+tokens is copied in slices; strings, template literals, regular expression
+literals and unquoted ``url(...)`` values are copied verbatim, and every
+run of whitespace and comments is replaced in one step according to what
+sits on either side of it. JavaScript keeps a newline wherever dropping it
+could change automatic semicolon insertion.
+"""
+import re
+
+from .cancel import CHECK_EVERY
+
+_BLOCK_COMMENT = r'/\*[\s\S]*?(?:\*/|\Z)'
+_LINE_COMMENT = r'//[^\n\r]*'
+
+# Characters that may start something other than plain code.
+_JS_SPECIAL_RE = re.compile(r'[\s"\'`/]')
+_CSS_SPECIAL_RE = re.compile(r'[\s"\'/(]')
+
+_GAP_RES = {
+    False: re.compile(rf'(?:\s+|{_BLOCK_COMMENT})+'),
+    True: re.compile(rf'(?:\s+|{_BLOCK_COMMENT}|{_LINE_COMMENT})+'),
+}
+_STRING_RES = {
+    '"': re.compile(r'"(?:[^"\\\n]|\\[\s\S])*"?'),
+    "'": re.compile(r"'(?:[^'\\\n]|\\[\s\S])*'?"),
+    '`': re.compile(r'`(?:[^`\\]|\\[\s\S])*`?'),
+}
+_URL_ARGUMENT_RE = re.compile(r'''\(\s*(?=[^\s"'])[^)]*\)''')
+_COMMENT_RE = re.compile(f'{_BLOCK_COMMENT}|{_LINE_COMMENT}')
+_BLOCK_COMMENT_RE = re.compile(_BLOCK_COMMENT)
+_SPACE_RUN_RE = re.compile(r'\s+')
+_REGEX_LITERAL_RE = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/')
+
+# After these words a "/" starts a regular expression, not a division.
+_REGEX_KEYWORDS = frozenset(('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                             'throw', 'case', 'do', 'else', 'yield', 'await'))
+_REGEX_PREV_CHARS = frozenset('(,=:[!&|?{};+-*%<>~^')
+
+# A newline between these and the next token never ends a statement.
+_JS_NEWLINE_AFTER = frozenset('{;,([=:?&|*%<>~^!')
+_JS_NEWLINE_BEFORE = frozenset(')};,]:?.=&|*%<>~^')
+
+# Whitespace next to these is never needed in CSS.
+_CSS_TIGHT_AFTER = frozenset('{};,>:(')
+_CSS_TIGHT_BEFORE = frozenset('{};,>)!')
+
+
+def _is_word(char):
+    return char.isalnum() or char in '_$\\' or char > '\x7f'
+
+
+def _js_separator(prev, nxt, newline):
+    """Return what a run of whitespace/comments between two JS tokens becomes"""
+    if not prev or not nxt:
+        return ''
+    if newline and prev not in _JS_NEWLINE_AFTER and nxt not in _JS_NEWLINE_BEFORE:
+        return '\n'
+    if ((_is_word(prev) and _is_word(nxt))
+            or (prev in '+-' and nxt in '+-')
+            or (prev == '/' and nxt in '/*')
+            or (nxt == '.' and prev.isdigit())):
+        return ' '
+    return ''
+
+
+def _css_separator(prev, nxt, newline):
+    """Return what a run of whitespace/comments between two CSS tokens becomes"""
+    if not prev or not nxt or prev in _CSS_TIGHT_AFTER or nxt in _CSS_TIGHT_BEFORE:
+        return ''
+    return ' '
+
+
+def _drop_last_char(out):
+    """Remove the last character written and return the one before it"""
+    out[-1] = out[-1][:-1]
+    if not out[-1]:
+        out.pop()
+    return out[-1][-1] if out else ''
+
+
+def _slash_starts_regex(out):
+    """Decide from the code written so far whether a "/" opens a regular expression"""
+    text = ''
+    for piece in reversed(out):
+        text = piece.rstrip()
+        if text:
+            break
+    if not text:
+        return True
+    prev = text[-1]
+    if prev in _REGEX_PREV_CHARS:
+        return True
+    if _is_word(prev):
+        start = len(text) - 1
+        while start > 0 and _is_word(text[start - 1]):
+            start -= 1
+        return text[start:] in _REGEX_KEYWORDS
+    return False
+
+
+def _minify(code, js, strip_comments, collapse_whitespace, line_comments, check=None):
+    """Walk ``code`` once, copying tokens and rewriting the gaps between them
+
+    ``check``, when given, is called every CHECK_EVERY tokens and may raise
+    to abandon the block.
+    """
+    code = code.strip()
+    if not (strip_comments or collapse_whitespace):
+        return code
+
+    search = (_JS_SPECIAL_RE if js else _CSS_SPECIAL_RE).search
+    gap_match = _GAP_RES[line_comments].match
+    comment_re = _COMMENT_RE if line_comments else _BLOCK_COMMENT_RE
+    separator = _js_separator if js else _css_separator
+    out = []
+    append = out.append
+    last = ''    # last character written
+    pos = 0      # where the search resumes
+    plain = 0    # start of the plain code not yet written
+    length = len(code)
+    steps = 0
+    last_paren = None   # position of the last ")", looked up at the first url(
+
+    while True:
+        steps += 1
+        if check is not None and steps % CHECK_EVERY == 0:
+            check()
+        match = search(code, pos)
+        start = match.start() if match else length
+        if start > plain:
+            text = code[plain:start]
+            if collapse_whitespace:
+                if last == ';' and text[0] == '}':
+                    _drop_last_char(out)
+                text = text.replace(';}', '}')
+            append(text)
+            last = text[-1]
+        if match is None:
+            break
+        char = code[start]
+
+        if char == ' ' and collapse_whitespace and start + 1 < length:
+            # A lone space between two words is already minimal: keep it in the plain code
+            nxt = code[start + 1]
+            if _is_word(nxt) and _is_word(code[start - 1]):
+                plain = start
+                pos = start + 1
+                continue
+
+        if char in _STRING_RES:
+            end = _STRING_RES[char].match(code, start).end()
+            text = code[start:end]
+        elif char == '(':
+            # An unquoted url(...) may hold "//" or spaces that must survive
+            end = start + 1
+            if code[start - 3:start].lower() == 'url' and (start < 4 or not _is_word(code[start - 4])):
+                if last_paren is None:
+                    last_paren = code.rfind(')')
+                # Without a ")" after it, url( is plain code; skip the search to the end of the block
+                url = _URL_ARGUMENT_RE.match(code, start) if start < last_paren else None
+                if url is not None:
+                    end = url.end()
+            text = code[start:end]
+        else:
+            gap = gap_match(code, start)
+            if gap is None:
+                # A "/" that is not a comment: division, or a JavaScript regex literal
+                literal = _REGEX_LITERAL_RE.match(code, start) if js and _slash_starts_regex(out) else None
+                end = literal.end() if literal is not None else start + 1
+                text = code[start:end]
+            else:
+                end = gap.end()
+                text = gap.group()
+                nxt = code[end] if end < length else ''
+                if not collapse_whitespace:
+                    if strip_comments and '/' in text:
+                        text = comment_re.sub('', text) or separator(last, nxt, False)
+                elif not strip_comments and '/' in text:
+                    # Comments stay; runs of whitespace around them shrink to one character
+                    text = _SPACE_RUN_RE.sub(lambda m: '\n' if '\n' in m.group() else ' ', text)
+                else:
+                    text = separator(last, nxt, '\n' in text or '\r' in text)
+                    if not text and last == ';' and nxt == '}':
+                        last = _drop_last_char(out)
+
+        if text:
+            append(text)
+            last = text[-1]
+        pos = plain = end
+
+    return ''.join(out)
+
+
+def minify_js(code, strip_comments=True, collapse_whitespace=True, check=None):
+    """Return JavaScript with comments stripped and/or whitespace collapsed
+
+    Strings, template literals and regular expression literals are left
+    untouched, and line breaks that may end a statement are kept.
+    ``check`` is called now and then during long blocks (see cancel.py).
+    """
+    return _minify(code, True, strip_comments, collapse_whitespace, True, check)
+
+
+def minify_css(code, strip_comments=True, collapse_whitespace=True, sass=False, check=None):
+    """Return CSS (or Sass with ``sass=True``) with comments stripped and/or whitespace collapsed
+
+    Strings and unquoted ``url(...)`` values are left untouched. In Sass,
+    ``//`` line comments are recognised too; when kept while collapsing
+    whitespace, the newline ending each one is kept as well. ``check`` is
+    as for minify_js.
+    """
+    return _minify(code, False, strip_comments, collapse_whitespace, sass, check)
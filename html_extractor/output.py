@@ -0,0 +1,222 @@
+"""Atomic, change-aware writing of extracted files
+
+Every file of an extracted project goes through this module. Content is
+written to a temporary file in the destination folder and renamed over the
+destination, so a crash or a Stop mid-write never leaves a truncated file
+behind. When the destination already holds the same bytes (same size, then
+same SHA-256) nothing is replaced and its mtime stays as it was. With
+``ExtractionOptions.deterministic_output``, which leaves the timestamps out
+of generated headers, re-running an unchanged extraction touches no file.
+
+Backups can also be hard links or copy-on-write clones (reflinks) of the
+source page, which cost no data copy at all where the filesystem allows.
+"""
+import errno
+import hashlib
+import os
+import secrets
+import shutil
+import sys
+
+CHUNK_SIZE = 1024 * 1024
+
+BACKUP_MODES = ('copy', 'hardlink', 'reflink')
+
+# Linux ioctl cloning a whole file (btrfs, XFS, bcachefs, overlayfs on them).
+_FICLONE = 0x40049409
+
+_TEMP_FLAGS = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_NOINHERIT', 0)
+
+
+def make_temp_file(directory, prefix='', suffix='.tmp'):
+    """Create a new temporary file in ``directory``; return ``(fd, path)``
+
+    Unlike tempfile.mkstemp, which makes files readable by the owner only,
+    the file gets the mode of any new file (0666 less the umask), since it
+    is renamed into place as an output.
+    """
+    for _ in range(100):
+        path = os.path.join(directory, f"{prefix}{secrets.token_hex(4)}{suffix}")
+        try:
+            return os.open(path, _TEMP_FLAGS, 0o666), path
+        except FileExistsError:
+            continue
+    raise FileExistsError(errno.EEXIST, "No unused temporary file name", directory)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _has_content(path, size, digest):
+    """Return True when ``path`` exists with exactly ``size`` bytes hashing to ``digest``"""
+    try:
+        if os.stat(path).st_size != size:
+            return False
+        return _file_digest(path) == digest
+    except OSError:
+        return False
+
+
+def _commit(tmp_path, path, size, digest):
+    """Rename a finished temporary file over ``path`` unless ``path`` already matches it"""
+    if _has_content(path, size, digest):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+class AtomicFile:
+    """Binary output file that only replaces its destination once complete
+
+    Use as a context manager. ``changed`` tells, after a clean exit, whether
+    the destination was replaced; leaving the block with an exception
+    discards everything written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.changed = None
+        self.size = 0
+        self._digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp_path = make_temp_file(directory, prefix=f".{os.path.basename(path)}.")
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self._file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+
+    def close(self):
+        """Finish the file; return True if the destination changed"""
+        if self._file.closed:
+            return self.changed
+        self._file.close()
+        self.changed = _commit(self._tmp_path, self.path, self.size, self._digest.digest())
+        return self.changed
+
+    def discard(self):
+        """Drop what was written and leave the destination alone"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_bytes(path, data):
+    """Atomically write ``data`` to ``path``; return False if it already held them"""
+    if _has_content(path, len(data), hashlib.sha256(data).digest()):
+        return False
+    with AtomicFile(path) as f:
+        f.write(data)
+    return f.changed
+
+
+def write_text(path, text, encoding='utf-8', errors='strict'):
+    """Atomically write ``text`` to ``path``, without newline translation
+
+    Returns False when ``path`` already held exactly these bytes.
+    """
+    return write_bytes(path, text.encode(encoding, errors))
+
+
+def _temp_name(path):
+    """Return an unused temporary name next to ``path``, without creating it"""
+    fd, tmp_path = make_temp_file(os.path.dirname(os.path.abspath(path)), prefix=f".{os.path.basename(path)}.")
+    os.close(fd)
+    os.remove(tmp_path)
+    return tmp_path
+
+
+def copy_file(src, path, digest=None):
+    """Atomically copy ``src`` to ``path``; return False if ``path`` was already identical
+
+    With the SHA-256 ``digest`` of ``src`` already known, the data is copied
+    by the OS (``sendfile`` and the like) instead of through Python.
+    """
+    if digest is None:
+        with open(src, 'rb') as source, AtomicFile(path) as f:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                f.write(chunk)
+        return f.changed
+
+    size = os.path.getsize(src)
+    if _has_content(path, size, digest):
+        return False
+    tmp_path = _temp_name(path)
+    try:
+        shutil.copyfile(src, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return True
+
+
+def _reflink(src, dst):
+    """Create ``dst`` as a copy-on-write clone of ``src``, or raise OSError"""
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, 'rb') as source, open(dst, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src, path, mode, digest=None):
+    """Make ``path`` a hard link (``'hardlink'``) or reflink (``'reflink'``) of ``src``
+
+    The link is made under a temporary name and renamed into place.
+    Returns False when ``path`` is already the same file, or already holds
+    content hashing to ``digest``. Raises OSError when the platform or
+    filesystem cannot link, leaving ``path`` alone; callers then copy.
+    """
+    if os.path.exists(path) and os.path.samefile(src, path):
+        return False
+    if digest is not None and _has_content(path, os.path.getsize(src), digest):
+        return False
+    tmp_path = _temp_name(path)
+    if mode == 'hardlink':
+        os.link(src, tmp_path)
+    else:
+        _reflink(src, tmp_path)
+    os.replace(tmp_path, path)
+    return True
+
+
+def replace_file(tmp_path, path):
+    """Move a finished temporary file to ``path``, unless ``path`` already matches it
+
+    Returns True when ``path`` changed; ``tmp_path`` is gone either way.
+    """
+    return _commit(tmp_path, path, os.path.getsize(tmp_path), _file_digest(tmp_path))
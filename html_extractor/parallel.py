@@ -0,0 +1,166 @@
+"""Parallel batch extraction over a pool of worker processes
+
+Each file is extracted in a worker process by a private ExtractionEngine
+whose log messages are buffered and shipped back with the result. Results
+come back in submission order, so the caller can replay the messages and
+the log reads exactly as it would for a sequential run no matter which
+worker finishes first.
+
+In archive mode a worker cannot write into the archive itself: its files
+come back with the result (see archive.MemberBuffer) and the parent adds
+them, in input order.
+
+Every worker shares one multiprocessing Event with the parent. Setting it
+on stop makes the files being extracted give up at their next cancellation
+point (see cancel.py) instead of running to the end.
+
+Workers ignore Ctrl+C, which the terminal sends to the whole process
+group: the parent handles it, and terminates its workers when it leaves
+the pool on an exception.
+"""
+from collections import deque
+import os
+import signal
+import sys
+
+from .archive import MemberBuffer, discard_members
+from .cancel import ExtractionCancelled, ExtractionTimeout
+
+# Seconds between two stop checks while waiting on a worker
+_POLL = 0.1
+
+# Set in each worker process by _init_worker
+_stop_event = None
+
+
+def resolve_worker_count(workers):
+    """Translate the ``workers`` option into a process count (0 = all cores)"""
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def ignore_interrupts():
+    """Leave Ctrl+C to the parent process; a pool initializer"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def terminate_pool(pool):
+    """Cancel the pending work of a ProcessPoolExecutor and kill its workers now"""
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    if sys.version_info >= (3, 9):
+        pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        pool.shutdown(wait=False)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+def _init_worker(stop_event):
+    """Keep the parent's stop event for the extractions of this worker process"""
+    global _stop_event
+    _stop_event = stop_event
+    ignore_interrupts()
+
+
+def _extract_in_worker(options_dict, html_file, out_dir, shared=None, profile_dir=None, archive_file=None):
+    """Extract one file inside a worker process
+
+    Returns ``(result, events, error, members)`` where ``events`` is the
+    list of ``(message, tag)`` log calls made while extracting. ``error`` is
+    the ExtractionCancelled or ExtractionTimeout raised, or the message of
+    any other error. ``members`` are the files written, for the archive
+    ``archive_file``; without one they are on disk already.
+    """
+    from .engine import ExtractionEngine, ExtractionOptions
+
+    events = []
+    engine = ExtractionEngine(ExtractionOptions.from_dict(options_dict),
+                              log=lambda msg, tag="normal": events.append((msg, tag)),
+                              should_stop=_stop_event.is_set if _stop_event is not None else None)
+    engine.shared = shared
+    engine.profile_dir = profile_dir
+    if archive_file is not None:
+        engine.archive = MemberBuffer(archive_file)
+    members = engine.archive.members if engine.archive is not None else []
+    try:
+        return engine.extract_html(html_file, out_dir), events, None, members
+    except (ExtractionCancelled, ExtractionTimeout) as e:
+        return None, events, e, members
+    except Exception as e:
+        return None, events, str(e), members
+
+
+def extract_parallel(engine, jobs, workers):
+    """Yield ``(html_file, result, events, error)`` per job, in input order
+
+    ``jobs`` is any iterable of ``(html_file, out_dir)`` pairs, consumed
+    lazily so files can be submitted while they are still being
+    discovered; at most ``2 * workers`` files are in
+    flight at once. ``engine.stop_requested()`` is checked while waiting
+    for results: pending work is cancelled and files already running are
+    abandoned at their next cancellation point.
+    """
+    # Only loaded here: most runs never start a process pool
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    import multiprocessing
+
+    workers = resolve_worker_count(workers)
+    options_dict = engine.options.to_dict()
+    pending = deque()
+    jobs = iter(jobs)
+    stop_event = multiprocessing.Event()
+    archive_file = engine.archive.path if engine.archive is not None else None
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop_event,))
+    try:
+        def submit_next():
+            job = next(jobs, None)
+            if job is None:
+                return False
+            html_file, out_dir = job
+            future = pool.submit(_extract_in_worker, options_dict, html_file, out_dir, engine.shared,
+                                 engine.profile_dir, archive_file)
+            pending.append((html_file, future))
+            return True
+
+        while len(pending) < workers * 2 and submit_next():
+            pass
+
+        while pending:
+            html_file, future = pending[0]
+            while not future.done() and not engine.stop_requested():
+                wait([future], timeout=_POLL, return_when=FIRST_COMPLETED)
+            if engine.stop_requested():
+                stop_event.set()
+                for _, future in pending:
+                    future.cancel()
+                return
+
+            pending.popleft()
+            try:
+                result, events, error, members = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                result, events, error, members = None, [], f"worker process failed: {e}", []
+            if members and error is None:
+                try:
+                    engine.archive.add_members(members)
+                except Exception as e:
+                    discard_members(members)
+                    result, error = None, f"cannot add to the archive: {e}"
+            elif members:
+                discard_members(members)
+
+            submit_next()
+            yield html_file, result, events, error
+    except BaseException:
+        # Ctrl+C, or the caller dropping the results: no worker is left running
+        stop_event.set()
+        terminate_pool(pool)
+        raise
+    finally:
+        pool.shutdown()
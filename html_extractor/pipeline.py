@@ -0,0 +1,210 @@
+"""Pipelined batch extraction: reading, transforming and writing overlap
+
+A batch run one file at a time waits on the disk (or the network, for
+mounted source trees) and works the regexes in turn, never both at once.
+Here the files go through three threads joined by bounded queues:
+
+* the reader walks the batch jobs and reads each page's bytes;
+* the transformer decodes, scans and minifies pages, queuing every output
+  file instead of writing it (``ExtractionEngine.deferred_writes``);
+* the writer writes those files, backups included.
+
+File I/O releases the GIL, so reading and writing go on while the single
+transformer works. A full queue blocks the stage feeding it, so at most
+``queue_size`` pages wait between two stages. Every stage keeps the input
+order, and a page's log messages, the writer's included, are handed to the
+caller together in the order a sequential run logs them. Pages at or above
+the streaming threshold are not read ahead; the transformer streams them.
+When the run stops, the transformer gives up its current page at the next
+cancellation point (see cancel.py).
+"""
+import os
+import queue
+import threading
+import time
+
+from .timing import STAGES
+
+DEFAULT_QUEUE_SIZE = 4
+
+_DONE = object()
+
+# Seconds between two stop checks while waiting on a queue
+_POLL = 0.1
+
+
+class PendingWrite:
+    """An output file queued by the transform stage; ``save()`` writes and logs it"""
+
+    __slots__ = ('stage', 'nbytes', 'save')
+
+    def __init__(self, stage, nbytes, save):
+        self.stage = stage
+        self.nbytes = nbytes
+        self.save = save
+
+
+def _put(q, item, stop):
+    """Put ``item`` on ``q``, waiting while it is full; return False if stopped first"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """Return the next item of ``q``, or _DONE if stopped first"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _add_stage(result, stage, seconds, nbytes):
+    """Add time spent outside the transform stage to a result"""
+    numbers = result.stages.setdefault(stage, {'seconds': 0.0, 'bytes': 0})
+    numbers['seconds'] = round(numbers['seconds'] + seconds, 6)
+    numbers['bytes'] += nbytes
+    result.duration += seconds
+
+
+def _read(jobs, threshold, out_q, stop, failures):
+    """Reader thread: ``(html_file, out_dir, raw, seconds, error)`` per job"""
+    try:
+        for html_file, out_dir in jobs:
+            if stop.is_set():
+                return
+            raw = error = None
+            start = time.perf_counter()
+            try:
+                if threshold <= 0 or os.path.getsize(html_file) < threshold:
+                    with open(html_file, 'rb') as f:
+                        raw = f.read()
+            except OSError as e:
+                error = e
+            if not _put(out_q, (html_file, out_dir, raw, time.perf_counter() - start, error), stop):
+                return
+    except Exception as e:
+        failures.append(e)   # Discovery failed; raised again by the caller
+    _put(out_q, _DONE, stop)
+
+
+def _transform(engine, local, in_q, out_q, stop):
+    """Transformer thread: ``(html_file, result, events, error)`` per page
+
+    ``events`` holds the page's ``(message, tag)`` log calls and, in
+    their place among them, its PendingWrite objects.
+    """
+    while True:
+        item = _get(in_q, stop)
+        if item is _DONE:
+            break
+        html_file, out_dir, raw, read_seconds, error = item
+        result = None
+        local.events = events = []
+        if error is None:
+            # Streamed pages are written as they are scanned
+            engine.deferred_writes = events if raw is not None else None
+            try:
+                result = engine.extract_html(html_file, out_dir, raw)
+            except Exception as e:
+                error = e
+            finally:
+                engine.deferred_writes = None
+        if result is not None and raw is not None:
+            _add_stage(result, 'read', read_seconds, len(raw))
+        if not _put(out_q, (html_file, result, events, error), stop):
+            return
+    _put(out_q, _DONE, stop)
+
+
+def _write(local, in_q, out_q, stop):
+    """Writer thread: runs the pending writes of each page, in order
+
+    A file that is being written when the run stops is finished first.
+    """
+    while True:
+        item = _get(in_q, stop)
+        if item is _DONE:
+            break
+        html_file, result, events, error = item
+        local.events = messages = []
+        for event in events:
+            if not isinstance(event, PendingWrite):
+                messages.append(event)
+                continue
+            if error is not None:
+                continue   # The transform failed: write nothing of this page
+            start = time.perf_counter()
+            try:
+                event.save()
+            except Exception as e:
+                error = e
+                break
+            _add_stage(result, event.stage, time.perf_counter() - start, event.nbytes)
+
+        if error is not None:
+            result = None
+        else:
+            result.stages = {stage: result.stages[stage] for stage in STAGES if stage in result.stages}
+        if not _put(out_q, (html_file, result, messages, error), stop):
+            return
+    _put(out_q, _DONE, stop)
+
+
+def extract_pipelined(engine, jobs, queue_size=DEFAULT_QUEUE_SIZE):
+    """Yield ``(html_file, result, events, error)`` per job, in input order
+
+    Same contract as ``extract_parallel``: ``events`` are the ``(message,
+    tag)`` log calls made for the file, to be replayed by the caller.
+    ``engine.stop_requested()`` is checked while waiting for results: the
+    reader and transformer stop at once, the writer after the current file.
+    """
+    from .engine import ExtractionEngine
+
+    local = threading.local()
+    stop = threading.Event()
+    transformer = ExtractionEngine(engine.options,
+                                   log=lambda msg, tag="normal": local.events.append((msg, tag)),
+                                   should_stop=lambda: stop.is_set() or engine.stop_requested())
+    transformer.shared = engine.shared
+    transformer.profile_dir = engine.profile_dir
+    transformer.archive = engine.archive
+
+    threshold = engine.options.stream_threshold_mb * 1024 * 1024
+    failures = []
+    read_q, transform_q, done_q = (queue.Queue(maxsize=max(queue_size, 1)) for _ in range(3))
+    threads = [
+        threading.Thread(target=_read, args=(jobs, threshold, read_q, stop, failures),
+                         name='html_extractor-reader', daemon=True),
+        threading.Thread(target=_transform, args=(transformer, local, read_q, transform_q, stop),
+                         name='html_extractor-transform', daemon=True),
+        threading.Thread(target=_write, args=(local, transform_q, done_q, stop),
+                         name='html_extractor-writer', daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            if engine.stop_requested():
+                return
+            try:
+                item = done_q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if failures:
+        raise failures[0]
@@ -0,0 +1,63 @@
+"""Structured JSON Lines log of an extraction run
+
+One JSON object per line: a ``run_start`` record with the options, one
+``file`` record per input (``status`` is ``ok``, ``failed`` or
+``skipped``, with the extraction counts and timing when there are any) and
+a closing ``run_end`` record with totals. Records are written as they
+happen, so the log can be tailed during a run and memory use does not
+grow with the number of files. Records may come from several threads.
+"""
+from dataclasses import asdict
+from datetime import datetime
+import json
+import os
+import threading
+import time
+
+
+class RunLog:
+    """Append-only JSONL writer for one run"""
+
+    def __init__(self, path, mode, source, out_dir, options):
+        self.path = path
+        self.counts = {'ok': 0, 'failed': 0, 'skipped': 0}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._write({'event': 'run_start', 'mode': mode, 'source': source,
+                     'out_dir': out_dir, 'options': options})
+
+    def _write(self, record, status=None):
+        record['time'] = datetime.now().isoformat(timespec='milliseconds')
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if status:
+                self.counts[status] += 1
+            self._file.write(line)
+            self._file.flush()
+
+    def file_ok(self, result):
+        """Record a successful extraction from its ExtractionResult"""
+        record = {'event': 'file', 'status': 'ok'}
+        record.update(asdict(result))
+        record['duration'] = round(result.duration, 6)
+        self._write(record, 'ok')
+
+    def file_failed(self, source, error):
+        """Record a file whose extraction raised"""
+        self._write({'event': 'file', 'status': 'failed', 'source': source, 'error': str(error)}, 'failed')
+
+    def file_skipped(self, source):
+        """Record a file left alone because its output is up to date"""
+        self._write({'event': 'file', 'status': 'skipped', 'source': source}, 'skipped')
+
+    def close(self, stopped=False):
+        """Write the closing totals and close the file"""
+        if self._file.closed:
+            return
+        record = {'event': 'run_end', 'stopped': stopped,
+                  'duration': round(time.perf_counter() - self._start, 6)}
+        record.update(self.counts)
+        self._write(record)
+        self._file.close()
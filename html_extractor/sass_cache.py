@@ -0,0 +1,173 @@
+"""In-memory Sass compilation with a persistent, size-bounded cache
+
+Compiled CSS is cached on disk under a key derived from the libsass
+version, the output style and the Sass source, so identical blocks are
+compiled once per machine rather than once per page. A small in-memory
+layer in front of it serves repeats within the same process (each batch
+worker keeps its own). The disk cache is trimmed least-recently-used first
+once it grows past its size limit.
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import tempfile
+
+try:
+    import sass
+    SASS_AVAILABLE = True
+except ImportError:
+    SASS_AVAILABLE = False
+
+DEFAULT_CACHE_MB = 64
+
+# Sources that pull in other files cannot be cached by content alone.
+_IMPORT_RE = re.compile(r'@(?:import|use|forward)\b')
+
+# In-memory entries kept per process.
+_MEMORY_ENTRIES = 256
+
+_compilers = {}
+
+
+def default_cache_dir():
+    """Return the platform cache folder for compiled Sass"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'html_extractor', 'sass')
+
+
+def get_compiler(cache_dir='', max_mb=DEFAULT_CACHE_MB):
+    """Return the process-wide compiler for a cache location
+
+    A ``max_mb`` of 0 or less keeps results in memory only.
+    """
+    cache_dir = (cache_dir or default_cache_dir()) if max_mb > 0 else None
+    key = (cache_dir, max_mb)
+    if key not in _compilers:
+        _compilers[key] = SassCompiler(cache_dir, max(max_mb, 0) * 1024 * 1024)
+    return _compilers[key]
+
+
+class SassCompiler:
+    """Compile Sass source strings, reusing earlier results when possible"""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._disk_bytes = None   # computed on first write
+
+    def compile(self, source, output_style='expanded', include_paths=()):
+        """Return ``source`` compiled to CSS
+
+        Sources using ``@import``/``@use``/``@forward`` depend on other
+        files and are always compiled fresh. Compile errors propagate and
+        are never cached.
+        """
+        if _IMPORT_RE.search(source):
+            self.misses += 1
+            return sass.compile(string=source, output_style=output_style,
+                                include_paths=list(include_paths))
+
+        key = self._key(source, output_style)
+        css = self.memory.get(key)
+        if css is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return css
+
+        css = self._read_disk(key)
+        if css is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            css = sass.compile(string=source, output_style=output_style)
+            self._write_disk(key, css)
+
+        self.memory[key] = css
+        if len(self.memory) > _MEMORY_ENTRIES:
+            self.memory.popitem(last=False)
+        return css
+
+    @staticmethod
+    def _key(source, output_style):
+        version = getattr(sass, '__version__', '') if SASS_AVAILABLE else ''
+        digest = hashlib.sha256(f"{version}\0{output_style}\0".encode('utf-8'))
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.css")
+
+    def _read_disk(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                css = f.read()
+            os.utime(path)  # Mark as recently used for eviction
+            return css
+        except OSError:
+            return None
+
+    def _write_disk(self, key, css):
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(css)
+            os.replace(tmp_path, path)
+        except OSError:
+            return  # The cache is an optimization; never fail a run over it
+
+        if self._disk_bytes is None:
+            self._disk_bytes = self._scan_disk()[1]
+        else:
+            self._disk_bytes += len(css.encode('utf-8'))
+        if self._disk_bytes > self.max_bytes:
+            self._evict()
+
+    def _scan_disk(self):
+        """Return ``(entries, total_bytes)`` with entries as (mtime, size, path)"""
+        entries = []
+        total = 0
+        try:
+            shards = list(os.scandir(self.cache_dir))
+        except OSError:
+            return entries, total
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                with os.scandir(shard.path) as it:
+                    for entry in it:
+                        if entry.name.endswith('.css'):
+                            st = entry.stat()
+                            entries.append((st.st_mtime, st.st_size, entry.path))
+                            total += st.st_size
+            except OSError:
+                continue
+        return entries, total
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is at 80% of its limit"""
+        entries, total = self._scan_disk()
+        target = self.max_bytes * 0.8
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
@@ -0,0 +1,91 @@
+"""Fast detection of Sass syntax in ``<style>`` blocks
+
+Sass features are folded into a few precompiled patterns with a named
+group per feature, and each scan stops at the first feature found.
+Features spelled with a marker (``$name:``, ``@mixin``, ``&:hover``...)
+are looked for first, with one pattern per marker character: a block
+without the character is not scanned for it (``in`` is a plain memory
+search), and a pattern starting with a literal skips ahead much faster
+than one starting with a character set. Nested rules, which need no
+marker, are only looked for when no marked feature was found. A
+nested-rule candidate (two ``{`` with no ``}`` between them) is confirmed
+outside the regex; a rejected candidate is rescanned at most once, so the
+scan stays linear however large or malformed the stylesheet is.
+"""
+import re
+
+# Features spelled with a literal marker, one pattern per marker: a pattern
+# starting with a literal is searched for much faster than a character set.
+_MARKED = (
+    ('$', re.compile(r'\$(?P<variable>[\w-]+\s*:)')),
+    ('@', re.compile(r'''
+        @(?:
+            (?P<mixin>mixin\s+[\w-])
+          | (?P<include>include\s+[\w-])
+          | (?P<extend>extend\s)
+          | (?P<import>import\s+["'])
+          | (?P<control>(?:if|for|each)\s)
+          | (?P<function>function\s)
+        )
+    ''', re.VERBOSE)),
+    ('&', re.compile(r'&(?P<parent_selector>\s*[:\w\[\]])')),
+)
+
+_NESTED_RE = re.compile(r'\{(?P<nested_rule>[^{}]*\{)')
+
+# A nested rule's outer selector is a bare name alone on its line, e.g. "nav {".
+_RULE_HEAD_RE = re.compile(r'[ \t]*[\w-]+\s*')
+
+# Longest outer selector line looked at; keeps minified one-line CSS linear.
+_MAX_HEAD = 256
+
+# Readable names for the groups above, as shown in logs.
+SASS_FEATURES = {
+    'variable': 'variables',
+    'mixin': 'mixins',
+    'include': '@include',
+    'extend': '@extend',
+    'import': '@import',
+    'control': 'control directives',
+    'function': 'functions',
+    'parent_selector': 'parent selectors',
+    'nested_rule': 'nested rules',
+}
+
+
+def _is_nested_rule(css_code, match):
+    """Check a ``{ ... {`` candidate: ``name {`` on its own line, then ``inner {``"""
+    brace = match.start()
+    newline = css_code.rfind('\n', max(0, brace - _MAX_HEAD), brace)
+    if newline < 0 and brace > _MAX_HEAD:
+        return False
+    if not _RULE_HEAD_RE.fullmatch(css_code, newline + 1, brace):
+        return False
+    inner = css_code[match.start('nested_rule'):match.end() - 1].rstrip()
+    return bool(inner) and (inner[-1].isalnum() or inner[-1] in '_-')
+
+
+def detect_sass(css_code):
+    """Return the name of a Sass feature in ``css_code``, or None
+
+    That is the first feature with a marker when there is one, else
+    nested rules when the block has some.
+    """
+    first = None
+    for marker, pattern in _MARKED:
+        if marker not in css_code:
+            continue
+        match = pattern.search(css_code, 0, len(css_code) if first is None else first.start())
+        if match is not None:
+            first = match
+    if first is not None:
+        return SASS_FEATURES[first.lastgroup]
+
+    pos = 0
+    while True:
+        match = _NESTED_RE.search(css_code, pos)
+        if match is None:
+            return None
+        if _is_nested_rule(css_code, match):
+            return SASS_FEATURES['nested_rule']
+        pos = match.start() + 1  # The inner "{" may open a nested rule of its own
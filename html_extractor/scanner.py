@@ -0,0 +1,493 @@
+"""Single-pass HTML scanner used by the extraction engine
+
+The scanner walks the document once, left to right, and records everything
+the engine needs in one go: inline ``<script>`` and ``<style>`` blocks,
+``style="..."`` attributes, the end of the ``<head>`` tag and the position of
+``</body>``. Unchanged stretches of the document are never copied while
+scanning; the output HTML is assembled exactly once by ``ScanResult.render``.
+
+Scanning takes linear time on malformed input too. A closing tag or quote
+that never comes is searched for once per document, not once per tag that
+needs it (see TagEnds and the ``unclosed`` positions in scan_events).
+"""
+from html import unescape
+import re
+
+from .cancel import CHECK_EVERY
+
+# Tags and comments the scanner acts on. Group 1: comment, group 2: "/" for
+# end tags, group 3: the tag name. Spelled out with character classes because
+# re.IGNORECASE makes this search roughly twice as slow.
+_KEY_TAG = (
+    r'<(?:(!--)|(/?)([sS][cC][rR][iI][pP][tT]|[sS][tT][yY][lL][eE]|[hH][eE][aA][dD]|[bB][oO][dD][yY])'
+    r'(?=[\s/>]))'
+)
+
+# Rest of a start tag up to its closing ">", honouring quoted attribute values.
+# Only tried within _TAG_END_WINDOW characters; see TagEnds.
+_TAG_END = r'(?:[^>"\']|"[^"]*"|\'[^\']*\')*>'
+_TAG_END_WINDOW = 1024
+
+# Candidate style attributes; confirmed against the enclosing tag when found.
+_STYLE_ATTR = r'[sS][tT][yY][lL][eE]\s*='
+
+# Name of a start tag, used to confirm a style attribute candidate.
+_START_TAG = r'<[a-zA-Z][^\s/>]*'
+
+# Text and whole start tags, quoted values included: stops at the first start
+# tag that does not end before the match's end, if any. See _walk_start_tags.
+# The tag is _TAG_END unrolled, and its name can only match one way, so a tag
+# cut short by the end of the match fails in linear time.
+_TEXT_AND_TAGS = (
+    r'(?:[^<]+|<(?![a-zA-Z])|'
+    r'<[a-zA-Z][^\s/>]*(?![^\s/>])[^>"\']*(?:(?:"[^"]*"|\'[^\']*\')[^>"\']*)*>)*'
+)
+
+_ATTR_RE = re.compile(
+    r'([^\s"\'>/=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?'
+)
+
+# Whitespace around declaration separators, dropped when comparing blocks.
+_DECLARATION_SPACE_RE = re.compile(r'\s+(?=[:;])|(?<=[:;])\s+')
+
+
+class _Syntax:
+    """The scanner's patterns and literals, compiled for ``str`` or for bytes"""
+
+    def __init__(self, encode):
+        self.key_tag = re.compile(encode(_KEY_TAG))
+        self.style_attr = re.compile(encode(_STYLE_ATTR))
+        self.start_tag = re.compile(encode(_START_TAG))
+        self.text_and_tags = re.compile(encode(_TEXT_AND_TAGS))
+        self.tag_end = re.compile(encode(_TAG_END))
+        self.non_space = re.compile(encode(r'\S'))
+        self.close = {
+            'script': re.compile(encode(r'</script\s*>'), re.IGNORECASE),
+            'style': re.compile(encode(r'</style\s*>'), re.IGNORECASE),
+        }
+        self.names = {encode(name): name for name in ('script', 'style', 'head', 'body')}
+        self.lt = encode('<')
+        self.gt = encode('>')
+        self.quotes = (encode('"'), encode("'"))
+        self.comment_end = encode('-->')
+        self.attr_lead = encode(' \t\r\n\f"\'')
+
+
+_TEXT_SYNTAX = _Syntax(lambda text: text)
+_BYTES_SYNTAX = _Syntax(lambda text: text.encode('ascii'))
+
+
+class InlineStyleRegistry:
+    """Deduplicate inline declaration blocks and name a class for each
+
+    Identical blocks (ignoring whitespace around ``:`` and ``;`` and a
+    trailing semicolon) share a single generated class, so a page with
+    thousands of identically styled elements produces one rule instead of
+    thousands.
+    """
+
+    def __init__(self, prefix='hx-inline-'):
+        self.prefix = prefix
+        self.classes = {}   # normalized declarations -> class name
+        self.count = 0      # non-empty style attributes seen
+
+    def __len__(self):
+        return len(self.classes)
+
+    def class_for(self, declarations):
+        """Return the generated class name for a declaration block"""
+        key = _DECLARATION_SPACE_RE.sub('', ' '.join(declarations.split())).rstrip(';')
+        self.count += 1
+        name = self.classes.get(key)
+        if name is None:
+            name = f"{self.prefix}{len(self.classes) + 1}"
+            self.classes[key] = name
+        return name
+
+    def rules(self):
+        """Return one CSS rule per unique declaration block, in first-seen order"""
+        return [f".{name} {{ {declarations}; }}" for declarations, name in self.classes.items()]
+
+
+class ScanResult:
+    """Everything found by a single scan of an HTML document"""
+
+    def __init__(self):
+        self.parts = []
+        self.scripts = []
+        self.styles = []
+        self.inline_styles = InlineStyleRegistry()
+        self.head_index = None
+        self.body_close_index = None
+
+    def render(self, head_insert='', body_insert='', tail_insert=''):
+        """Assemble the output HTML, inserting references where found
+
+        ``head_insert`` goes right after the opening ``<head>`` tag,
+        ``body_insert`` right before ``</body>``. When there is no
+        ``</body>``, ``tail_insert`` is appended to the end instead.
+        """
+        parts = self.parts
+        inserts = []
+        if head_insert and self.head_index is not None:
+            inserts.append((self.head_index, head_insert))
+        if body_insert and self.body_close_index is not None:
+            inserts.append((self.body_close_index, body_insert))
+        elif tail_insert and self.body_close_index is None:
+            inserts.append((len(parts), tail_insert))
+
+        if not inserts:
+            return ''.join(parts)
+
+        out = []
+        last = 0
+        for index, text in sorted(inserts, key=lambda item: item[0]):
+            out.extend(parts[last:index])
+            out.append(text)
+            last = index
+        out.extend(parts[last:])
+        return ''.join(out)
+
+
+def parse_attributes(attr_text):
+    """Return a list of (name, value, start, end) for the attributes in a tag"""
+    attrs = []
+    for match in _ATTR_RE.finditer(attr_text):
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4)
+        attrs.append((match.group(1).lower(), value, match.start(), match.end()))
+    return attrs
+
+
+def _quote_attribute(value):
+    """Quote an attribute value, preferring double quotes"""
+    if '"' in value:
+        return f"'{value}'"
+    return f'"{value}"'
+
+
+def _strip_style_attribute(tag_text, registry):
+    """Move style attributes of a start tag into a generated class
+
+    Every ``style`` attribute is removed. The first non-empty one is
+    registered, with its character references decoded (``&quot;`` is
+    ``"`` in the stylesheet), and its class appended to the tag's
+    ``class`` attribute, which is added in place of the style attribute
+    when missing.
+    """
+    attrs = parse_attributes(tag_text)
+    spans = [(start, end, value) for name, value, start, end in attrs if name == 'style']
+    if not spans:
+        return tag_text
+
+    declarations = next((unescape(value) for _, _, value in spans if value and value.strip()), None)
+    class_name = registry.class_for(declarations) if declarations else None
+
+    edits = []   # (start, end, replacement), in document order
+    class_attr = next((attr for attr in attrs if attr[0] == 'class'), None)
+    for start, end, value in spans:
+        # Also drop the whitespace that separated the attribute from its neighbour
+        cut = start
+        while cut > 0 and tag_text[cut - 1].isspace():
+            cut -= 1
+        replacement = ''
+        if class_name and class_attr is None:
+            replacement = f" class={_quote_attribute(class_name)}"
+            class_name = None
+        edits.append((cut, end, replacement))
+
+    if class_name and class_attr is not None:
+        _, value, start, end = class_attr
+        classes = f"{value} {class_name}" if value and value.strip() else class_name
+        edits.append((start, end, f"class={_quote_attribute(classes)}"))
+        edits.sort(key=lambda edit: edit[0])
+
+    pieces = []
+    last = 0
+    for start, end, replacement in edits:
+        pieces.append(tag_text[last:start])
+        pieces.append(replacement)
+        last = end
+    pieces.append(tag_text[last:])
+    return ''.join(pieces)
+
+
+class TagEnds:
+    """Find where the tags of one document end, in linear time overall
+
+    A tag ends at the first ">" outside quoted attribute values. When a
+    quote is never closed, or no ">" follows the quoted values, the first
+    ">" after the tag name ends it instead, as browsers recover.
+
+    Tags are matched by one regular expression that looks no further than
+    _TAG_END_WINDOW characters. A miss costs a full window, so after
+    ``_MAX_MISSES`` of them in a document the expression is no longer
+    tried. Tags it does not match are walked quote by quote, and those
+    searches are remembered: the next occurrence of ``>`` and of each
+    quote, the position past which one no longer occurs at all, and where
+    the quote-by-quote walks of long tags ended. So neither an
+    unterminated quote nor a run of malformed tags sends every tag on a
+    search to the end of the document.
+    """
+
+    # Walks over more quoted values than this are remembered
+    _LONG_WALK = 16
+
+    _MAX_MISSES = 32
+
+    def __init__(self, html, syntax):
+        self.html = html
+        self.syntax = syntax
+        self._next = {}       # char -> (searched from, found at)
+        self._absent = {}     # char -> position from which it no longer occurs
+        self._walks = {}      # opening quote of a long walk -> where the walk ended (-1: it failed)
+        self._last = (-1, -1)
+        self._misses = 0
+
+    def find(self, char, pos):
+        """Return ``html.find(char, pos)``, remembering the answer"""
+        absent = self._absent.get(char)
+        if absent is not None and pos >= absent:
+            return -1
+        cached = self._next.get(char)
+        if cached is not None and cached[0] <= pos <= cached[1]:
+            return cached[1]
+        found = self.html.find(char, pos)
+        if found == -1:
+            self._absent[char] = pos
+        else:
+            self._next[char] = (pos, found)
+        return found
+
+    def __call__(self, name_end):
+        """Return the index just past the ">" closing the tag whose name ends at ``name_end``, or -1"""
+        if self._last[0] == name_end:
+            return self._last[1]
+        if self._misses < self._MAX_MISSES:
+            match = self.syntax.tag_end.match(self.html, name_end, name_end + _TAG_END_WINDOW)
+            if match is not None:
+                return match.end()
+            self._misses += 1
+        find = self.find
+        gt = self.syntax.gt
+        double, single = self.syntax.quotes
+        walk = []
+        pos = name_end
+        while True:
+            end = find(gt, pos)
+            if end == -1:
+                break
+            first_double = find(double, pos)
+            first_single = find(single, pos)
+            if first_single == -1 or first_double != -1 and first_double < first_single:
+                quote, char = first_double, double
+            else:
+                quote, char = first_single, single
+            if quote == -1 or end < quote:
+                end += 1
+                break
+            known = self._walks.get(quote)
+            if known is not None:
+                end = known
+                break
+            walk.append(quote)
+            close = find(char, quote + 1)
+            if close == -1:
+                end = -1
+                break
+            pos = close + 1
+
+        if len(walk) > self._LONG_WALK:
+            for quote in walk:
+                self._walks[quote] = end
+        if end == -1:
+            end = find(gt, name_end)
+            if end != -1:
+                end += 1
+        self._last = (name_end, end)
+        return end
+
+
+def _walk_start_tags(html, syntax, tag_ends, walked, pos, candidate):
+    """Walk the start tags from ``pos`` up to the one enclosing ``candidate``
+
+    Returns the new ``walked`` state: where the walk resumes, and the last
+    start tag reached as ``(start, name end, end)``, which encloses
+    ``candidate`` when it starts before and ends after it. Each tag is
+    skipped as a whole, quoted attribute values included, so a ``<`` in a
+    value is never taken for a tag, and the walk only moves forward. Text
+    and well-formed tags are skipped by one match; TagEnds takes over at
+    the tags it stops at.
+    """
+    walk_from, tag = walked
+    if walk_from < pos:
+        walk_from, tag = pos, None
+    while True:
+        if tag is not None:
+            if tag[0] >= candidate or tag[2] > candidate:
+                return walk_from, tag
+            walk_from, tag = tag[2], None
+        if walk_from >= candidate:
+            return walk_from, None
+        lt = syntax.text_and_tags.match(html, walk_from, candidate).end()
+        if lt >= candidate:
+            return candidate, None
+        name = syntax.start_tag.match(html, lt)
+        end = tag_ends(name.end())
+        if end == -1:
+            return len(html), None   # No ">" is left: no later tag can end either
+        tag = (lt, name.end(), end)
+
+
+def scan_events(html, extract_inline_styles, rewrite_attributes, check=None):
+    """Yield the edits one scan of ``html`` calls for, in document order
+
+    ``html`` is a ``str`` or any bytes-like buffer in an ASCII-compatible
+    encoding (``bytes``, ``mmap``); it is never copied as a whole. Events:
+
+    * ``('cut', start, end, kind, body_start, body_end)``: an inline
+      ``script`` or ``style`` block to remove, with its body's span
+    * ``('replace', start, end, text)``: new attribute text for a start
+      tag, as returned by ``rewrite_attributes(start, end)`` (which
+      returns None to leave the tag alone)
+    * ``('head', index)``: just past the opening ``<head>`` tag
+    * ``('body_close', index)``: the start of ``</body>``
+
+    Two forward-only cursors drive the scan: one over the tags that matter
+    (scripts, styles, comments, ``<head>``, ``</body>``) and one over
+    ``style=`` candidates. Neither ever moves backwards, so the whole
+    document is read once. ``check``, when given, is called every
+    CHECK_EVERY steps and may raise to abandon the scan.
+    """
+    syntax = _TEXT_SYNTAX if isinstance(html, str) else _BYTES_SYNTAX
+    tag_ends = TagEnds(html, syntax)
+    length = len(html)
+    pos = 0    # scan position
+    head_seen = body_close_seen = False
+    steps = 0
+    unclosed = {}             # block name -> position from which its closing tag no longer occurs
+    walked = (0, None)        # start tags are walked from here; the last one walked (start, name end, end)
+
+    tag_match = syntax.key_tag.search(html)
+    style_match = syntax.style_attr.search(html) if extract_inline_styles else None
+
+    while tag_match is not None or style_match is not None:
+        steps += 1
+        if check is not None and steps % CHECK_EVERY == 0:
+            check()
+        if style_match is not None and (tag_match is None or style_match.start() < tag_match.start()):
+            # A style attribute candidate comes first: confirm it sits inside a start tag
+            candidate = style_match.start()
+            walked = _walk_start_tags(html, syntax, tag_ends, walked, pos, candidate)
+            tag = walked[1]
+            next_pos = style_match.end()
+            if tag is not None and tag[0] < candidate < tag[2] \
+                    and html[candidate - 1:candidate] in syntax.attr_lead:
+                _, name_end, tag_end = tag
+                text = rewrite_attributes(name_end, tag_end - 1)
+                if text is not None:
+                    yield ('replace', name_end, tag_end - 1, text)
+                next_pos = pos = tag_end
+            style_match = syntax.style_attr.search(html, next_pos)
+            if tag_match is not None and tag_match.start() < pos:
+                tag_match = syntax.key_tag.search(html, pos)
+            continue
+
+        match = tag_match
+        if match.group(1):
+            # Comment: skip over it entirely, nothing inside is extracted
+            end = html.find(syntax.comment_end, match.end())
+            pos = length if end == -1 else end + 3
+        else:
+            name = syntax.names[match.group(3).lower()]
+            tag_end = tag_ends(match.end())
+            if tag_end == -1:
+                break
+
+            if match.group(2):
+                # End tag: only </body> matters
+                if name == 'body' and not body_close_seen:
+                    body_close_seen = True
+                    yield ('body_close', match.start())
+                pos = tag_end
+
+            elif name in syntax.close:
+                pos = tag_end
+                close = None
+                if tag_end < unclosed.get(name, length + 1):
+                    close = syntax.close[name].search(html, tag_end)
+                    if close is None:
+                        unclosed[name] = tag_end
+                # An unclosed block is left alone and scanning continues after its tag
+                if close is not None:
+                    pos = close.end()
+                    keep = syntax.non_space.search(html, tag_end, close.start()) is None
+                    if name == 'script' and not keep:
+                        attr_text = html[match.end():tag_end - 1]
+                        if not isinstance(attr_text, str):
+                            attr_text = attr_text.decode('latin-1')
+                        keep = any(attr[0] == 'src' for attr in parse_attributes(attr_text))
+                    if not keep:
+                        yield ('cut', match.start(), pos, name, tag_end, close.start())
+
+            else:
+                # <head> or <body> start tag
+                if extract_inline_styles:
+                    text = rewrite_attributes(match.end(), tag_end - 1)
+                    if text is not None:
+                        yield ('replace', match.end(), tag_end - 1, text)
+                if name == 'head' and not head_seen:
+                    head_seen = True
+                    yield ('head', tag_end)
+                pos = tag_end
+
+        tag_match = syntax.key_tag.search(html, pos)
+        if style_match is not None and style_match.start() < pos:
+            style_match = syntax.style_attr.search(html, pos)
+
+
+def scan_html(html, extract_inline_styles=True, check=None):
+    """Scan ``html`` once and return a ScanResult
+
+    Inline scripts (no ``src``) and ``<style>`` blocks with content are cut
+    out of the document and their bodies collected; external and empty
+    blocks are left untouched. With ``extract_inline_styles`` every
+    ``style`` attribute is replaced by a generated class (see
+    InlineStyleRegistry) whose rule ends up in the stylesheet. ``check``
+    is passed on to scan_events.
+    """
+    result = ScanResult()
+    parts = result.parts
+    inline_styles = result.inline_styles
+    last = 0   # start of the stretch not yet copied to parts
+
+    def rewrite_attributes(start, end):
+        attr_text = html[start:end]
+        new_attrs = _strip_style_attribute(attr_text, inline_styles)
+        return None if new_attrs is attr_text else new_attrs
+
+    for event in scan_events(html, extract_inline_styles, rewrite_attributes, check):
+        kind = event[0]
+        if kind == 'cut':
+            _, start, end, name, body_start, body_end = event
+            parts.append(html[last:start])
+            (result.scripts if name == 'script' else result.styles).append(html[body_start:body_end])
+            last = end
+        elif kind == 'replace':
+            _, start, end, text = event
+            parts.append(html[last:start])
+            parts.append(text)
+            last = end
+        else:
+            parts.append(html[last:event[1]])
+            last = event[1]
+            if kind == 'head':
+                result.head_index = len(parts)
+            else:
+                result.body_close_index = len(parts)
+
+    parts.append(html[last:])
+    return result
@@ -0,0 +1,473 @@
+"""Extraction service: warm workers behind a local HTTP API
+
+Running the extractor once per page pays for interpreter startup, imports
+and regex compilation every time, which takes far longer than extracting a
+typical page. ``python -m html_extractor --serve`` pays for them once and
+then takes extraction jobs over HTTP, on 127.0.0.1 (``--port``) or on a
+Unix socket (``--socket``). With one job at a time (the default) pages are
+extracted on a thread of the server; with ``--jobs N`` they go to N worker
+processes, started and warmed up before the first request. Each process
+keeps its compiled regexes and its in-memory Sass cache for as long as the
+server runs.
+
+* ``POST /extract`` takes ``{"input": "/site/page.html", "output":
+  "/out", "options": {...}, "log": false}`` and answers once the page is
+  extracted: 200 with the ExtractionResult and the paths written, 422 with
+  the error when extraction failed, 400 for a malformed job, 413 for a
+  body over ``MAX_REQUEST_BYTES`` and 503 when ``queue_size`` jobs are
+  already waiting. ``options`` override the
+  server's ExtractionOptions for this job (the options that decide what
+  is written, plus ``backup_mode``, ``stream_threshold_mb`` and
+  ``file_timeout``); ``log`` adds the job's log lines to the answer.
+* ``GET /metrics``: jobs waiting and running, totals, and latency
+  percentiles over the last ``LATENCY_WINDOW`` jobs.
+* ``GET /health``
+
+Relative paths are taken from the server's working folder. Anyone who
+can send a job can have files read and written with the server's
+permissions, so the server never listens beyond the local host and web
+pages cannot reach it: requests with a non-loopback ``Origin`` (or, on
+TCP, ``Host``, against DNS rebinding) get 403, and jobs must be sent as
+``Content-Type: application/json``, which a page can only send across
+origins after a CORS preflight that is never granted. On TCP, every
+endpoint but ``/health`` also needs ``Authorization: Bearer TOKEN``, with
+the token drawn at launch (``serve(token_file=...)`` writes it to a file
+only the user can read). These checks come before the body is read. A
+Unix socket is only made accessible to the user.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .cancel import ExtractionTimeout
+from .engine import _BATCH_ONLY_OPTIONS, ExtractionEngine
+from .parallel import _extract_in_worker, resolve_worker_count
+from .runlog import RunLog
+from .scanner import scan_html
+
+DEFAULT_PORT = 8765
+
+DEFAULT_QUEUE_SIZE = 256
+
+# Largest request body accepted; a job is a few hundred bytes of JSON
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# Jobs the latency percentiles are computed over
+LATENCY_WINDOW = 1000
+
+# Options a job may set, on top of those that decide what is written
+_JOB_OPTIONS = ('backup_mode', 'stream_threshold_mb', 'file_timeout')
+
+_LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+_WARM_UP_PAGE = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>warm-up</title>'
+                 '<style>.a { color: red; }</style></head><body><p style="margin: 0">x</p>'
+                 '<script>var a = 1; // warm-up\n</script></body></html>')
+
+
+class ServiceBusy(Exception):
+    """The job queue is full"""
+
+
+def _warm_up():
+    """Run a tiny page through the scanner and minifiers of this process"""
+    engine = ExtractionEngine()
+    scan = scan_html(_WARM_UP_PAGE)
+    engine._transform_blocks(scan)
+    scan.render('', '', '')
+    return os.getpid()
+
+
+def _percentiles(values):
+    """Return p50/p90/p99/max of a list of seconds, in milliseconds"""
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(int(q * len(values)), len(values) - 1)] * 1000   # noqa: E731
+    return {'p50': round(pick(0.5), 3), 'p90': round(pick(0.9), 3), 'p99': round(pick(0.99), 3),
+            'max': round(values[-1] * 1000, 3)}
+
+
+class ExtractionService:
+    """Extraction jobs run on warm workers, with queue and latency metrics
+
+    ``options`` are the ExtractionOptions of every job, which may override
+    some of them. ``jobs`` is how many pages are extracted at once: 1 runs
+    them on a thread of this process, more on a pool of worker processes
+    (0 = one per CPU core). At most ``queue_size`` jobs wait for a worker;
+    more are refused with ServiceBusy.
+    """
+
+    def __init__(self, options, jobs=1, queue_size=DEFAULT_QUEUE_SIZE, log=None):
+        if options.archive:
+            raise ValueError("Archive output is not available in server mode")
+        self.options = options
+        self.jobs = resolve_worker_count(jobs)
+        self.queue_size = max(queue_size, 0)
+        self._log = log
+        self._option_names = {f.name for f in fields(options)
+                              if f.name not in _BATCH_ONLY_OPTIONS or f.name in _JOB_OPTIONS}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.counts = {'ok': 0, 'failed': 0, 'rejected': 0}
+        self._latency = deque(maxlen=LATENCY_WINDOW)   # (total, waiting, extracting) seconds
+        self._started = time.monotonic()
+        self.run_log = RunLog(options.run_log, 'serve', '', '', options.to_dict()) if options.run_log else None
+        self._pool = self._start_pool()
+
+    def log(self, msg, tag="normal"):
+        if self._log:
+            self._log(msg, tag)
+
+    def _start_pool(self):
+        """Start the workers and have each of them warm up"""
+        if self.jobs == 1:
+            _warm_up()
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix='html_extractor-job')
+        pool = ProcessPoolExecutor(max_workers=self.jobs)
+        for future in [pool.submit(_warm_up) for _ in range(self.jobs)]:
+            future.result()
+        return pool
+
+    def _restart_pool(self, broken):
+        """Replace a process pool one of whose workers died"""
+        with self._lock:
+            if self._pool is not broken:
+                return   # Another job restarted it already
+            self.log("⚠ A worker process died; restarting the workers", "warning")
+            if sys.version_info >= (3, 9):
+                broken.shutdown(wait=False, cancel_futures=True)
+            else:
+                broken.shutdown(wait=False)
+            self._pool = self._start_pool()
+
+    def _job_options(self, overrides):
+        """Return the options dict of a job, or raise ValueError"""
+        if not isinstance(overrides, dict):
+            raise ValueError("'options' must be an object")
+        refused = sorted(set(overrides) - self._option_names)
+        if refused:
+            raise ValueError(f"Options that cannot be set per job: {', '.join(refused)}")
+        options = self.options.to_dict()
+        options.update(overrides)
+        return options
+
+    def extract(self, job):
+        """Run one job and return the reply to send
+
+        The reply's ``status`` is ``ok``, ``failed`` or ``timeout``; ``log``
+        holds the job's log lines. Raises ValueError for a malformed job and
+        ServiceBusy when the queue is full.
+        """
+        received = time.perf_counter()
+        if not isinstance(job, dict) or not isinstance(job.get('input'), str) \
+                or not isinstance(job.get('output'), str):
+            raise ValueError("A job needs 'input' (an HTML file) and 'output' (a folder)")
+        html_file = os.path.abspath(job['input'])
+        out_dir = os.path.abspath(job['output'])
+        if not os.path.isfile(html_file):
+            raise ValueError(f"The file '{job['input']}' does not exist.")
+        options = self._job_options(job.get('options', {}))
+
+        with self._lock:
+            if self._pending >= self.jobs + self.queue_size:
+                self.counts['rejected'] += 1
+                raise ServiceBusy(f"{self._pending - self.jobs} jobs are already waiting")
+            self._pending += 1
+            pool = self._pool
+        try:
+            try:
+                result, events, error, _ = pool.submit(_extract_in_worker, options, html_file, out_dir).result()
+            except BrokenProcessPool as e:
+                self._restart_pool(pool)
+                result, events, error = None, [], f"worker process failed: {e}"
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        total = time.perf_counter() - received
+        extracting = result.duration if result is not None else 0.0
+        with self._lock:
+            self.counts['ok' if error is None else 'failed'] += 1
+            self._latency.append((total, max(total - extracting, 0.0), extracting))
+        if self.run_log is not None:
+            if error is None:
+                self.run_log.file_ok(result)
+            else:
+                self.run_log.file_failed(html_file, error)
+        if error is None:
+            self.log(f"✅ {html_file} → {result.out_dir} ({total * 1000:.1f} ms)", "success")
+            reply = {'status': 'ok', 'result': asdict(result), 'files': _output_files(result, options)}
+        else:
+            self.log(f"❌ Failed to process {html_file}: {error}", "error")
+            reply = {'status': 'timeout' if isinstance(error, ExtractionTimeout) else 'failed', 'error': str(error)}
+        reply['queue_ms'] = round((total - extracting) * 1000, 3)
+        reply['log'] = [msg for msg, _ in events]
+        return reply
+
+    def metrics(self):
+        """Return the queue, totals and latency figures as a JSON-serializable dict"""
+        with self._lock:
+            pending = self._pending
+            counts = dict(self.counts)
+            window = list(self._latency)
+        return {
+            'uptime': round(time.monotonic() - self._started, 3),
+            'workers': self.jobs,
+            'worker_kind': 'thread' if self.jobs == 1 else 'process',
+            'queue_depth': max(pending - self.jobs, 0),
+            'queue_size': self.queue_size,
+            'running': min(pending, self.jobs),
+            **counts,
+            'latency_ms': _percentiles([total for total, _, _ in window]),
+            'queue_wait_ms': _percentiles([waited for _, waited, _ in window]),
+            'extract_ms': _percentiles([extracting for _, _, extracting in window]),
+            'window': len(window),
+        }
+
+    def close(self):
+        """Let running jobs finish and stop the workers"""
+        if sys.version_info >= (3, 9):
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            self._pool.shutdown(wait=True)
+        if self.run_log is not None:
+            self.run_log.close()
+            self.run_log = None
+
+
+def _is_loopback(host):
+    """Return True when a Host or Origin host name is the local host"""
+    return (host or '').lower() in _LOOPBACK_HOSTS
+
+
+def _output_files(result, options):
+    """Return the paths an extraction wrote, backup included"""
+    names = list(result.files_created)
+    if options.get('create_backup'):
+        names.append(f"{os.path.splitext(os.path.basename(result.source))[0]}_original.html")
+    return [os.path.join(result.out_dir, name) for name in names]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """The HTTP side of ExtractionService; connections are kept alive between jobs"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'html_extractor'
+    # Headers and body are two writes; with Nagle the body waits for a delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    # Whatever name resolves to 127.0.0.1 reaches a TCP server, a rebound attacker's domain included
+    check_host = True
+
+    def _refused(self, path):
+        """Reply 403 or 401 and return True when the request may not be served"""
+        origin = self.headers.get('Origin')
+        if origin is not None and not _is_loopback(urlsplit(origin).hostname):
+            self._reply(403, {'status': 'error', 'error': f"Requests from {origin} are not accepted"})
+            return True
+        if self.check_host and not _is_loopback(urlsplit(f"//{self.headers.get('Host', '')}").hostname):
+            self._reply(403, {'status': 'error', 'error': "Only requests to the local host are accepted"})
+            return True
+        token = self.server.token
+        if token and path != '/health':
+            given = self.headers.get('Authorization', '')
+            if not hmac.compare_digest(given.encode('utf-8', 'replace'), f"Bearer {token}".encode('ascii')):
+                self._reply(401, {'status': 'error', 'error': "Missing or wrong 'Authorization: Bearer' token"})
+                return True
+        return False
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if self._refused(path):
+            return
+        if path == '/metrics':
+            self._reply(200, self.server.service.metrics())
+        elif path == '/health':
+            self._reply(200, {'status': 'ok'})
+        else:
+            self._reply(404, {'status': 'error', 'error': f"No such endpoint: {path}"})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        if self._refused(path):
+            self.close_connection = True   # The body was not read
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length < 0:
+                raise ValueError(f"negative Content-Length {length}")
+        except ValueError as e:
+            self.close_connection = True
+            self._reply(400, {'status': 'error', 'error': f"Cannot read the request: {e}"})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._reply(413, {'status': 'error', 'error': f"Requests are limited to {MAX_REQUEST_BYTES:,} bytes"})
+            return
+        try:
+            body = self.rfile.read(length)
+        except OSError as e:
+            self.close_connection = True
+            self._reply(400, {'status': 'error', 'error': f"Cannot read the request: {e}"})
+            return
+        if path != '/extract':
+            self._reply(404, {'status': 'error', 'error': f"No such endpoint: {path}"})
+            return
+        content_type = self.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        if content_type != 'application/json':
+            self._reply(415, {'status': 'error', 'error': "Jobs must be sent as Content-Type: application/json"})
+            return
+
+        try:
+            job = json.loads(body or b'{}')
+            reply = self.server.service.extract(job)
+        except ServiceBusy as e:
+            self._reply(503, {'status': 'busy', 'error': str(e)})
+            return
+        except ValueError as e:
+            self._reply(400, {'status': 'error', 'error': str(e)})
+            return
+        if not job.get('log'):
+            del reply['log']
+        self._reply(200 if reply['status'] == 'ok' else 422, reply)
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass   # Jobs are logged by the service; a line per request would only repeat them
+
+
+class _UnixHandler(_Handler):
+    disable_nagle_algorithm = False   # A TCP option
+    check_host = False   # Only reachable through the socket file, whatever Host says
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+
+    def server_bind(self):
+        # The socket is bound in a new folder only the user can enter, made
+        # private, then moved into place: nobody can connect in between.
+        # HTTPServer.server_bind wants a host and a port.
+        path = self.server_address
+        folder = tempfile.mkdtemp(prefix='.html_extractor.', dir=os.path.dirname(os.path.abspath(path)))
+        self.server_address = os.path.join(folder, 's')
+        try:
+            socketserver.TCPServer.server_bind(self)
+            os.chmod(self.server_address, 0o600)
+            os.rename(self.server_address, path)
+        finally:
+            if os.path.exists(self.server_address):
+                os.remove(self.server_address)
+            os.rmdir(folder)
+        self.server_address = path
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def make_server(service, port=DEFAULT_PORT, socket_path='', token=None):
+    """Return an HTTP server for ``service`` on 127.0.0.1:``port`` or on a Unix socket
+
+    ``token``, when set, is required from clients as ``Authorization:
+    Bearer TOKEN``.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.remove(socket_path)   # Left behind by a server that is gone
+            else:
+                raise ValueError(f"A server is already listening on {socket_path}")
+            finally:
+                probe.close()
+        server = _UnixServer(socket_path, _UnixHandler)
+    else:
+        server = _TCPServer(('127.0.0.1', port), _Handler)
+    server.service = service
+    server.token = token
+    return server
+
+
+def _write_token(path, token):
+    """Write the token to a file only the user can read"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token + '\n')
+
+
+def serve(options, jobs=1, port=DEFAULT_PORT, socket_path='', queue_size=DEFAULT_QUEUE_SIZE, log=None,
+          token_file=''):
+    """Run the extraction service until interrupted (Ctrl+C or SIGTERM)
+
+    On TCP a token is drawn for this launch; it is written to
+    ``token_file`` when given (and removed on exit), else logged.
+    """
+    def say(msg, tag="normal"):
+        if log:
+            log(msg, tag)
+
+    start = time.perf_counter()
+    service = ExtractionService(options, jobs, queue_size, log)
+    token = None if socket_path else secrets.token_urlsafe(32)
+    try:
+        server = make_server(service, port, socket_path, token)
+        if token and token_file:
+            _write_token(token_file, token)
+    except Exception:
+        service.close()
+        raise
+    where = socket_path or f"http://127.0.0.1:{server.server_port}"
+    kind = 'thread' if service.jobs == 1 else f"{service.jobs} worker processes"
+    say(f"🛰 Serving extraction jobs on {where} ({kind}, warmed up in "
+        f"{time.perf_counter() - start:.2f} s)", "header")
+    say("   POST /extract  GET /metrics  GET /health — Ctrl+C to stop", "info")
+    if token:
+        say(f"   Token (Authorization: Bearer ...): {f'in {token_file}' if token_file else token}", "info")
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGTERM, interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if previous is not None:
+            signal.signal(signal.SIGTERM, previous)
+        server.server_close()
+        service.close()
+        for path in (socket_path, token_file if token else ''):
+            if path and os.path.exists(path):
+                os.remove(path)
+        metrics = service.metrics()
+        say(f"⏹ Server stopped: {metrics['ok']:,} jobs done, {metrics['failed']:,} failed", "info")
@@ -0,0 +1,195 @@
+"""Cross-file deduplication of script and style blocks in batch mode
+
+Exported sites repeat the same inline blocks on every page. Before a
+sharing batch writes anything, a census pass hashes every processed script
+and CSS block of every page, in page order. The run of leading blocks
+that the most pages start with (at least two) goes into ``common.js`` /
+``common.css`` at the root of the output directory, written once. Only
+the pages starting with that whole run reference the shared file, ahead
+of their own ``script.js`` / ``style.css``, which keep the rest of their
+blocks: no page gets a block it did not have, and the blocks keep their
+order, so scripts run and styles cascade as before.
+"""
+import hashlib
+import os
+import sys
+
+COMMON_JS = 'common.js'
+COMMON_CSS = 'common.css'
+
+
+def block_digest(kind, code):
+    """Return the content hash identifying a processed block"""
+    return hashlib.sha256(f"{kind}\0{code}".encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class SharedBlocks:
+    """The leading blocks shared between pages of a batch and where they live"""
+
+    def __init__(self, out_root, js_digests=(), css_digests=()):
+        self.out_root = out_root
+        self.js_digests = tuple(js_digests)
+        self.css_digests = tuple(css_digests)
+
+    def __bool__(self):
+        return bool(self.js_digests or self.css_digests)
+
+    def fingerprint(self):
+        """Return a hash of the shared runs, for the incremental manifest"""
+        digest = hashlib.sha256()
+        for value in self.js_digests + ('',) + self.css_digests:
+            digest.update(value.encode('ascii') + b'\n')
+        return digest.hexdigest()[:16]
+
+    def _digests(self, kind):
+        return self.js_digests if kind == 'js' else self.css_digests
+
+    def shared_count(self, kind, blocks):
+        """Return how many leading ``blocks`` (processed code) are in the common file
+
+        That is the whole shared run when the page starts with it, else 0.
+        """
+        digests = self._digests(kind)
+        if not digests or len(blocks) < len(digests):
+            return 0
+        for code, digest in zip(blocks, digests):
+            if block_digest(kind, code) != digest:
+                return 0
+        return len(digests)
+
+    def matcher(self, kind):
+        """Return a RunMatcher for blocks of ``kind`` that arrive one at a time"""
+        return RunMatcher(kind, self._digests(kind))
+
+    def href(self, name, project_dir):
+        """Return the URL of a common file relative to a project folder"""
+        path = os.path.relpath(os.path.join(self.out_root, name), project_dir)
+        return path.replace(os.sep, '/')
+
+
+class RunMatcher:
+    """``shared_count`` for streamed pages, whose blocks are seen one by one
+
+    Blocks matching the shared run so far are held back until the run is
+    complete (then they are in the common file) or broken (then they are
+    the page's own after all).
+    """
+
+    def __init__(self, kind, digests):
+        self.kind = kind
+        self.shared = 0
+        self._digests = digests
+        self._held = []
+        self._done = not digests
+
+    def feed(self, code):
+        """Return the blocks the page keeps now that ``code`` came"""
+        if self._done:
+            return [code]
+        if block_digest(self.kind, code) != self._digests[len(self._held)]:
+            return self.release() + [code]
+        self._held.append(code)
+        if len(self._held) == len(self._digests):
+            self.shared = len(self._held)
+            self._held = []
+            self._done = True
+        return []
+
+    def release(self):
+        """End the match (a block that cannot be shared, or the page's end) and
+        return the blocks held back
+        """
+        held, self._held = self._held, []
+        self._done = True
+        return held
+
+
+def _census_in_worker(options_dict, html_file):
+    """Return ``(html_file, digests, error)`` for one page, in a worker process"""
+    from .engine import ExtractionEngine, ExtractionOptions
+
+    engine = ExtractionEngine(ExtractionOptions.from_dict(options_dict))
+    try:
+        return html_file, [(kind, block_digest(kind, code)) for kind, code in engine.page_blocks(html_file)], None
+    except Exception as e:
+        return html_file, [], str(e)
+
+
+def _best_run(sequences, min_pages):
+    """Return ``(length, page index)`` of the leading run worth sharing
+
+    ``sequences`` holds the block digests of each page in order. Every
+    leading run is counted once per page starting with it; of those on
+    ``min_pages`` pages or more, the one saving the most block copies wins.
+    The page index is the first page having it; the length is 0 when no
+    run is shared.
+    """
+    runs = {}   # (parent run id, digest) -> [run id, length, pages, first page]
+    for page_index, digests in enumerate(sequences):
+        parent = 0
+        for length, digest in enumerate(digests, 1):
+            run = runs.get((parent, digest))
+            if run is None:
+                run = runs[parent, digest] = [len(runs) + 1, length, 0, page_index]
+            run[2] += 1
+            parent = run[0]
+    best = (0, 0, 0)
+    for _, length, pages, first_page in runs.values():
+        if pages >= min_pages:
+            best = max(best, (length * (pages - 1), length, -first_page))
+    return best[1], -best[2]
+
+
+def find_shared_blocks(engine, html_files, out_root, workers=1, min_pages=2):
+    """Run the census over ``html_files`` and return ``(SharedBlocks, contents)``
+
+    ``contents`` maps ``'js'`` and ``'css'`` to the shared blocks in page
+    order. Only digests travel back from the census; the content of each
+    shared run is read again from the first page that starts with it.
+    """
+    options_dict = engine.options.to_dict()
+    sequences = {'js': [], 'css': []}
+    pages = []
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        from .parallel import ignore_interrupts, terminate_pool
+
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=ignore_interrupts)
+        census = pool.map(_census_in_worker, [options_dict] * len(html_files), html_files, chunksize=16)
+    else:
+        pool = None
+        census = (_census_in_worker(options_dict, html_file) for html_file in html_files)
+
+    try:
+        for html_file, digests, error in census:
+            if engine.stop_requested():
+                return SharedBlocks(out_root), {'js': [], 'css': []}
+            if error is not None:
+                continue  # Reported when the page itself is extracted
+            pages.append(html_file)
+            for kind in sequences:
+                sequences[kind].append([digest for block_kind, digest in digests if block_kind == kind])
+    except BaseException:
+        if pool is not None:
+            terminate_pool(pool)   # Ctrl+C: no census worker is left running
+        raise
+    finally:
+        if pool is not None:
+            if sys.version_info >= (3, 9):
+                pool.shutdown(cancel_futures=True)
+            else:
+                pool.shutdown()
+
+    runs = {}
+    contents = {'js': [], 'css': []}
+    for kind, page_digests in sequences.items():
+        length, page_index = _best_run(page_digests, min_pages)
+        runs[kind] = page_digests[page_index][:length] if length else []
+        if length:
+            blocks = [code for block_kind, code in engine.page_blocks(pages[page_index]) if block_kind == kind]
+            if [block_digest(kind, code) for code in blocks[:length]] == runs[kind]:
+                contents[kind] = blocks[:length]
+            else:
+                runs[kind] = []   # The page changed since the census
+    return SharedBlocks(out_root, runs['js'], runs['css']), contents
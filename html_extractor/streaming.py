@@ -0,0 +1,317 @@
+"""Bounded-memory extraction of very large HTML files
+
+Pages of ``stream_threshold_mb`` or more are never read into memory. The
+file is memory-mapped and scanned once as bytes by the same scanner as the
+in-memory path (``scan_events``). In that single pass, block bodies are
+copied into script.js / style.css and the rest of the document into
+index.html, in slices of at most ``CHUNK_SIZE`` bytes. Because the map is
+one contiguous buffer, tags and blocks crossing a chunk boundary need no
+special handling. The ``<link>`` / ``<script>`` references depend on what
+the whole page turned out to contain, so they are spliced into index.html
+at the end with one sequential copy.
+
+Blocks up to ``MAX_BLOCK_IN_MEMORY`` bytes are decoded and processed like in
+the in-memory path; larger ones are copied through without minification or
+Sass detection. Peak memory stays at a few chunks plus the largest processed
+block, however large the page is.
+"""
+import codecs
+import hashlib
+import mmap
+import os
+from pathlib import Path
+import time
+
+from .encoding import detect_encoding, is_utf8
+from .output import AtomicFile, make_temp_file, replace_file
+from .scanner import InlineStyleRegistry, _strip_style_attribute, scan_events
+from .sharing import COMMON_CSS, COMMON_JS
+
+DEFAULT_STREAM_THRESHOLD_MB = 256
+
+CHUNK_SIZE = 1 << 20
+
+MAX_BLOCK_IN_MEMORY = 4 * CHUNK_SIZE
+
+
+def _codec(encoding):
+    """Return the codec for slices of a page: no BOM handling mid-file"""
+    return 'utf-8' if is_utf8(encoding) else encoding
+
+
+def _is_ascii_compatible(encoding):
+    return not encoding.startswith(('utf-16', 'utf-32'))
+
+
+class _AssetStream:
+    """A combined asset file written block by block, created on first use
+
+    ``open_file`` opens the destination, an AtomicFile or an archive member.
+    """
+
+    def __init__(self, path, header, encoding, open_file=AtomicFile):
+        self.path = path
+        self.open_file = open_file
+        self.header = header
+        self.blocks = 0
+        self.changed = None
+        self._encoder = codecs.getincrementalencoder(encoding)()
+        self._file = None
+
+    @property
+    def written(self):
+        return self._file is not None
+
+    def _write(self, text):
+        self._file.write(self._encoder.encode(text))
+
+    def _start_block(self):
+        if self._file is None:
+            self._file = self.open_file(self.path)
+            self._write(self.header)
+        else:
+            self._write('\n\n')
+        self.blocks += 1
+
+    def add(self, code):
+        """Append one processed block"""
+        self._start_block()
+        self._write(code)
+
+    def add_raw(self, data, start, end, codec):
+        """Append ``data[start:end]`` as-is, decoding ``CHUNK_SIZE`` bytes at a time"""
+        self._start_block()
+        decoder = codecs.getincrementaldecoder(codec)()
+        for pos in range(start, end, CHUNK_SIZE):
+            self._write(decoder.decode(data[pos:min(pos + CHUNK_SIZE, end)]))
+        self._write(decoder.decode(b'', final=True))
+
+    def close(self):
+        if self._file is not None:
+            self.changed = self._file.close()
+
+    def discard(self):
+        if self._file is not None:
+            self._file.discard()
+
+
+def _copy_range(data, start, end, out):
+    """Write ``data[start:end]`` to ``out`` in slices of ``CHUNK_SIZE``"""
+    for pos in range(start, end, CHUNK_SIZE):
+        out.write(data[pos:min(pos + CHUNK_SIZE, end)])
+
+
+def _splice(partial_path, path, inserts, tail, open_file=None):
+    """Turn ``partial_path`` into ``path`` with ``inserts`` (offset, bytes) and ``tail`` added
+
+    Without inserts the file is just renamed; otherwise it is copied once,
+    sequentially, with the inserts written at their offsets. ``open_file``
+    opens the destination, which is then always copied to. Returns True
+    when ``path`` changed.
+    """
+    inserts = sorted((offset, text) for offset, text in inserts if offset is not None and text)
+    if not inserts and not tail and open_file is None:
+        return replace_file(partial_path, path)
+
+    with open(partial_path, 'rb') as src, (open_file or AtomicFile)(path) as out:
+        pos = 0
+        for offset, text in inserts + [(None, tail)]:
+            while offset is None or pos < offset:
+                chunk = src.read(CHUNK_SIZE if offset is None else min(CHUNK_SIZE, offset - pos))
+                if not chunk:
+                    break
+                out.write(chunk)
+                pos += len(chunk)
+            out.write(text)
+    os.remove(partial_path)
+    return out.changed
+
+
+def extract_streaming(engine, html_file, base_out_dir, start_time):
+    """Extract a large page through a memory map and return its ExtractionResult
+
+    Returns None for pages in UTF-16/32, which the byte scanner cannot
+    read; the caller extracts those in memory instead.
+    """
+    from .engine import ExtractionResult
+
+    options = engine.options
+    with open(html_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        with engine._stage('read', len(data)):
+            encoding, source = detect_encoding(data, CHUNK_SIZE)
+        if not _is_ascii_compatible(encoding):
+            engine.log(f"⚠ {encoding} pages cannot be streamed; reading into memory", "warning")
+            return None
+        if not is_utf8(encoding):
+            engine.log(f"⚠ File read with {encoding} encoding ({source})", "warning")
+        engine.log(f"🌊 Streaming {len(data) / (1024 * 1024):,.0f} MB page from a memory map", "info")
+
+        codec = _codec(encoding)
+        base_name = Path(html_file).stem
+        out_dir = engine._prepare_out_dir(html_file, base_out_dir)
+
+        with engine._stage('read'):
+            digest = hashlib.sha256(data)
+        if options.create_backup:
+            engine._create_backup(html_file, out_dir, base_name, digest.digest())
+        engine._checkpoint()
+
+        asset_encoding = engine._asset_encoding(encoding)
+        js = _AssetStream(os.path.join(out_dir, 'script.js'), engine._asset_header('js'), asset_encoding,
+                          engine._open_output)
+        css = _AssetStream(os.path.join(out_dir, 'style.css'), engine._asset_header('css'), asset_encoding,
+                           engine._open_output)
+        registry = InlineStyleRegistry()
+        sass_blocks = []
+        sass_features = []
+        js_run = engine.shared.matcher('js') if engine.shared else None
+        css_run = engine.shared.matcher('css') if engine.shared else None
+        copied_through = 0
+        bytes_before = bytes_after = 0
+
+        def rewrite_attributes(start, end):
+            attr_text = data[start:end].decode(codec)
+            new_attrs = _strip_style_attribute(attr_text, registry)
+            return None if new_attrs is attr_text else new_attrs.encode(codec, 'xmlcharrefreplace')
+
+        # One pass: block bodies go to the asset files and everything else to
+        # index.html as they are found. Which references to insert is only
+        # known at the end, so their output offsets are kept and spliced in.
+        index_path = os.path.join(out_dir, 'index.html')
+        fd, partial_path = make_temp_file(engine._scratch_dir(out_dir), prefix='.index.html.',
+                                          suffix='.partial')
+        head_at = body_at = None
+        try:
+            with os.fdopen(fd, 'wb') as out, engine._stage('scan', len(data)):
+                last = 0
+                for event in scan_events(data, options.extract_inline_styles, rewrite_attributes,
+                                         engine._cancel_check()):
+                    kind = event[0]
+                    _copy_range(data, last, event[1], out)
+                    if kind == 'replace':
+                        out.write(event[3])
+                        last = event[2]
+                        continue
+                    if kind != 'cut':
+                        last = event[1]
+                        if kind == 'head':
+                            head_at = out.tell()
+                        else:
+                            body_at = out.tell()
+                        continue
+
+                    _, _, last, name, body_start, body_end = event
+                    stream = js if name == 'script' else css
+                    if body_end - body_start > MAX_BLOCK_IN_MEMORY:
+                        run = js_run if name == 'script' else css_run
+                        for code in run.release() if run else ():
+                            stream.add(code)
+                        stream.add_raw(data, body_start, body_end, codec)
+                        copied_through += 1
+                        continue
+
+                    code = data[body_start:body_end].decode(codec)
+                    bytes_before += len(code.encode('utf-8', 'surrogatepass'))
+                    if name == 'script':
+                        with engine._stage('scripts', body_end - body_start):
+                            code = engine._process_javascript(code)
+                        bytes_after += len(code.encode('utf-8', 'surrogatepass'))
+                        for code in js_run.feed(code) if js_run else (code,):
+                            js.add(code)
+                        continue
+
+                    with engine._stage('styles', body_end - body_start):
+                        feature = engine._detect_sass(code)
+                        code = engine._process_stylesheet(code, sass=bool(feature))
+                    bytes_after += len(code.encode('utf-8', 'surrogatepass'))
+                    if feature:
+                        sass_blocks.append(code)
+                        if feature not in sass_features:
+                            sass_features.append(feature)
+                    else:
+                        for code in css_run.feed(code) if css_run else (code,):
+                            css.add(code)
+                _copy_range(data, last, len(data), out)
+                for run, stream in ((js_run, js), (css_run, css)):
+                    for code in run.release() if run else ():
+                        stream.add(code)
+
+            css_blocks = css.blocks
+            for rule in registry.rules():
+                css.add(rule)
+            # Compiled Sass goes last in style.css, as in the in-memory path
+            compiled = engine._save_sass(out_dir, sass_blocks, asset_encoding) if sass_blocks else None
+            if compiled is not None:
+                if not css.written:
+                    css.header = engine._asset_header('compiled')
+                css.add(compiled)
+        except BaseException:
+            os.remove(partial_path)
+            js.discard()
+            css.discard()
+            raise
+        js.close()
+        css.close()
+
+        if registry.count:
+            engine.log(f"✅ Extracted {registry.count} inline styles into {len(registry)} classes", "success")
+        if js.blocks:
+            engine.log(f"✅ Extracted {js.blocks} script blocks", "success")
+        if css_blocks:
+            engine.log(f"✅ Extracted {css_blocks} CSS blocks", "success")
+        if sass_blocks:
+            engine.log(f"✅ Extracted {len(sass_blocks)} Sass blocks ({', '.join(sass_features)})", "success")
+        if copied_through:
+            engine.log(f"⚠ {copied_through} blocks over {MAX_BLOCK_IN_MEMORY // (1024 * 1024)} MB "
+                       f"copied without minification or Sass detection", "warning")
+
+        bytes_saved = 0
+        if (options.minify_output or not options.preserve_comments) and bytes_before:
+            bytes_saved = bytes_before - bytes_after
+            engine.log(f"🗜 Minified {bytes_before:,} → {bytes_after:,} bytes (saved {bytes_saved:,}, "
+                       f"{bytes_saved / bytes_before:.0%})", "info")
+
+        shared_js = js_run.shared if js_run else 0
+        shared_css = css_run.shared if css_run else 0
+        shared_count = shared_js + shared_css
+        common_js = engine.shared.href(COMMON_JS, out_dir) if shared_js else None
+        common_css = engine.shared.href(COMMON_CSS, out_dir) if shared_css else None
+        if shared_count:
+            engine.log(f"♻ {shared_count} blocks are shared with other pages", "info")
+
+        files_created = {'js': js.written, 'css': css.written, 'sass': bool(sass_blocks)}
+        if js.written:
+            engine._log_saved('script.js', js.changed)
+        if compiled is not None:
+            engine.log("✅ Compiled Sass → style.css", "success")
+        elif css.written:
+            engine._log_saved('style.css', css.changed)
+
+        with engine._stage('refs'):
+            head_insert, body_insert, tail_insert = (
+                text.encode(codec) for text in engine._reference_inserts(
+                    head_at is not None, body_at is not None, files_created, common_css, common_js))
+        index_size = os.path.getsize(partial_path) + len(head_insert) + len(body_insert) + len(tail_insert)
+        with engine._stage('write'):
+            changed = _splice(partial_path, index_path, [(head_at, head_insert), (body_at, body_insert)],
+                              tail_insert, None if engine.archive is None else engine._open_output)
+        if engine.timer is not None:
+            engine.timer.count('write', index_size)
+        engine._log_saved('index.html', changed)
+
+    engine._log_extraction_summary_enhanced(files_created, out_dir, base_name)
+
+    return ExtractionResult(
+        source=html_file,
+        out_dir=out_dir,
+        files_created=engine._created_file_names(files_created),
+        scripts=js.blocks,
+        styles=css_blocks,
+        sass_blocks=len(sass_blocks),
+        inline_styles=registry.count,
+        shared_blocks=shared_count,
+        bytes_saved=bytes_saved,
+        encoding=encoding,
+        sha256=digest.hexdigest(),
+        duration=time.perf_counter() - start_time,
+    )
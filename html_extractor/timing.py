@@ -0,0 +1,169 @@
+"""Per-stage timing and opt-in profiling of page extractions
+
+``extract_html`` runs each step of a page inside ``StageTimer.stage``.
+Stages nest: time spent in an inner stage is not counted again in the
+outer one, so the stage times of a page add up to at most its duration.
+They are stored on ``ExtractionResult.stages`` as ``{stage: {'seconds':
+..., 'bytes': ...}}``, and so reach the run log and ``on_result`` callbacks
+of the engine, also from worker processes.
+
+With ``ExtractionOptions.profile`` set to ``'cprofile'`` or
+``'tracemalloc'``, every page is profiled into a capture file; once a batch
+ends only the captures of the ``profile_top`` slowest pages are kept.
+"""
+from contextlib import contextmanager
+import hashlib
+import io
+import os
+from pathlib import Path
+import time
+
+STAGES = ('read', 'backup', 'scan', 'scripts', 'styles', 'sass', 'refs', 'write')
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+PROFILE_DIR = '.html_extractor_profiles'
+
+_SUFFIXES = {'cprofile': '.prof', 'tracemalloc': '.tracemalloc'}
+
+
+class StageTimer:
+    """Exclusive wall time and byte counts per stage of one extraction"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.bytes = {}
+        self._stack = []   # [stage, time its current slice started]
+
+    @contextmanager
+    def stage(self, name, nbytes=0):
+        """Time the block as ``name``, pausing the enclosing stage meanwhile"""
+        start = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self._add(outer[0], start - outer[1])
+        self._stack.append([name, start])
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            name, resumed = self._stack.pop()
+            self._add(name, end - resumed)
+            if self._stack:
+                self._stack[-1][1] = end
+            if nbytes:
+                self.count(name, nbytes)
+
+    def _add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def count(self, name, nbytes):
+        """Add ``nbytes`` to the bytes handled by a stage"""
+        self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def as_dict(self):
+        return {name: {'seconds': round(self.seconds.get(name, 0.0), 6), 'bytes': self.bytes.get(name, 0)}
+                for name in STAGES if name in self.seconds or name in self.bytes}
+
+
+class Profiler:
+    """cProfile or tracemalloc capture of one extraction, saved to a file"""
+
+    def __init__(self, mode, profile_dir, html_file):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        tag = hashlib.sha1(os.path.abspath(html_file).encode('utf-8', 'surrogatepass')).hexdigest()[:8]
+        self.path = os.path.join(profile_dir, f"{Path(html_file).stem}-{tag}{_SUFFIXES[mode]}")
+        self.peak_bytes = None
+        self._profile = None
+
+    def start(self):
+        if self.mode == 'cprofile':
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            import tracemalloc
+            tracemalloc.start(10)
+
+    def stop(self, keep=True):
+        """Stop capturing and, with ``keep``, write the capture to ``self.path``"""
+        if self.mode == 'cprofile':
+            self._profile.disable()
+            capture = self._profile
+        else:
+            import tracemalloc
+            capture = tracemalloc.take_snapshot() if keep else None
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if not keep:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self.mode == 'cprofile':
+            capture.dump_stats(self.path)
+        else:
+            capture.dump(self.path)
+
+
+def keep_slowest_profiles(results, top):
+    """Delete the captures of all but the ``top`` slowest results; return the kept results"""
+    profiled = sorted((r for r in results if r.profile), key=lambda r: r.duration, reverse=True)
+    for result in profiled[top:]:
+        try:
+            os.remove(result.profile)
+        except OSError:
+            pass
+        result.profile = ''
+    return profiled[:top]
+
+
+def profile_highlights(path, limit=8):
+    """Return the top lines of a capture
+
+    For cProfile, functions by cumulative time; for tracemalloc, the sites
+    of the allocations still alive when the extraction ended (the peak is
+    logged separately, when the capture is taken).
+    """
+    if path.endswith(_SUFFIXES['cprofile']):
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+        lines = out.getvalue().splitlines()
+        start = next((i for i, line in enumerate(lines) if line.lstrip().startswith('ncalls')), 0)
+        return [line for line in lines[start:] if line.strip()]
+
+    import tracemalloc
+    stats = tracemalloc.Snapshot.load(path).statistics('lineno')
+    return [f"{stat.size / 1024:10.1f} KB  {stat.traceback}" for stat in stats[:limit]]
+
+
+def summary_lines(results, slowest=5):
+    """Return the end-of-batch table of where the time went, stage by stage and page by page"""
+    if not results:
+        return []
+    totals = {}
+    sizes = {}
+    for result in results:
+        for stage, numbers in result.stages.items():
+            totals[stage] = totals.get(stage, 0.0) + numbers['seconds']
+            sizes[stage] = sizes.get(stage, 0) + numbers['bytes']
+    duration = sum(r.duration for r in results)
+    totals['other'] = max(duration - sum(totals.values()), 0.0)
+
+    lines = [f"⏱ Time by stage over {len(results)} file(s) ({duration:.2f} s of extraction):",
+             f"   {'stage':<10}{'seconds':>10}{'share':>8}{'MB/s':>10}"]
+    for stage in STAGES + ('other',):
+        if stage not in totals:
+            continue
+        seconds = totals[stage]
+        share = seconds / duration if duration else 0.0
+        rate = f"{sizes[stage] / (1024 * 1024) / seconds:10.1f}" if sizes.get(stage) and seconds else f"{'':>10}"
+        lines.append(f"   {stage:<10}{seconds:10.3f}{share:8.0%}{rate}")
+
+    lines.append(f"🐢 Slowest files:")
+    for result in sorted(results, key=lambda r: r.duration, reverse=True)[:slowest]:
+        worst = max(result.stages.items(), key=lambda item: item[1]['seconds'], default=None)
+        detail = f" (mostly {worst[0]}, {worst[1]['seconds']:.3f} s)" if worst else ''
+        lines.append(f"   {result.duration:8.3f} s  {result.source}{detail}")
+    return lines
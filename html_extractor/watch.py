@@ -0,0 +1,307 @@
+"""Watch mode: re-extract HTML files as they are saved
+
+The watched files are those a batch over the same folder would extract
+(or the single file given). Only files that changed are extracted again,
+into the same project folders as before; nothing else is re-read.
+
+Changes come from inotify on Linux, through ctypes, and otherwise from
+polling: a ``stat`` of every watched file every ``poll_interval`` seconds,
+stretched on trees so large that a poll takes a noticeable share of
+that. Editors often save in bursts (write, rename, touch), so a file is
+extracted once no change has been seen for ``debounce`` seconds, and at
+the latest ``MAX_DELAY`` seconds after its first change.
+"""
+import os
+from pathlib import Path
+import select
+import struct
+import sys
+import time
+
+from .cancel import ExtractionCancelled
+from .discovery import HtmlFileFilter, iter_html_files
+
+DEFAULT_DEBOUNCE = 0.2
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+MAX_DELAY = 2.0
+
+# Longest wait between two stop checks
+_TICK = 0.25
+
+# inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct('iIII')
+
+
+class _InotifyBackend:
+    """Changed files under a tree, from one inotify watch per folder"""
+
+    name = 'inotify'
+
+    def __init__(self, wanted):
+        import ctypes.util
+
+        self._wanted = wanted
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            self._raise()
+        self._dirs = {}
+        self._since = time.time()
+        try:
+            self._add_tree(wanted.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _raise(self):
+        import ctypes
+
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    def _add_dir(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            self._raise()   # ENOSPC: out of fs.inotify.max_user_watches
+        self._dirs[wd] = path
+
+    def _add_tree(self, path):
+        """Watch ``path`` and the folders under it that hold inputs; return the inputs found"""
+        self._add_dir(path)
+        found = []
+        stack = [path]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(entry.path, self._wanted.root).replace(os.sep, '/')
+                if is_dir:
+                    if self._wanted.wants_dir(entry.name, rel_path, entry.path):
+                        self._add_dir(entry.path)
+                        stack.append(entry.path)
+                else:
+                    found.append(entry.path)
+        return found
+
+    def changes(self, timeout):
+        """Wait up to ``timeout`` seconds; return the paths written or moved in meanwhile"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+            pos += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                changed.update(self._recent_files())
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)   # The folder is gone
+                continue
+            folder = self._dirs.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    rel_path = os.path.relpath(path, self._wanted.root).replace(os.sep, '/')
+                    if self._wanted.wants_dir(os.path.basename(path), rel_path, path):
+                        changed.update(self._add_tree(path))
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                changed.add(path)
+        self._since = time.time()
+        return changed
+
+    def _recent_files(self):
+        """After the kernel dropped events, find the files modified since the last read"""
+        recent = []
+        for path, _ in iter_html_files(self._wanted.root, include=('*',)):
+            try:
+                if os.stat(path).st_mtime >= self._since - 1:
+                    recent.append(path)
+            except OSError:
+                pass
+        return recent
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingBackend:
+    """Changed files under a tree, from comparing ``stat`` results"""
+
+    name = 'polling'
+
+    def __init__(self, files, interval):
+        self._files = files
+        self._interval = interval
+        self._state = self._snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def _snapshot(self):
+        state = {}
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def changes(self, timeout):
+        """Wait up to ``timeout`` seconds; return the paths new or modified since the last poll"""
+        now = time.monotonic()
+        if now + timeout < self._next_poll:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(self._next_poll - now, 0))
+
+        start = time.monotonic()
+        state = self._snapshot()
+        elapsed = time.monotonic() - start
+        changed = {path for path, stamp in state.items() if self._state.get(path) != stamp}
+        self._state = state
+        # Never spend more than a third of the time polling
+        self._next_poll = time.monotonic() + max(self._interval, 2 * elapsed)
+        return changed
+
+    def close(self):
+        pass
+
+
+def _open_backend(engine, wanted, files, poll_interval, polling):
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return _InotifyBackend(wanted)
+        except (OSError, AttributeError) as e:
+            engine.log(f"⚠ Cannot use inotify here ({getattr(e, 'strerror', None) or e}); polling instead",
+                       "warning")
+    return _PollingBackend(files, poll_interval)
+
+
+def watch_and_extract(engine, path, out_dir, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+                      polling=False):
+    """Re-extract the HTML files under ``path`` as they change, until the engine is asked to stop
+
+    ``path`` is a folder, watched like a batch over it (same include,
+    exclude and recursion options), or a single file. With ``polling``,
+    files are polled even where inotify is available; inotify does not see
+    changes made by other machines on network filesystems. Returns the
+    ExtractionResult of every extraction.
+    """
+    options = engine.options
+    if os.path.isdir(path):
+        skip_dirs = [out_dir] if os.path.abspath(out_dir) != os.path.abspath(path) else []
+        wanted = HtmlFileFilter(path, options.include_patterns, options.exclude_patterns, options.recursive,
+                                skip_dirs)
+
+        def files():
+            return (html_file for html_file, _ in iter_html_files(path, options.include_patterns,
+                                                                   options.exclude_patterns, options.recursive,
+                                                                   skip_dirs))
+
+        def target(changed):
+            rel_dir = wanted.rel_dir(changed)
+            if rel_dir is None:
+                return None
+            return os.path.join(out_dir, rel_dir) if rel_dir else out_dir
+    elif os.path.isfile(path):
+        source = os.path.abspath(path)
+        wanted = HtmlFileFilter(os.path.dirname(source), recursive=False)
+
+        def files():
+            return [source]
+
+        def target(changed):
+            return out_dir if os.path.abspath(changed) == source else None
+    else:
+        raise ValueError(f"'{path}' does not exist.")
+
+    backend = _open_backend(engine, wanted, files, poll_interval, polling)
+    how = 'inotify' if backend.name == 'inotify' else f"polling every {poll_interval:g} s"
+    engine.log(f"\n👀 Watching {path} for changes ({how}, debounce {debounce * 1000:.0f} ms)", "header")
+    engine.update_progress(None, "Watching for changes")
+
+    results = []
+    written = set()   # Our own outputs, in case they land among the watched files
+    pending = {}      # path -> time its first change was seen
+    last_change = 0.0
+    try:
+        while not engine.stop_requested():
+            now = time.monotonic()
+            timeout = _TICK
+            if pending:
+                timeout = max(min(last_change + debounce, min(pending.values()) + MAX_DELAY) - now, 0)
+            changed = backend.changes(min(timeout, _TICK))
+
+            now = time.monotonic()
+            for changed_path in changed:
+                if os.path.normcase(os.path.abspath(changed_path)) in written:
+                    continue
+                if target(changed_path) is not None:
+                    pending.setdefault(changed_path, now)
+                    last_change = now
+            if not pending or (now - last_change < debounce and now - min(pending.values()) < MAX_DELAY):
+                continue
+
+            due = sorted(pending.items())
+            pending.clear()
+            for html_file, first_seen in due:
+                if engine.stop_requested():
+                    break
+                if os.path.isfile(html_file):
+                    result = _extract_changed(engine, html_file, target(html_file), first_seen)
+                    if result is not None:
+                        results.append(result)
+                        written.update(_output_paths(result))
+            engine.update_progress(None, f"Watching for changes ({len(results)} re-extracted)")
+    finally:
+        backend.close()
+    return results
+
+
+def _output_paths(result):
+    """Return the normalized paths of the files an extraction wrote"""
+    names = result.files_created + [f"{Path(result.source).stem}_original.html"]
+    return {os.path.normcase(os.path.abspath(os.path.join(result.out_dir, name))) for name in names}
+
+
+def _extract_changed(engine, html_file, file_out_dir, first_seen):
+    """Extract one changed file and log how long after the change its output was ready"""
+    engine.log(f"\n🔁 Changed: {html_file}", "info")
+    try:
+        result = engine.extract_html(html_file, file_out_dir)
+    except ExtractionCancelled:
+        return None
+    except Exception as e:
+        engine._file_failed(html_file, os.path.basename(html_file), e)
+        return None
+    engine._record_result(result)
+    engine.log(f"⚡ Output updated {time.monotonic() - first_seen:.2f} s after the change was seen", "success")
+    return result
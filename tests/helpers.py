@@ -0,0 +1,64 @@
+"""Shared fixtures: a stand-in for libsass and a quiet engine"""
+import os
+import re
+import types
+from unittest import mock
+
+from html_extractor import engine as engine_module
+from html_extractor import sass_cache
+from html_extractor.engine import ExtractionEngine, ExtractionOptions
+
+COMPILED_MARK = '/* stub-compiled */'
+
+
+class StubSass:
+    """Patch a fake ``sass`` module in, recording every compile call
+
+    The fake "compiles" by resolving ``$name: value;`` variables and
+    prefixing the result with COMPILED_MARK, which is enough to tell
+    compiled output apart in style.css.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.module = types.SimpleNamespace(__version__='stub', compile=self._compile)
+        self._patches = [
+            mock.patch.object(sass_cache, 'sass', self.module, create=True),
+            mock.patch.object(sass_cache, 'SASS_AVAILABLE', True),
+            mock.patch.object(engine_module, 'SASS_AVAILABLE', True),
+            mock.patch.object(sass_cache, '_compilers', {}),
+        ]
+
+    def _compile(self, string, output_style='nested', include_paths=()):
+        self.calls.append(string)
+        variables = dict(re.findall(r'\$([\w-]+)\s*:\s*([^;]+);', string))
+        css = re.sub(r'\$([\w-]+)\s*:\s*[^;]+;\s*', '', string)
+        css = re.sub(r'\$([\w-]+)', lambda m: variables.get(m.group(1), m.group(0)), css)
+        return f"{COMPILED_MARK}\n{css}\n"
+
+    def __enter__(self):
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        for patch in reversed(self._patches):
+            patch.stop()
+
+
+def make_engine(log=None, **options):
+    """Return an engine with deterministic output and no backups, logging to ``log`` if given"""
+    options = dict(dict(deterministic_output=True, create_backup=False), **options)
+    return ExtractionEngine(ExtractionOptions(**options), log=log)
+
+
+def write_page(folder, name, html):
+    path = os.path.join(folder, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return path
+
+
+def read(path):
+    with open(path, encoding='utf-8-sig') as f:
+        return f.read()
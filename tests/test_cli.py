@@ -0,0 +1,37 @@
+"""Command-line entry point"""
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from html_extractor import cli
+from html_extractor.engine import ExtractionEngine
+
+
+class InterruptTest(unittest.TestCase):
+    def run_interrupted(self, method, *args):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'site')
+            os.makedirs(src)
+            with open(os.path.join(src, 'page.html'), 'w', encoding='utf-8') as f:
+                f.write('<html><body><p>x</p></body></html>')
+            stdout = io.StringIO()
+            with mock.patch.object(ExtractionEngine, method, side_effect=KeyboardInterrupt), redirect_stdout(stdout):
+                code = cli.main([os.path.join(src, *args), '-o', os.path.join(tmp, 'out')])
+        return code, stdout.getvalue()
+
+    def test_ctrl_c_during_a_batch_stops_cleanly(self):
+        code, output = self.run_interrupted('extract_batch')
+        self.assertEqual(code, 130)
+        self.assertIn('Stopped', output)
+
+    def test_ctrl_c_during_a_single_file_stops_cleanly(self):
+        code, output = self.run_interrupted('extract_single_file', 'page.html')
+        self.assertEqual(code, 130)
+        self.assertIn('Stopped', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""Atomic output files"""
+import os
+import stat
+import tempfile
+import unittest
+
+from html_extractor.output import copy_file, make_temp_file, write_bytes
+
+
+@unittest.skipIf(os.name == 'nt', "file modes are POSIX only")
+class OutputModeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.old_umask = os.umask(0o027)
+        self.addCleanup(os.umask, self.old_umask)
+
+    def mode(self, path):
+        return stat.S_IMODE(os.stat(path).st_mode)
+
+    def test_outputs_get_the_umask_mode(self):
+        path = os.path.join(self.tmp.name, 'out.css')
+        self.assertTrue(write_bytes(path, b'p { color: red; }'))
+        self.assertEqual(self.mode(path), 0o640)
+
+        copy = os.path.join(self.tmp.name, 'copy.css')
+        self.assertTrue(copy_file(path, copy, digest=b'unused'))
+        self.assertEqual(self.mode(copy), 0o640)
+
+    def test_temp_files_are_new_files(self):
+        fd, path = make_temp_file(self.tmp.name, prefix='.page.')
+        os.close(fd)
+        fd2, path2 = make_temp_file(self.tmp.name, prefix='.page.')
+        os.close(fd2)
+        self.assertNotEqual(path, path2)
+        self.assertTrue(os.path.basename(path).startswith('.page.') and path.endswith('.tmp'))
+        self.assertEqual(self.mode(path), 0o640)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Compiled Sass served from the cache still lands in a complete style.css"""
+import os
+import tempfile
+import unittest
+
+from html_extractor import sass_cache
+from tests.helpers import COMPILED_MARK, StubSass, make_engine, read, write_page
+
+PAGE = """<html>
+<head>
+<style>h1 {{ font-size: {size}px; }}</style>
+<style>$accent: blue; nav {{ a {{ color: $accent; }} }}</style>
+</head>
+<body><h1 style="margin: {size}px">Title</h1><nav><a href="#">Home</a></nav></body>
+</html>
+"""
+
+
+class SassCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+        self.out = os.path.join(self.tmp.name, 'out')
+        self.pages = [write_page(self.tmp.name, f'page{size}.html', PAGE.format(size=size)) for size in (10, 20)]
+
+    def assert_complete(self, result, size):
+        css = read(os.path.join(result.out_dir, 'style.css'))
+        self.assertIn(f'h1 {{ font-size: {size}px; }}', css)
+        self.assertIn(f'.hx-inline-1 {{ margin:{size}px; }}', css)
+        self.assertIn(f'{COMPILED_MARK}\nnav {{ a {{ color: blue; }} }}', css)
+        self.assertLess(css.index('.hx-inline-1'), css.index(COMPILED_MARK))
+
+    def test_repeated_block_is_compiled_once_and_every_page_keeps_its_css(self):
+        with StubSass() as stub:
+            engine = make_engine(sass_cache_dir=self.cache_dir)
+            results = [engine.extract_single_file(page, self.out) for page in self.pages]
+
+        self.assertEqual(len(stub.calls), 1)
+        for result, size in zip(results, (10, 20)):
+            self.assert_complete(result, size)
+
+    def test_disk_cache_hit_in_a_new_process_keeps_the_page_css(self):
+        with StubSass() as stub:
+            make_engine(sass_cache_dir=self.cache_dir).extract_single_file(self.pages[0], self.out)
+        with StubSass() as stub:   # A fresh compiler registry, as in another process
+            result = make_engine(sass_cache_dir=self.cache_dir).extract_single_file(self.pages[1], self.out)
+            compiler = sass_cache.get_compiler(self.cache_dir)
+
+        self.assertEqual(stub.calls, [])
+        self.assertEqual(compiler.hits, 1)
+        self.assert_complete(result, 20)
+
+    def test_memory_only_cache_keeps_the_page_css(self):
+        with StubSass() as stub:
+            engine = make_engine(sass_cache_mb=0)
+            results = [engine.extract_single_file(page, self.out) for page in self.pages]
+
+        self.assertEqual(len(stub.calls), 1)
+        self.assertFalse(os.path.exists(self.cache_dir))
+        for result, size in zip(results, (10, 20)):
+            self.assert_complete(result, size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Requests the extraction server refuses"""
+import http.client
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+import unittest
+
+from html_extractor import ExtractionOptions
+from html_extractor.server import MAX_REQUEST_BYTES, ExtractionService, make_server
+
+TOKEN = 'test-token'
+
+
+class _Server:
+    """An extraction server running on a thread for the duration of a test"""
+
+    def __init__(self, test, socket_path=''):
+        self.service = ExtractionService(ExtractionOptions(create_backup=False))
+        self.server = make_server(self.service, port=0, socket_path=socket_path,
+                                  token=None if socket_path else TOKEN)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        test.addCleanup(self.close)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.close()
+
+
+class TcpServerTest(unittest.TestCase):
+    def setUp(self):
+        self.port = _Server(self).server.server_address[1]
+
+    def post(self, body, headers):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        self.addCleanup(conn.close)
+        conn.request('POST', '/extract', body, headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def raw_post(self, headers):
+        """Send only the request head, announcing a body that never comes; return the status line"""
+        with socket.create_connection(('127.0.0.1', self.port), timeout=5) as conn:
+            head = ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+            conn.sendall(f"POST /extract HTTP/1.1\r\nHost: 127.0.0.1\r\n{head}\r\n".encode('ascii'))
+            return conn.makefile('rb').readline().decode('ascii')
+
+    def test_unauthenticated_request_is_refused_before_its_body_is_read(self):
+        status_line = self.raw_post({'Content-Type': 'application/json', 'Content-Length': 10 ** 9})
+        self.assertIn(' 401 ', status_line)
+
+    def test_foreign_origin_is_refused_before_its_body_is_read(self):
+        status_line = self.raw_post({'Content-Type': 'application/json', 'Content-Length': 10 ** 9,
+                                     'Authorization': f'Bearer {TOKEN}', 'Origin': 'https://example.com'})
+        self.assertIn(' 403 ', status_line)
+
+    def test_oversized_body_is_refused(self):
+        status_line = self.raw_post({'Content-Type': 'application/json', 'Content-Length': MAX_REQUEST_BYTES + 1,
+                                     'Authorization': f'Bearer {TOKEN}'})
+        self.assertIn(' 413 ', status_line)
+
+    def test_job_with_token_is_served(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, 'page.html')
+            with open(page, 'w', encoding='utf-8') as f:
+                f.write('<html><head><style>p { color: red; }</style></head><body></body></html>')
+            status, reply = self.post(json.dumps({'input': page, 'output': os.path.join(tmp, 'out')}),
+                                      {'Content-Type': 'application/json', 'Authorization': f'Bearer {TOKEN}'})
+        self.assertEqual(status, 200, reply)
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix sockets are not available")
+class UnixServerTest(unittest.TestCase):
+    def test_socket_is_private_and_bound_in_place(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'hx.sock')
+            server = _Server(self, socket_path=path).server
+            self.assertEqual(server.server_address, path)
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+            self.assertEqual(os.listdir(tmp), ['hx.sock'])
+
+            conn = socket.socket(socket.AF_UNIX)
+            conn.settimeout(5)
+            conn.connect(path)
+            with conn:
+                conn.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                self.assertIn(b' 200 ', conn.makefile('rb').readline())
+
+
+if __name__ == '__main__':
+    unittest.main()
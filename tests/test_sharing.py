@@ -0,0 +1,40 @@
+"""Blocks shared between pages of a batch"""
+import os
+import tempfile
+import unittest
+
+from tests.helpers import make_engine
+
+PAGE = """<html>
+<head><meta charset="windows-1252"><title>{title}</title></head>
+<body>
+<p>{title}</p>
+<script>var greeting = "Café crème";</script>
+<script>var page = "{title}";</script>
+</body>
+</html>
+"""
+
+
+class SharedFileEncodingTest(unittest.TestCase):
+    def test_common_file_of_non_utf8_pages_has_a_bom(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'site')
+            out = os.path.join(tmp, 'out')
+            os.makedirs(src)
+            for title in ('one', 'two'):
+                with open(os.path.join(src, f'{title}.html'), 'w', encoding='cp1252') as f:
+                    f.write(PAGE.format(title=title))
+
+            make_engine(share_common_blocks=True).extract_batch(src, out)
+
+            with open(os.path.join(out, 'common.js'), 'rb') as f:
+                data = f.read()
+            self.assertTrue(data.startswith(b'\xef\xbb\xbf'))
+            self.assertIn('Café crème', data.decode('utf-8-sig'))
+            with open(os.path.join(out, 'one_extracted', 'script.js'), 'rb') as f:
+                self.assertTrue(f.read().startswith(b'\xef\xbb\xbf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
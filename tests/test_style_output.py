@@ -0,0 +1,73 @@
+"""What ends up in style.css for pages mixing CSS, Sass and style attributes"""
+import os
+import tempfile
+import unittest
+
+from tests.helpers import COMPILED_MARK, StubSass, make_engine, read, write_page
+
+MIXED_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<style>p { color: red; }</style>
+<style>$accent: blue; nav { a { color: $accent; } }</style>
+</head>
+<body>
+<nav><a href="#">Home</a></nav>
+<p class="x" style="margin: 0">Hello</p>
+</body>
+</html>
+"""
+
+
+class MixedStylesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.page = write_page(self.tmp.name, 'page.html', MIXED_PAGE)
+        self.out = os.path.join(self.tmp.name, 'out')
+
+    def test_style_blocks_inline_styles_and_compiled_sass_are_all_kept(self):
+        with StubSass():
+            result = make_engine(sass_cache_dir=os.path.join(self.tmp.name, 'cache')).extract_single_file(
+                self.page, self.out)
+
+        css = read(os.path.join(result.out_dir, 'style.css'))
+        index = read(os.path.join(result.out_dir, 'index.html'))
+        self.assertIn('p { color: red; }', css)
+        self.assertIn('.hx-inline-1', css)
+        self.assertIn('.hx-inline-1 { margin:0; }', css)
+        self.assertIn(COMPILED_MARK, css)
+        self.assertIn('color: blue', css)
+        self.assertLess(css.index('color: red'), css.index('.hx-inline-1'))
+        self.assertLess(css.index('.hx-inline-1'), css.index(COMPILED_MARK))
+        self.assertIn('class="x hx-inline-1"', index)
+        self.assertIn('$accent', read(os.path.join(result.out_dir, 'style.scss')))
+
+    def test_without_sass_conversion_style_css_keeps_the_plain_css(self):
+        with StubSass() as stub:
+            result = make_engine(convert_sass=False).extract_single_file(self.page, self.out)
+
+        css = read(os.path.join(result.out_dir, 'style.css'))
+        self.assertEqual(stub.calls, [])
+        self.assertIn('p { color: red; }', css)
+        self.assertIn('.hx-inline-1', css)
+        self.assertNotIn(COMPILED_MARK, css)
+
+    def test_streamed_page_keeps_the_plain_css_next_to_compiled_sass(self):
+        logs = []
+        engine = make_engine(lambda msg, tag: logs.append(msg),
+                             sass_cache_dir=os.path.join(self.tmp.name, 'cache'), stream_threshold_mb=1e-6)
+        with StubSass():
+            result = engine.extract_single_file(self.page, self.out)
+
+        css = read(os.path.join(result.out_dir, 'style.css'))
+        self.assertTrue(any('Streaming' in line for line in logs))
+        self.assertIn('p { color: red; }', css)
+        self.assertIn('.hx-inline-1 { margin:0; }', css)
+        self.assertIn(COMPILED_MARK, css)
+        self.assertLess(css.index('.hx-inline-1'), css.index(COMPILED_MARK))
+        self.assertIn('style.scss', result.files_created)
+
+
+if __name__ == '__main__':
+    unittest.main()